@@ -1,33 +1,390 @@
-import boto3
+import json
+import re
+import threading
+
+from columnar_result import ColumnarResult
+from result_cache import estimate_size
+import sql_text
+import value_decoder
 
 
 class AuroraDBManager:
-    def __init__(self, database_name, resource_arn, secret_arn):
-        self.client = boto3.client("rds-data")
+    # Statements that can be wrapped in a paging subquery
+    PAGEABLE_PATTERN = re.compile(r"^\s*(select|with|values)\b", re.IGNORECASE)
+
+    # The Data API rejects responses above its size limit with this message
+    RESPONSE_TOO_LARGE = "response size"
+
+    def __init__(
+        self,
+        database_name,
+        resource_arn,
+        secret_arn,
+        batch_size=1000,
+        record_format="NONE",
+        result_cache=None,
+        client_factory=None,
+    ):
+        self._client = None
+        # Returns the rds-data client; a default boto3 client when None
+        self.client_factory = client_factory
+        self._client_lock = threading.Lock()
         self.database_name = database_name
         self.resource_arn = resource_arn
         self.secret_arn = secret_arn
+        self.batch_size = batch_size
+        # "JSON" asks the Data API for formattedRecords when streaming results
+        self.record_format = record_format
+        # Optional ResultCache for read-only statements
+        self.result_cache = result_cache
+        # transactionId -> tables written in it, invalidated on commit
+        self._transaction_writes = {}
+        self._transaction_lock = threading.Lock()
 
-    def execute_query(self, sql_query):
-        """Execute a SQL query and return the response"""
+    @property
+    def client(self):
+        """The rds-data client, created on first use"""
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    def connect(self):
+        """Create the rds-data client, importing boto3 on first use"""
+        # Both are slow, so the UI calls this on a worker thread after startup
+        with self._client_lock:
+            if self._client is None:
+                if self.client_factory is not None:
+                    self._client = self.client_factory()
+                else:
+                    import boto3
+
+                    self._client = boto3.client("rds-data")
+        return self._client
+
+    def _execute_statement(
+        self, sql_query, record_format="NONE", transaction_id=None, read_only=None
+    ):
+        """Run a single execute_statement call, raising on errors.
+
+        ``read_only`` overrides how the statement is classified for cache
+        invalidation, for wrappers such as EXPLAIN that hide what runs.
+        """
+        if read_only is None:
+            read_only = sql_text.is_read_only(sql_query)
+        kwargs = {}
+        if record_format != "NONE":
+            kwargs["formatRecordsAs"] = record_format
+        if transaction_id is not None:
+            kwargs["transactionId"] = transaction_id
         try:
-            response = self.client.execute_statement(
+            return self.client.execute_statement(
                 resourceArn=self.resource_arn,
                 secretArn=self.secret_arn,
                 database=self.database_name,
                 sql=sql_query,
                 includeResultMetadata=True,
+                **kwargs,
+            )
+        finally:
+            # Writes drop cached results of the tables they touched, once
+            # other connections can see them
+            if self.result_cache is not None and not read_only:
+                tables = sql_text.referenced_tables(sql_query)
+                if transaction_id is None:
+                    self.result_cache.invalidate_tables(tables)
+                else:
+                    with self._transaction_lock:
+                        writes = self._transaction_writes.setdefault(transaction_id, [])
+                        writes.append(tables)
+
+    def begin_transaction(self):
+        """Start a transaction and return its transactionId"""
+        response = self.client.begin_transaction(
+            resourceArn=self.resource_arn,
+            secretArn=self.secret_arn,
+            database=self.database_name,
+        )
+        return response["transactionId"]
+
+    def execute_in_transaction(self, sql_query, transaction_id):
+        """Execute a statement inside a transaction, bypassing the result cache"""
+        return self._execute_statement(sql_query, transaction_id=transaction_id)
+
+    def commit_transaction(self, transaction_id):
+        """Commit a transaction and drop cached results of what it wrote"""
+        try:
+            return self.client.commit_transaction(
+                resourceArn=self.resource_arn,
+                secretArn=self.secret_arn,
+                transactionId=transaction_id,
+            )
+        finally:
+            # Reads before the commit may have cached the old rows again
+            with self._transaction_lock:
+                writes = self._transaction_writes.pop(transaction_id, [])
+            for tables in writes:
+                self.result_cache.invalidate_tables(tables)
+
+    def rollback_transaction(self, transaction_id):
+        with self._transaction_lock:
+            self._transaction_writes.pop(transaction_id, None)
+        return self.client.rollback_transaction(
+            resourceArn=self.resource_arn,
+            secretArn=self.secret_arn,
+            transactionId=transaction_id,
+        )
+
+    def explain(self, sql_query, analyze=True):
+        """Run a statement under EXPLAIN and return its parsed JSON plan.
+
+        With ``analyze`` the statement is executed to measure it, with
+        buffer usage, so statements that write run inside a transaction
+        that is rolled back afterwards. The statement is classified before
+        it is wrapped, since ANALYZE itself reads as a write.
+        """
+        read_only = sql_text.is_read_only(sql_query)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        sql = f"EXPLAIN ({options}) {sql_query.strip().rstrip(';')}"
+        if analyze and not read_only:
+            transaction_id = self.begin_transaction()
+            try:
+                response = self.execute_in_transaction(sql, transaction_id)
+            finally:
+                self.rollback_transaction(transaction_id)
+        else:
+            # Only a read-only statement runs here, if anything runs at all
+            response = self._execute_statement(sql, read_only=True)
+
+        metadata = response.get("columnMetadata") or [{}]
+        plan = value_decoder.decode_field(
+            response["records"][0][0], metadata[0].get("typeName")
+        )
+        return json.loads(plan) if isinstance(plan, str) else plan
+
+    def batch_execute(self, sql_query, parameter_sets):
+        """Run one statement for every parameter set in a single request"""
+        try:
+            return self.client.batch_execute_statement(
+                resourceArn=self.resource_arn,
+                secretArn=self.secret_arn,
+                database=self.database_name,
+                sql=sql_query,
+                parameterSets=parameter_sets,
+            )
+        finally:
+            if self.result_cache is not None:
+                self.result_cache.invalidate_tables(
+                    sql_text.referenced_tables(sql_query)
+                )
+
+    def _cache_key(self, mode, sql_query):
+        return (
+            self.database_name,
+            mode,
+            self.record_format,
+            sql_text.normalize_sql(sql_query),
+        )
+
+    def _cacheable(self, sql_query):
+        return self.result_cache is not None and sql_text.is_read_only(sql_query)
+
+    def execute_query(self, sql_query):
+        """Execute a SQL query and return the response"""
+        try:
+            if not self._cacheable(sql_query):
+                return self._execute_statement(sql_query)
+
+            key = self._cache_key("execute", sql_query)
+            entry = self.result_cache.get(key)
+            if entry is not None:
+                return dict(entry.pages[0], cacheAge=entry.age)
+
+            generation = self.result_cache.generation
+            response = self._execute_statement(sql_query)
+            self.result_cache.put(
+                key,
+                [response],
+                sql_text.referenced_tables(sql_query),
+                estimate_size(response),
+                generation,
             )
             return response
         except self.client.exceptions.BadRequestException as e:
             print(f"Error executing query: {e}")
             return None
 
+    def stream_query(self, sql_query, batch_size=None, use_cache=True, exact=False):
+        """Yield the result of a query as a series of response pages.
+
+        Pages of read-only statements are served from and stored in the
+        result cache when one is configured; cached pages carry a
+        ``cacheAge`` in seconds. See ``_stream_pages`` for the paging itself.
+        With ``exact`` the pages come from one server-side cursor instead
+        (see ``_cursor_pages``), so every row is read exactly once, as a
+        file export or a schema read needs.
+        """
+        pages = self._cursor_pages if exact else self._stream_pages
+        if not use_cache or not self._cacheable(sql_query):
+            yield from pages(sql_query, batch_size)
+            return
+
+        key = self._cache_key("exact" if exact else "stream", sql_query)
+        entry = self.result_cache.get(key)
+        if entry is not None:
+            for page in entry.pages:
+                yield dict(page, cacheAge=entry.age)
+            return
+
+        generation = self.result_cache.generation
+        pages, size = [], 0
+        for page in pages(sql_query, batch_size):
+            # Results too large for the cache are streamed without keeping them
+            if pages is not None:
+                size += estimate_size(page)
+                if size > self.result_cache.max_bytes:
+                    pages = None
+                else:
+                    pages.append(page)
+            yield page
+
+        if pages is not None:
+            self.result_cache.put(
+                key, pages, sql_text.referenced_tables(sql_query), size, generation
+            )
+
+    def _stream_pages(self, sql_query, batch_size=None):
+        """Page through a statement, one execute_statement response per page.
+
+        Read-only statements are wrapped in a LIMIT/OFFSET subquery and paged
+        transparently, halving the page size whenever a page exceeds the Data
+        API response limit. Every page carries its own ``columnMetadata``.
+        Other statements are executed once and yield a single response.
+        Without an ORDER BY the database does not guarantee a stable order
+        between pages. Pages use ``record_format``, so with ``"JSON"`` they
+        carry ``formattedRecords`` instead of ``records``.
+        """
+        batch_size = batch_size or self.batch_size
+        sql = sql_query.strip().rstrip(";").strip()
+
+        if not self.PAGEABLE_PATTERN.match(sql):
+            yield self._execute_statement(sql, self.record_format)
+            return
+
+        offset = 0
+        while True:
+            paged_sql = (
+                f"SELECT * FROM ({sql}) AS _page LIMIT {batch_size} OFFSET {offset}"
+            )
+            try:
+                response = self._execute_statement(paged_sql, self.record_format)
+            except self.client.exceptions.BadRequestException as e:
+                if self.RESPONSE_TOO_LARGE in str(e) and batch_size > 1:
+                    batch_size = max(1, batch_size // 2)
+                    continue
+                if offset == 0:
+                    # The statement could not be wrapped; run it as written
+                    yield self._execute_statement(sql, self.record_format)
+                    return
+                raise
+
+            # Counting JSON records parses them here, on the fetching thread
+            count = value_decoder.record_count(response)
+            yield response
+
+            if count < batch_size:
+                return
+            offset += count
+
+    def execute_page(self, sql_query):
+        """Run a statement that limits its own rows as a single page.
+
+        Unlike ``stream_query`` the statement is not wrapped, so its ORDER BY
+        decides the order of the rows. The response uses ``record_format``.
+        """
+        return self._execute_statement(sql_query, self.record_format)
+
+    def is_response_too_large(self, error):
+        """Whether an error is the Data API rejecting an oversized response"""
+        return isinstance(
+            error, self.client.exceptions.BadRequestException
+        ) and self.RESPONSE_TOO_LARGE in str(error)
+
+    def _cursor_pages(self, sql_query, batch_size=None):
+        """Page through a read-only statement with a server-side cursor.
+
+        The statement runs once, declared as a cursor in a Data API
+        transaction, and each page is a FETCH from it, so the pages share
+        one snapshot and row order and no page runs the statement again.
+        The transaction only reads and is rolled back once the pages are
+        read or the generator is closed. A page over the response limit is
+        fetched again with half the rows after moving the cursor back.
+        Statements that cannot be declared as a cursor run once as written.
+        """
+        batch_size = batch_size or self.batch_size
+        sql = sql_query.strip().rstrip(";").strip()
+        if not self.PAGEABLE_PATTERN.match(sql):
+            yield self._execute_statement(sql, self.record_format)
+            return
+
+        transaction_id = self.begin_transaction()
+        try:
+            # SCROLL allows moving back after a rejected page
+            self._execute_statement(
+                f"DECLARE _pages SCROLL CURSOR FOR {sql}",
+                transaction_id=transaction_id,
+                read_only=True,
+            )
+        except self.client.exceptions.BadRequestException:
+            self.rollback_transaction(transaction_id)
+            # The statement could not be declared as a cursor; run it as written
+            yield self._execute_statement(sql, self.record_format)
+            return
+
+        try:
+            position = 0
+            while True:
+                try:
+                    response = self._execute_statement(
+                        f"FETCH FORWARD {batch_size} FROM _pages",
+                        self.record_format,
+                        transaction_id,
+                        read_only=True,
+                    )
+                except self.client.exceptions.BadRequestException as e:
+                    if self.RESPONSE_TOO_LARGE not in str(e) or batch_size == 1:
+                        raise
+                    # The rejected rows were fetched all the same
+                    batch_size = max(1, batch_size // 2)
+                    self._execute_statement(
+                        f"MOVE ABSOLUTE {position} IN _pages",
+                        transaction_id=transaction_id,
+                        read_only=True,
+                    )
+                    continue
+
+                count = value_decoder.record_count(response)
+                yield response
+                if count < batch_size:
+                    return
+                position += count
+        finally:
+            self.rollback_transaction(transaction_id)
+
+    def fetch_rows(self, sql_query, use_cache=False):
+        """Run a query to completion and return its rows as decoded values"""
+        result = None
+        for page in self.stream_query(sql_query, use_cache=use_cache, exact=True):
+            if result is None:
+                result = ColumnarResult.from_response(page)
+            else:
+                result.extend(page)
+        return result.rows() if result is not None else []
+
     def list_tables(self):
         """List all tables in the database"""
         sql_query = """
-        SELECT table_name 
-        FROM information_schema.tables 
+        SELECT table_name
+        FROM information_schema.tables
         WHERE table_schema = 'public'
         ORDER by table_name asc
         """
@@ -0,0 +1,125 @@
+"""Compare decoding the Data API's typed field records with formatRecordsAs=JSON.
+
+Both wire formats are generated for the same synthetic result, parsed the way
+botocore would parse them and decoded into a ColumnarResult, so the cheaper
+format for big reads can be chosen with RECORD_FORMAT.
+
+    python benchmarks/bench_decoding.py --rows 20000 --repeat 5
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar_result import ColumnarResult  # noqa: E402
+import value_decoder  # noqa: E402
+
+COLUMNS = [
+    {"name": "id", "typeName": "int8"},
+    {"name": "price", "typeName": "numeric"},
+    {"name": "ratio", "typeName": "float8"},
+    {"name": "active", "typeName": "bool"},
+    {"name": "name", "typeName": "text"},
+    {"name": "created_at", "typeName": "timestamp"},
+    {"name": "payload", "typeName": "bytea"},
+]
+
+
+def make_rows(num_rows):
+    """Synthetic rows as plain values, every seventh cell null"""
+    rows = []
+    for i in range(num_rows):
+        row = [
+            i,
+            f"{i * 1.25:.2f}",
+            i / 7,
+            i % 2 == 0,
+            f"name-{i}",
+            f"2024-01-{i % 28 + 1:02d} 12:00:00",
+            base64.b64encode(i.to_bytes(8, "little")).decode(),
+        ]
+        row[i % 7] = None
+        rows.append(row)
+    return rows
+
+
+def field_wire(rows):
+    kinds = [
+        "longValue",
+        "stringValue",
+        "doubleValue",
+        "booleanValue",
+        "stringValue",
+        "stringValue",
+        "blobValue",
+    ]
+    records = [
+        [{"isNull": True} if v is None else {k: v} for k, v in zip(kinds, row)]
+        for row in rows
+    ]
+    return json.dumps({"columnMetadata": COLUMNS, "records": records})
+
+
+def json_wire(rows):
+    names = [col["name"] for col in COLUMNS]
+    formatted = json.dumps([dict(zip(names, row)) for row in rows])
+    return json.dumps({"columnMetadata": COLUMNS, "formattedRecords": formatted})
+
+
+def parse_field_wire(wire):
+    response = json.loads(wire)
+    # botocore decodes blob fields from base64 while parsing the response
+    for record in response["records"]:
+        blob = record[6]
+        if "blobValue" in blob:
+            blob["blobValue"] = base64.b64decode(blob["blobValue"])
+    return response
+
+
+def parse_json_wire(wire):
+    response = json.loads(wire)
+    value_decoder.json_records(response)
+    return response
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    wires = {"NONE": field_wire(rows), "JSON": json_wire(rows)}
+    parsers = {"NONE": parse_field_wire, "JSON": parse_json_wire}
+
+    print(f"{args.rows} rows x {len(COLUMNS)} columns, best of {args.repeat}")
+    for name, wire in wires.items():
+        parse = parsers[name]
+        parse_time = timed(lambda: parse(wire), args.repeat)
+        total_time = timed(
+            lambda: ColumnarResult.from_response(parse(wire)), args.repeat
+        )
+        print(
+            f"{name:5} wire {len(wire) / 1e6:7.2f} MB  "
+            f"parse {parse_time * 1000:8.1f} ms  "
+            f"parse+decode {total_time * 1000:8.1f} ms  "
+            f"{args.rows / total_time:12,.0f} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""A synthetic stand-in for the rds-data service, for benchmarks.
+
+``SyntheticTable`` computes rows from their index, so results of any size
+can be served without holding them in memory. ``FakeRdsDataClient`` answers
+the client calls AuroraDBManager makes, in process, with responses shaped
+like the ones botocore returns. ``FakeRdsDataServer`` serves the same
+responses over the service's REST JSON protocol on localhost, so a real
+boto3 client can be benchmarked including request signing and parsing.
+
+    table = SyntheticTable(rows=100000, columns=12)
+    db = fake_manager(table)                      # in process
+    with FakeRdsDataServer(table) as server:      # real boto3 over HTTP
+        db = fake_manager(table, server.client())
+"""
+
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aurora_db_manager import AuroraDBManager  # noqa: E402
+
+RESOURCE_ARN = "arn:aws:rds:us-east-1:123456789012:cluster:benchmark"
+SECRET_ARN = "arn:aws:secretsmanager:us-east-1:123456789012:secret:benchmark"
+
+# The paging subquery AuroraDBManager wraps read-only statements in
+PAGE_PATTERN = re.compile(r"\bLIMIT\s+(\d+)\s+OFFSET\s+(\d+)\s*$", re.IGNORECASE)
+
+# The server-side cursor statements AuroraDBManager reads exact results with
+DECLARE_PATTERN = re.compile(r"^\s*DECLARE\s+(\w+)\b", re.IGNORECASE)
+FETCH_PATTERN = re.compile(r"^\s*FETCH\s+FORWARD\s+(\d+)\s+FROM\s+(\w+)", re.IGNORECASE)
+MOVE_PATTERN = re.compile(r"^\s*MOVE\s+ABSOLUTE\s+(\d+)\s+IN\s+(\w+)", re.IGNORECASE)
+
+# The message the Data API rejects oversized responses with
+RESPONSE_TOO_LARGE = "Database returned more than the allowed response size limit"
+
+
+def _wire(value):
+    """JSON encoding of the blobs in a response, as the service sends them"""
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    raise TypeError(type(value).__name__)
+
+
+# (typeName, field kind, value of row i) for every kind of field the Data API
+# returns; columns cycle through this list
+FIELD_TYPES = [
+    ("int8", "longValue", lambda i, n: i),
+    ("text", "stringValue", lambda i, n: f"name-{i}"),
+    ("float8", "doubleValue", lambda i, n: i / 7),
+    ("bool", "booleanValue", lambda i, n: i % 2 == 0),
+    ("numeric", "stringValue", lambda i, n: f"{i * 1.25:.2f}"),
+    ("timestamp", "stringValue", lambda i, n: f"2024-01-{i % 28 + 1:02d} 12:00:00"),
+    ("bytea", "blobValue", lambda i, n: (i.to_bytes(8, "little") * n)[:n]),
+    ("int4", "longValue", lambda i, n: i % 100000),
+    ("date", "stringValue", lambda i, n: f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}"),
+    ("uuid", "stringValue", lambda i, n: str(uuid.UUID(int=i))),
+    ("jsonb", "stringValue", lambda i, n: json.dumps({"id": i, "tags": ["a", "b"]})),
+    ("_int4", "arrayValue", lambda i, n: {"longValues": [i, i + 1, i + 2]}),
+    ("time", "stringValue", lambda i, n: f"{i % 24:02d}:{i % 60:02d}:00"),
+    ("varchar", "stringValue", lambda i, n: f"value {i} " * 3),
+    ("_text", "arrayValue", lambda i, n: {"stringValues": [f"t{i}", f"u{i}"]}),
+]
+
+
+class SyntheticTable:
+    """``rows`` x ``columns`` of generated values.
+
+    Every ``null_every``-th cell is null, staggered across columns, and
+    blobs are ``blob_size`` bytes long.
+    """
+
+    def __init__(
+        self, rows=10000, columns=len(FIELD_TYPES), null_every=7, blob_size=32
+    ):
+        self.rows = rows
+        self.blob_size = blob_size
+        self.null_every = null_every
+        self.types = [FIELD_TYPES[c % len(FIELD_TYPES)] for c in range(columns)]
+        self.column_metadata = [
+            {"name": f"{type_name.strip('_')}_{c}", "typeName": type_name}
+            for c, (type_name, _, _) in enumerate(self.types)
+        ]
+
+    def _is_null(self, row, column):
+        return self.null_every and (row + column) % self.null_every == 0
+
+    def records(self, start, stop):
+        """Typed field records of rows ``start`` to ``stop``"""
+        n = self.blob_size
+        return [
+            [
+                {"isNull": True} if self._is_null(i, c) else {kind: value(i, n)}
+                for c, (_, kind, value) in enumerate(self.types)
+            ]
+            for i in range(start, min(stop, self.rows))
+        ]
+
+    def formatted_records(self, start, stop):
+        """The same rows as ``formatRecordsAs=JSON`` returns them"""
+        names = [column["name"] for column in self.column_metadata]
+        n = self.blob_size
+        rows = []
+        for i in range(start, min(stop, self.rows)):
+            row = {}
+            for c, (name, (_, kind, value)) in enumerate(zip(names, self.types)):
+                if self._is_null(i, c):
+                    row[name] = None
+                    continue
+                v = value(i, n)
+                if kind == "blobValue":
+                    v = base64.b64encode(v).decode()
+                elif kind == "arrayValue":
+                    v = next(iter(v.values()))
+                row[name] = v
+            rows.append(row)
+        return json.dumps(rows)
+
+    def response(self, sql, format_records_as=None, rows=None):
+        """The execute_statement response for a statement.
+
+        ``rows`` is a (start, stop) range to return instead of the one the
+        statement's LIMIT and OFFSET select, e.g. for a cursor FETCH.
+        """
+        if rows is not None:
+            start, stop = rows
+        elif not sql.lstrip().lower().startswith(("select", "with", "values")):
+            return {"numberOfRecordsUpdated": 1, "generatedFields": []}
+        else:
+            match = PAGE_PATTERN.search(sql)
+            start, stop = 0, self.rows
+            if match:
+                limit, offset = int(match.group(1)), int(match.group(2))
+                start, stop = offset, offset + limit
+
+        response = {
+            "columnMetadata": self.column_metadata,
+            "numberOfRecordsUpdated": 0,
+        }
+        if format_records_as == "JSON":
+            response["formattedRecords"] = self.formatted_records(start, stop)
+        else:
+            response["records"] = self.records(start, stop)
+        return response
+
+
+class BadRequestException(Exception):
+    pass
+
+
+class _Exceptions:
+    BadRequestException = BadRequestException
+
+
+class FakeRdsDataClient:
+    """In-process client answering the calls AuroraDBManager makes.
+
+    ``latency`` seconds are slept on every call to stand in for the network.
+    With ``max_response_bytes`` set, responses whose JSON would be larger
+    are rejected like the Data API does.
+    """
+
+    exceptions = _Exceptions
+
+    def __init__(self, table, latency=0.0, max_response_bytes=None):
+        self.table = table
+        self.latency = latency
+        self.max_response_bytes = max_response_bytes
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.cursors = {}  # (transactionId, cursor name) -> rows fetched
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def execute_statement(self, sql, formatRecordsAs=None, **kwargs):
+        self._call()
+        response = self._cursor_statement(sql, formatRecordsAs, kwargs)
+        if response is None:
+            response = self.table.response(sql, formatRecordsAs)
+        if self.max_response_bytes is not None:
+            if len(json.dumps(response, default=_wire)) > self.max_response_bytes:
+                raise BadRequestException(RESPONSE_TOO_LARGE)
+        return response
+
+    def _cursor_statement(self, sql, format_records_as, kwargs):
+        """Response to DECLARE, FETCH or MOVE of a cursor, else None"""
+        transaction = kwargs.get("transactionId")
+        match = DECLARE_PATTERN.match(sql)
+        if match:
+            self.cursors[transaction, match.group(1)] = 0
+            return {"numberOfRecordsUpdated": 0}
+        match = MOVE_PATTERN.match(sql)
+        if match:
+            self.cursors[transaction, match.group(2)] = int(match.group(1))
+            return {"numberOfRecordsUpdated": 0}
+        match = FETCH_PATTERN.match(sql)
+        if match:
+            key = transaction, match.group(2)
+            start = self.cursors[key]
+            stop = min(start + int(match.group(1)), self.table.rows)
+            # Like PostgreSQL, the rows count as fetched even when the
+            # response is then rejected as too large
+            self.cursors[key] = stop
+            return self.table.response(sql, format_records_as, (start, stop))
+        return None
+
+    def _end_transaction(self, transaction):
+        for key in [key for key in self.cursors if key[0] == transaction]:
+            del self.cursors[key]
+
+    def batch_execute_statement(self, parameterSets=(), **kwargs):
+        self._call()
+        return {"updateResults": [{"generatedFields": []} for _ in parameterSets]}
+
+    def begin_transaction(self, **kwargs):
+        self._call()
+        return {"transactionId": uuid.uuid4().hex}
+
+    def commit_transaction(self, **kwargs):
+        self._call()
+        self._end_transaction(kwargs.get("transactionId"))
+        return {"transactionStatus": "Transaction Committed"}
+
+    def rollback_transaction(self, **kwargs):
+        self._call()
+        self._end_transaction(kwargs.get("transactionId"))
+        return {"transactionStatus": "Rollback Complete"}
+
+
+class FakeRdsDataServer:
+    """The rds-data REST JSON API on localhost, backed by a FakeRdsDataClient"""
+
+    PATHS = {
+        "/Execute": "execute_statement",
+        "/BatchExecute": "batch_execute_statement",
+        "/BeginTransaction": "begin_transaction",
+        "/CommitTransaction": "commit_transaction",
+        "/RollbackTransaction": "rollback_transaction",
+    }
+
+    def __init__(self, table, latency=0.0, max_response_bytes=None):
+        self.backend = FakeRdsDataClient(table, latency, max_response_bytes)
+        backend, paths = self.backend, self.PATHS
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                error = None
+                try:
+                    body = getattr(backend, paths[self.path])(**request)
+                except BadRequestException as e:
+                    body, error = {"message": str(e)}, "BadRequestException"
+                payload = json.dumps(body, default=_wire).encode()
+                self.send_response(200 if error is None else 400)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if error is not None:
+                    self.send_header("x-amzn-ErrorType", error)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client(self):
+        """A boto3 rds-data client pointed at this server"""
+        import boto3
+
+        return boto3.client(
+            "rds-data",
+            endpoint_url=self.endpoint_url,
+            region_name="us-east-1",
+            aws_access_key_id="benchmark",
+            aws_secret_access_key="benchmark",
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def fake_manager(table, client=None, **kwargs):
+    """An AuroraDBManager whose client is a fake, in process by default"""
+    db = AuroraDBManager(
+        "benchmark",
+        RESOURCE_ARN,
+        SECRET_ARN,
+        **kwargs,
+    )
+    db._client = client if client is not None else FakeRdsDataClient(table)
+    return db
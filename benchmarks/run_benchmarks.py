@@ -0,0 +1,380 @@
+"""Benchmark suite for the client, run against a synthetic rds-data backend.
+
+Every benchmark is timed ``--repeat`` times and reported with its best and
+median time and, where it processes rows, its throughput. ``--output``
+writes the results as JSON together with the commit, Python version and
+parameters, and ``--compare`` prints the change against such a file, so
+runs on two commits can be compared:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    git checkout other-branch
+    python benchmarks/run_benchmarks.py --compare before.json
+
+Benchmarks that need a display (Tk rendering) or boto3 (the HTTP backend)
+are reported as skipped when those are not available.
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from columnar_result import ColumnarResult  # noqa: E402
+from fake_rds_data import FakeRdsDataServer, SyntheticTable, fake_manager  # noqa: E402
+from query_executor import QueryTiming  # noqa: E402
+from query_history import QueryHistory  # noqa: E402
+from query_mapper import QueryMapper  # noqa: E402
+from result_store import ResultStore  # noqa: E402
+
+BENCHMARKS = {}
+
+
+class Skipped(Exception):
+    """Raised by a benchmark that cannot run here"""
+
+
+def benchmark(name):
+    """Register ``func(args)``, which returns ``(run, items)``.
+
+    ``run`` is the callable that is timed and ``items`` the number of rows
+    or calls it processes, or None.
+    """
+
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def _table(args):
+    return SyntheticTable(
+        rows=args.rows,
+        columns=args.columns,
+        null_every=args.null_every,
+        blob_size=args.blob_size,
+    )
+
+
+@benchmark("decode.records")
+def bench_decode_records(args):
+    response = _table(args).response("SELECT 1")
+    return lambda: ColumnarResult.from_response(response), args.rows
+
+
+@benchmark("decode.json")
+def bench_decode_json(args):
+    response = _table(args).response("SELECT 1", "JSON")
+    # The parsed records are memoized on the response, so each run gets a copy
+    return lambda: ColumnarResult.from_response(dict(response)), args.rows
+
+
+@benchmark("mapper.format_query_results")
+def bench_format_query_results(args):
+    response = _table(args).response("SELECT 1")
+    mapper = QueryMapper()
+    return lambda: mapper.format_query_results(response), args.rows
+
+
+@benchmark("stream.in_process")
+def bench_stream_in_process(args):
+    db = fake_manager(_table(args), batch_size=args.page_size)
+    return lambda: db.fetch_rows("SELECT * FROM bench"), args.rows
+
+
+@benchmark("stream.http")
+def bench_stream_http(args):
+    try:
+        import boto3  # noqa: F401
+    except ImportError:
+        raise Skipped("boto3 is not installed")
+    table = _table(args)
+    server = FakeRdsDataServer(table).__enter__()
+    args.cleanup.append(lambda: server.__exit__(None, None, None))
+    db = fake_manager(table, server.client(), batch_size=args.page_size)
+    return lambda: db.fetch_rows("SELECT * FROM bench"), args.rows
+
+
+def _store(args):
+    result = ColumnarResult.from_response(_table(args).response("SELECT 1"))
+    store = ResultStore.from_result(result)
+    args.cleanup.append(store.close)
+    return store
+
+
+@benchmark("store.spill")
+def bench_store_spill(args):
+    result = ColumnarResult.from_response(_table(args).response("SELECT 1"))
+    return lambda: ResultStore.from_result(result).close(), args.rows
+
+
+@benchmark("store.sort")
+def bench_store_sort(args):
+    store = _store(args)
+    store.sort_indices(1)  # Build the index outside the timed runs
+    return lambda: store.sort_indices(1, descending=True), args.rows
+
+
+@benchmark("store.filter")
+def bench_store_filter(args):
+    store = _store(args)
+    name = store.column_names[0]
+    return lambda: store.select(f'"{name}" % 3 = 0', 1), args.rows
+
+
+def _history(args, rows=0):
+    """A QueryHistory in a temporary directory holding ``rows`` queries"""
+    directory = tempfile.mkdtemp(prefix="bench-history-")
+    history = QueryHistory(os.path.join(directory, "history.db"))
+    args.cleanup.append(lambda: shutil.rmtree(directory, ignore_errors=True))
+    args.cleanup.append(history.close)
+    _add_queries(history, rows)
+    history.flush()
+    return history
+
+
+def _add_queries(history, count):
+    timing = QueryTiming()
+    timing.request, timing.decode, timing.response_bytes = 0.05, 0.01, 4096
+    for i in range(count):
+        history.add_query(
+            f"SELECT * FROM orders_{i % 50} WHERE id = {i}",
+            0.01 * (i % 100),
+            i % 10 != 0,
+            i % 1000,
+            timing,
+        )
+
+
+@benchmark("history.insert")
+def bench_history_insert(args):
+    history = _history(args)
+
+    def run():
+        _add_queries(history, args.history_rows)
+        history.flush()
+
+    return run, args.history_rows
+
+
+@benchmark("history.page")
+def bench_history_page(args):
+    history = _history(args, args.history_rows)
+
+    def run():
+        # Walk back through the whole history a page at a time
+        rows = history.get_query_history(100)
+        while rows:
+            rows = history.get_query_history(100, before_id=rows[-1][0])
+
+    return run, args.history_rows
+
+
+@benchmark("history.search")
+def bench_history_search(args):
+    history = _history(args, args.history_rows)
+    queries = [f"orders_{i}" for i in range(50)]
+    return lambda: [history.search(q, 100) for q in queries], len(queries)
+
+
+@benchmark("history.latency_stats")
+def bench_history_latency_stats(args):
+    history = _history(args, args.history_rows)
+    return history.latency_stats, args.history_rows
+
+
+@benchmark("render.grid")
+def bench_render_grid(args):
+    try:
+        import tkinter as tk
+
+        root = tk.Tk()
+    except Exception as e:  # No display, or Tk is missing altogether
+        raise Skipped(f"Tk is not available: {e}")
+    args.cleanup.append(root.destroy)
+    root.geometry("1200x600")
+
+    from results_grid import ResultsGrid
+
+    grid = ResultsGrid(root)
+    grid.pack(fill=tk.BOTH, expand=True)
+    root.update()
+    result = ColumnarResult.from_response(_table(args).response("SELECT 1"))
+    headers = QueryMapper().format_headers(result)
+    steps = 50
+
+    def run():
+        # Show the result, then page down through it drawing every screen
+        grid.set_result(result, headers)
+        grid.update_idletasks()
+        for _ in range(steps):
+            grid.yview("scroll", 1, "pages")
+            grid.update_idletasks()
+
+    return run, steps + 1
+
+
+def _import_time(module):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+    )
+    return time.perf_counter() - start
+
+
+@benchmark("startup.import_gui")
+def bench_startup_gui(args):
+    try:
+        _import_time("main")
+    except subprocess.CalledProcessError as e:
+        raise Skipped(e.stderr.decode().strip().splitlines()[-1])
+    return lambda: _import_time("main"), None
+
+
+@benchmark("startup.import_cli")
+def bench_startup_cli(args):
+    try:
+        _import_time("cli")
+    except subprocess.CalledProcessError as e:
+        raise Skipped(e.stderr.decode().strip().splitlines()[-1])
+    return lambda: _import_time("cli"), None
+
+
+def measure(func, args):
+    """Time one benchmark and return its result entry"""
+    try:
+        run, items = func(args)
+    except Skipped as e:
+        return {"skipped": str(e)}
+
+    for _ in range(args.warmup):
+        run()
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    entry = {
+        "best": min(times),
+        "median": statistics.median(times),
+        "times": times,
+        "items": items,
+    }
+    if items:
+        entry["items_per_second"] = items / entry["median"]
+    return entry
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    baseline = (baseline or {}).get("results", {})
+    for name, entry in results.items():
+        if "skipped" in entry:
+            print(f"{name:30} skipped: {entry['skipped']}")
+            continue
+        line = f"{name:30} {entry['median'] * 1000:10.2f} ms"
+        if entry.get("items_per_second"):
+            line += f" {entry['items_per_second']:14,.0f} /s"
+        else:
+            line += " " * 17
+        before = baseline.get(name, {})
+        if "median" in before:
+            change = entry["median"] / before["median"] - 1
+            line += f"  {change:+7.1%} vs {before['median'] * 1000:.2f} ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=15)
+    parser.add_argument("--null-every", type=int, default=7)
+    parser.add_argument("--blob-size", type=int, default=32)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--history-rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument(
+        "--only", action="append", help="Run benchmarks matching a glob pattern"
+    )
+    parser.add_argument("--output", help="Write the results to a JSON file")
+    parser.add_argument("--compare", help="JSON results to compare against")
+    args = parser.parse_args()
+
+    names = [
+        name
+        for name in BENCHMARKS
+        if not args.only or any(fnmatch.fnmatch(name, p) for p in args.only)
+    ]
+    parameters = {
+        key: getattr(args, key)
+        for key in (
+            "rows",
+            "columns",
+            "null_every",
+            "blob_size",
+            "page_size",
+            "history_rows",
+            "repeat",
+            "warmup",
+        )
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != parameters:
+            print("warning: the baseline was run with different parameters")
+
+    results = {}
+    for name in names:
+        args.cleanup = []
+        try:
+            results[name] = measure(BENCHMARKS[name], args)
+        finally:
+            for cleanup in reversed(args.cleanup):
+                cleanup()
+
+    print_results(results, baseline)
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import base64
+import csv
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from query_executor import is_throttling_error
+from schema_cache import quote_identifier
+
+# information_schema data types and the Data API field each is sent as
+LONG_TYPES = {"smallint", "integer", "bigint", "int", "tinyint", "mediumint"}
+DOUBLE_TYPES = {"real", "double precision", "float", "double"}
+BOOLEAN_TYPES = {"boolean", "bool"}
+BLOB_TYPES = {"bytea", "blob", "binary", "varbinary"}
+
+# String-carried types that need a typeHint to be cast on the server
+TYPE_HINTS = {
+    "numeric": "DECIMAL",
+    "decimal": "DECIMAL",
+    "money": "DECIMAL",
+    "date": "DATE",
+    "time without time zone": "TIME",
+    "time": "TIME",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMP",
+    "timestamp": "TIMESTAMP",
+    "datetime": "TIMESTAMP",
+    "json": "JSON",
+    "jsonb": "JSON",
+    "uuid": "UUID",
+}
+
+TEXT_TYPES = {"text", "character varying", "character", "varchar", "char"}
+
+# Estimated request bytes per parameter on top of its value
+PARAMETER_OVERHEAD = 48
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "t", "true", "y", "yes")
+    return bool(value)
+
+
+def _to_blob(value):
+    if isinstance(value, str):
+        # Text files carry binary data base64 encoded
+        return base64.b64decode(value)
+    return bytes(value)
+
+
+def _to_text(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def is_retryable(error):
+    """Whether a failed chunk can be sent again without inserting it twice.
+
+    Throttled requests and connections that were never established did not
+    reach the database; anything else, including read timeouts, may have.
+    """
+    if is_throttling_error(error):
+        return True
+    try:
+        from botocore.exceptions import ConnectTimeoutError, EndpointConnectionError
+    except ImportError:
+        return False
+    return isinstance(error, (ConnectTimeoutError, EndpointConnectionError))
+
+
+class ImportColumn:
+    """How one source column is sent as a Data API parameter"""
+
+    def __init__(self, source, target, data_type, index):
+        self.source = source
+        self.target = target
+        self.data_type = data_type
+        self.name = f"c{index}"  # Placeholder name in the INSERT statement
+        self.type_hint = TYPE_HINTS.get(data_type)
+        if data_type in LONG_TYPES:
+            self.kind, self.convert = "longValue", int
+        elif data_type in DOUBLE_TYPES:
+            self.kind, self.convert = "doubleValue", float
+        elif data_type in BOOLEAN_TYPES:
+            self.kind, self.convert = "booleanValue", _to_bool
+        elif data_type in BLOB_TYPES:
+            self.kind, self.convert = "blobValue", _to_blob
+        else:
+            self.kind, self.convert = "stringValue", _to_text
+
+    def parameter(self, value):
+        """Return (parameter, estimated size in bytes) for a source value"""
+        # CSV has no nulls; an empty field only stays text in text columns
+        if value is None or (value == "" and self.data_type not in TEXT_TYPES):
+            return {"name": self.name, "value": {"isNull": True}}, PARAMETER_OVERHEAD
+
+        value = self.convert(value)
+        if self.type_hint == "TIMESTAMP":
+            # The Data API expects a space between the date and the time
+            value = value.replace("T", " ", 1)
+        parameter = {"name": self.name, "value": {self.kind: value}}
+        if self.type_hint is not None:
+            parameter["typeHint"] = self.type_hint
+
+        if self.kind == "blobValue":
+            size = len(value) * 4 // 3  # Sent base64 encoded
+        elif self.kind == "stringValue":
+            size = len(value.encode())
+        else:
+            size = 8
+        return parameter, size + PARAMETER_OVERHEAD
+
+
+class ImportProgress:
+    """Counters of a running import, safe to read from the Tk thread"""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.retries = 0
+        self.failed_rows = 0
+        self.errors = []
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add(self, rows, size):
+        with self._lock:
+            self.rows += rows
+            self.bytes += size
+            self.chunks += 1
+
+    def retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def fail(self, rows, error):
+        with self._lock:
+            self.failed_rows += rows
+            self.errors.append(error)
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / 1e6 / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        text = (
+            f"{self.rows} rows, {self.bytes / 1e6:.1f} MB in {self.elapsed:.1f}s "
+            f"({self.rows_per_second:,.0f} rows/s, {self.mb_per_second:.2f} MB/s)"
+        )
+        if self.failed_rows:
+            text += f", {self.failed_rows} rows failed"
+        return text
+
+
+def read_rows(path):
+    """Yield rows of a CSV or JSONL file, without loading it whole.
+
+    CSV rows are dicts; JSONL lines are yielded as text for ``parse_row``,
+    so a malformed line fails only its own row.
+    """
+    if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def parse_row(row):
+    """A row of ``read_rows`` as a dict; raises ValueError for a bad line"""
+    if isinstance(row, str):
+        row = json.loads(row)
+        if not isinstance(row, dict):
+            raise ValueError(f"expected a JSON object, not {type(row).__name__}")
+    return row
+
+
+class BulkImporter:
+    """Load rows into a table through ``batch_execute_statement``.
+
+    Source fields are matched to the table's cached columns by name, case
+    insensitively; columns the file lacks are left to their defaults. Rows
+    are grouped into chunks bounded by ``max_rows`` and by an estimated
+    request size kept below the Data API's 4 MiB request limit, and up to
+    ``concurrency`` chunks are in flight at once. A chunk that was throttled
+    or could not connect is retried with exponential backoff; other errors,
+    such as constraint violations or timeouts after the request was sent,
+    fail the chunk at once so no row is inserted twice.
+    """
+
+    # The Data API rejects requests above 4 MiB; leave room for the envelope
+    MAX_CHUNK_BYTES = 3 * 1024 * 1024
+
+    def __init__(
+        self,
+        db,
+        table,
+        concurrency=4,
+        max_rows=1000,
+        max_bytes=MAX_CHUNK_BYTES,
+        retries=3,
+        backoff=0.5,
+    ):
+        self.db = db
+        self.table = table  # TableInfo from the SchemaCache
+        self.concurrency = max(1, concurrency)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.progress = ImportProgress()
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop reading the file; chunks already sent still finish"""
+        self.cancelled = True
+
+    def map_columns(self, fields):
+        """Pair source fields with table columns by name"""
+        columns = {
+            name.lower(): (name, data_type) for name, data_type, _ in self.table.columns
+        }
+        mapped = []
+        for field in fields:
+            match = columns.get(field.strip().lower())
+            if match is not None:
+                mapped.append(ImportColumn(field, match[0], match[1], len(mapped)))
+        if not mapped:
+            raise ValueError(
+                f"No column of the file matches a column of {self.table.display_name}"
+            )
+        return mapped
+
+    def insert_sql(self, columns):
+        names = ", ".join(quote_identifier(column.target) for column in columns)
+        values = ", ".join(f":{column.name}" for column in columns)
+        return f"INSERT INTO {self.table.qualified_name} ({names}) VALUES ({values})"
+
+    def chunks(self, rows, columns):
+        """Group rows into parameter sets that fit a single request.
+
+        A row that cannot be parsed, or with a value that cannot be
+        converted to its column's type, is recorded as failed in the
+        progress and skipped.
+        """
+        chunk, size = [], 0
+        for number, row in enumerate(rows, 1):
+            parameters, row_size = [], 0
+            column = None
+            try:
+                row = parse_row(row)
+                for column in columns:
+                    parameter, parameter_size = column.parameter(row.get(column.source))
+                    parameters.append(parameter)
+                    row_size += parameter_size
+            except (ValueError, TypeError, OverflowError) as e:
+                where = f"Row {number}"
+                if column is not None:
+                    where += f", column {column.source}"
+                self.progress.fail(1, ValueError(f"{where}: {e}"))
+                continue
+
+            if chunk and (
+                len(chunk) >= self.max_rows or size + row_size > self.max_bytes
+            ):
+                yield chunk, size
+                chunk, size = [], 0
+            chunk.append(parameters)
+            size += row_size
+        if chunk:
+            yield chunk, size
+
+    def run(self, path):
+        """Import a file and return the ImportProgress; blocks until done"""
+        rows = read_rows(path)
+        # Columns are matched on the fields of the first row that parses;
+        # rows before it are failed by chunks like any other bad row
+        leading, fields = [], None
+        for row in rows:
+            leading.append(row)
+            try:
+                fields = parse_row(row)
+                break
+            except ValueError:
+                continue
+        if fields is None:
+            if leading:
+                self.progress.fail(
+                    len(leading), ValueError("No row of the file could be parsed")
+                )
+            self.progress.finished_at = time.time()
+            return self.progress
+
+        columns = self.map_columns(fields)
+        sql = self.insert_sql(columns)
+
+        def all_rows():
+            yield from leading
+            yield from rows
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            in_flight = set()
+            for chunk, size in self.chunks(all_rows(), columns):
+                if self.cancelled:
+                    break
+                # Bound the chunks held in memory to a couple per worker
+                if len(in_flight) >= 2 * self.concurrency:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(pool.submit(self._send, sql, chunk, size))
+            wait(in_flight)
+
+        self.progress.finished_at = time.time()
+        return self.progress
+
+    def _send(self, sql, chunk, size):
+        for attempt in range(self.retries + 1):
+            try:
+                self.db.batch_execute(sql, chunk)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    self.progress.fail(len(chunk), e)
+                    return
+                self.progress.retry()
+                time.sleep(self.backoff * 2**attempt)
+            else:
+                self.progress.add(len(chunk), size)
+                return
@@ -0,0 +1,295 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import time
+
+from columnar_result import ColumnarResult
+from connection_manager import ConnectionManager
+from db_config import DBConfiguration
+from query_executor import QueryTiming, cluster_limit, is_throttling_error
+from query_history import QueryHistory
+from query_mapper import QueryMapper
+from result_export import CsvWriter, JsonLinesWriter
+from script_runner import ScriptRun, StatementResult
+import sql_text
+import value_decoder
+
+
+class TableWriter:
+    """Aligned text table in the layout of the GUI's text results"""
+
+    def __init__(self, f, names, type_names, mapper=None):
+        self.f = f
+        self.mapper = mapper or QueryMapper()
+        self.widths = None
+
+    def write(self, result):
+        texts = [column.display_values() for column in result.columns]
+        if self.widths is None:
+            # Later pages reuse the widths of the first one
+            headers = self.mapper.format_headers(result)
+            self.widths = self.mapper.column_widths(headers, texts)
+            header_row = " | ".join(h.ljust(w) for h, w in zip(headers, self.widths))
+            self.f.write(f"{header_row}\n{'-' * len(header_row)}\n")
+        for line in self.mapper.format_rows(texts, self.widths):
+            self.f.write(line)
+            self.f.write("\n")
+
+    def close(self):
+        pass
+
+
+WRITERS = {"table": TableWriter, "csv": CsvWriter, "jsonl": JsonLinesWriter}
+
+
+class BatchRunner:
+    """Run statements without a GUI and stream their results to a file.
+
+    Statements run in order. Each result is written page by page as
+    ``stream_query`` returns them. With ``parallel`` above one, consecutive
+    read-only statements are fetched concurrently, limited by the cluster's
+    AdaptiveLimit like Run Parallel in the GUI, and written in script order
+    as each one completes. A statement that writes waits for everything
+    before it to finish. Every statement is recorded in the query history
+    when one is given.
+    """
+
+    def __init__(
+        self,
+        db,
+        out=sys.stdout,
+        file_format="table",
+        parallel=1,
+        timeout=None,
+        continue_on_error=False,
+        history=None,
+        log=sys.stderr,
+    ):
+        self.db = db
+        self.out = out
+        self.file_format = file_format
+        self.writer_class = WRITERS[file_format]
+        self.parallel = max(1, parallel)
+        self.timeout = timeout
+        self.continue_on_error = continue_on_error
+        self.history = history
+        self.log = log
+        self.limit = cluster_limit(db.resource_arn, self.parallel)
+        self.result_sets = 0
+
+    def run(self, statements):
+        """Execute the statements and return a ScriptRun"""
+        run = ScriptRun(statements)
+        run.outcome = ScriptRun.AUTOCOMMIT
+        results = run.results
+        for result in results:
+            result.timing = QueryTiming()
+        i = 0
+        with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+            while i < len(results):
+                group = [results[i]]
+                while (
+                    self.parallel > 1
+                    and i + len(group) < len(results)
+                    and sql_text.is_read_only(group[0].sql)
+                    and sql_text.is_read_only(results[i + len(group)].sql)
+                ):
+                    group.append(results[i + len(group)])
+                i += len(group)
+
+                if len(group) == 1:
+                    self._finish(group[0], self._stream(group[0]))
+                else:
+                    futures = [pool.submit(self._fetch, result) for result in group]
+                    for result, future in zip(group, futures):
+                        error = future.exception()
+                        if error is None:
+                            self._write(result, [future.result()])
+                        self._finish(result, error)
+                        if error is not None and not self.continue_on_error:
+                            break
+
+                if run.failed and not self.continue_on_error:
+                    break
+        run.finished_at = time.time()
+        return run
+
+    def _pages(self, result):
+        """Pages of a statement, raising TimeoutError between pages"""
+        start = time.perf_counter()
+        try:
+            for page in result.timing.pages(self.db.stream_query(result.sql)):
+                result.duration = time.perf_counter() - start
+                if self.timeout and result.duration > self.timeout:
+                    raise TimeoutError(f"Query timed out after {self.timeout:g}s")
+                yield page
+        finally:
+            result.duration = time.perf_counter() - start
+
+    def _stream(self, result):
+        """Write a statement's pages as they arrive; returns its error or None"""
+        try:
+            self._write(result, self._pages(result))
+        except Exception as e:
+            return e
+        return None
+
+    def _fetch(self, result):
+        """Worker body: fetch a whole result under the cluster limit"""
+        while True:
+            self.limit.acquire()
+            try:
+                fetched = None
+                for page in self._pages(result):
+                    with result.timing.measure("decode"):
+                        if not value_decoder.has_records(page):
+                            fetched = page
+                        elif fetched is None:
+                            fetched = ColumnarResult.from_response(page)
+                        else:
+                            fetched.extend(page)
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self.limit.release(throttled)
+                if throttled:
+                    time.sleep(self.limit.backoff())
+                    continue
+                raise
+            self.limit.release(throttled=False)
+            return fetched
+
+    def _write(self, result, pages):
+        writer = None
+        for page in pages:
+            if isinstance(page, ColumnarResult):
+                decoded = page
+            elif value_decoder.has_records(page):
+                with result.timing.measure("decode"):
+                    decoded = ColumnarResult.from_response(page)
+            else:
+                result.rows = page.get("numberOfRecordsUpdated", 0)
+                continue
+            if writer is None:
+                # JSONL rows of every result set form one stream
+                if self.result_sets and self.file_format != "jsonl":
+                    self.out.write("\n")
+                self.result_sets += 1
+                writer = self.writer_class(
+                    self.out,
+                    decoded.column_names,
+                    [column.type_name for column in decoded.columns],
+                )
+            with result.timing.measure("format"):
+                writer.write(decoded)
+                self.out.flush()
+            result.rows += len(decoded)
+        if writer is not None:
+            writer.close()
+
+    def _finish(self, result, error):
+        result.status = StatementResult.OK if error is None else StatementResult.FAILED
+        result.error = error
+        if self.history is not None:
+            self.history.add_query(
+                result.sql, result.duration, error is None, result.rows, result.timing
+            )
+        if self.log is not None:
+            status = f"error: {error}" if error is not None else f"{result.rows} rows"
+            print(
+                f"-- statement {result.index}: {status} ({result.duration:.2f}s)",
+                file=self.log,
+            )
+
+
+def read_script(paths):
+    """Text of the SQL files, or of stdin when there are none or one is '-'"""
+    if not paths:
+        return sys.stdin.read()
+    parts = []
+    for path in paths:
+        if path == "-":
+            parts.append(sys.stdin.read())
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                parts.append(f.read())
+    # Files are separate scripts; a missing final semicolon ends the statement
+    return ";\n".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run SQL against the configured Aurora cluster without the GUI"
+    )
+    parser.add_argument("files", nargs="*", help="SQL files to run (default: stdin)")
+    parser.add_argument("-c", "--command", help="SQL to run instead of files")
+    parser.add_argument(
+        "--cluster", help="Named cluster to connect to (default: DEFAULT_CLUSTER)"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=sorted(WRITERS), default="table", dest="file_format"
+    )
+    parser.add_argument("-o", "--output", help="Write results to a file")
+    parser.add_argument(
+        "-p",
+        "--parallel",
+        type=int,
+        help="Read-only statements fetched at once (default: PARALLEL_QUERIES)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, help="Seconds per statement (default: QUERY_TIMEOUT)"
+    )
+    parser.add_argument(
+        "--continue-on-error",
+        action="store_true",
+        help="Keep going after a statement fails",
+    )
+    parser.add_argument(
+        "--no-history", action="store_true", help="Don't record the query history"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Don't report statements on stderr"
+    )
+    args = parser.parse_args(argv)
+
+    config = DBConfiguration()
+    connections = ConnectionManager(
+        config.clusters,
+        batch_size=config.fetch_batch_size,
+        record_format=config.record_format,
+    )
+    cluster = args.cluster or config.default_cluster
+    if cluster not in connections.names:
+        parser.error(f"unknown cluster {cluster!r}, choose from {connections.names}")
+    db = connections.manager(cluster)
+    script = args.command if args.command is not None else read_script(args.files)
+    statements = sql_text.split_statements(script)
+
+    history = None if args.no_history else QueryHistory()
+    out = sys.stdout
+    if args.output:
+        out = open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        runner = BatchRunner(
+            db,
+            out=out,
+            file_format=args.file_format,
+            parallel=args.parallel or connections.profiles[cluster].parallel_queries,
+            timeout=args.timeout if args.timeout is not None else config.query_timeout,
+            continue_on_error=args.continue_on_error,
+            history=history,
+            log=None if args.quiet else sys.stderr,
+        )
+        run = runner.run(statements)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if history is not None:
+            history.close()
+
+    if not args.quiet:
+        print(f"-- {run.summary()}", file=sys.stderr)
+    return 0 if run.succeeded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
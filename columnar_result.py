@@ -0,0 +1,312 @@
+import array
+import functools
+
+import value_decoder
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy, imported on first use since it is slow to import; None if missing"""
+    try:
+        import numpy
+    except ImportError:  # NumPy is optional; typed columns fall back to array.array
+        return None
+    return numpy
+
+
+class Column:
+    """A single decoded column: a typed value array plus a null bitmask.
+
+    Columns whose non-null values are all ``longValue``, ``doubleValue`` or
+    ``booleanValue`` are stored in an ``array.array`` (exposed to NumPy
+    without copying through ``to_numpy``); anything else is kept in a list.
+    Null rows hold a placeholder in the value array and have their bit set in
+    ``nulls``. List columns are decoded through a converter chosen once per
+    column from the field kind and ``typeName``.
+    """
+
+    # Data API field kinds that fit a fixed-width typed array
+    TYPECODES = {"longValue": "q", "doubleValue": "d", "booleanValue": "b"}
+
+    def __init__(self, name, type_name=None):
+        self.name = name
+        self.type_name = type_name
+        self.kind = None  # Field kind shared by every non-null value
+        self.convert = None  # Per-column decoder, None when values are final
+        self.values = []
+        self.nulls = bytearray()
+        self.null_count = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def typed(self):
+        return isinstance(self.values, array.array)
+
+    def is_null(self, index):
+        return bool(self.nulls[index >> 3] & (1 << (index & 7)))
+
+    def value(self, index):
+        """Python value of a row, ``None`` for nulls"""
+        if self.is_null(index):
+            return None
+        value = self.values[index]
+        if self.kind == "booleanValue":
+            return bool(value)
+        return value
+
+    def extend(self, fields):
+        """Append Data API fields in a single pass"""
+        values = self.values
+        nulls = self.nulls
+        kind = self.kind
+        convert = self.convert
+        index = self.length
+
+        for field in fields:
+            if index & 7 == 0:
+                nulls.append(0)
+
+            if "isNull" in field:
+                nulls[index >> 3] |= 1 << (index & 7)
+                self.null_count += 1
+                values.append(0 if self.typed else None)
+            else:
+                if kind is None:
+                    kind = self._set_kind(next(iter(field)))
+                    values = self.values
+                    convert = self.convert
+                try:
+                    raw = field[kind]
+                    values.append(raw if convert is None else convert(raw))
+                except (KeyError, TypeError, OverflowError):
+                    # A value that does not fit the typed array demotes it
+                    self._demote()
+                    values = self.values
+                    values.append(value_decoder.decode_field(field, self.type_name))
+            index += 1
+
+        self.length = index
+
+    def extend_values(self, decoded):
+        """Append values parsed from JSON formatted records, None meaning null"""
+        values = self.values
+        nulls = self.nulls
+        kind = self.kind
+        convert = self.convert
+        index = self.length
+
+        for value in decoded:
+            if index & 7 == 0:
+                nulls.append(0)
+
+            if value is None:
+                nulls[index >> 3] |= 1 << (index & 7)
+                self.null_count += 1
+                values.append(0 if self.typed else None)
+            else:
+                if kind is None:
+                    kind = self._set_kind(self._kind_of(value), from_json=True)
+                    values = self.values
+                    convert = self.convert
+                if convert is not None:
+                    value = convert(value)
+                try:
+                    values.append(value)
+                except (TypeError, OverflowError):
+                    self._demote()
+                    values = self.values
+                    values.append(value)
+            index += 1
+
+        self.length = index
+
+    def display_values(self, null_text="NULL"):
+        """Text of every row, built with one ``str`` call per cell"""
+        if self.kind == "booleanValue":
+            texts = ["True" if v else "False" for v in self.values]
+        elif self.typed:
+            texts = [str(v) for v in self.values]
+        elif self.kind == "stringValue" and self.convert is None:
+            texts = list(self.values)
+        else:
+            format_value = value_decoder.format_value
+            texts = [format_value(v, null_text) for v in self.values]
+
+        if self.null_count:
+            for index in self.null_indices():
+                texts[index] = null_text
+        return texts
+
+    def null_indices(self):
+        if not self.null_count:
+            return []
+        return [i for i in range(self.length) if self.is_null(i)]
+
+    def to_numpy(self):
+        """Zero-copy NumPy view of a typed column, or None"""
+        np = _numpy()
+        if np is None or not self.typed:
+            return None
+        dtype = {"q": np.int64, "d": np.float64, "b": np.bool_}[self.values.typecode]
+        return np.frombuffer(self.values, dtype=dtype)
+
+    def null_mask(self):
+        """Boolean NumPy array marking null rows, or None without NumPy"""
+        np = _numpy()
+        if np is None:
+            return None
+        bits = np.frombuffer(self.nulls, dtype=np.uint8)
+        return np.unpackbits(bits, bitorder="little")[: self.length].astype(bool)
+
+    def sort_indices(self, descending=False):
+        """Row indices ordered by value, nulls always last"""
+        data = self.to_numpy()
+        if data is not None:
+            np = _numpy()
+            order = np.argsort(data, kind="stable")
+            if descending:
+                order = order[::-1]
+            if self.null_count:
+                mask = self.null_mask()[order]
+                order = np.concatenate((order[~mask], order[mask]))
+            return order.tolist()
+
+        null_rows = self.null_indices()
+        if null_rows:
+            null_set = set(null_rows)
+            rows = [i for i in range(self.length) if i not in null_set]
+        else:
+            rows = range(self.length)
+
+        values = self.values
+        try:
+            order = sorted(rows, key=values.__getitem__, reverse=descending)
+        except TypeError:
+            # Mixed value types fall back to comparing their text
+            order = sorted(rows, key=lambda i: str(values[i]), reverse=descending)
+        return order + null_rows
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the column's values and bitmask"""
+        if self.typed:
+            size = self.values.itemsize * len(self.values)
+        else:
+            size = 8 * len(self.values) + sum(
+                len(v) for v in self.values if isinstance(v, (str, bytes))
+            )
+        return size + len(self.nulls)
+
+    @staticmethod
+    def _kind_of(value):
+        """Data API field kind matching a value parsed from JSON"""
+        if isinstance(value, bool):
+            return "booleanValue"
+        if isinstance(value, int):
+            return "longValue"
+        if isinstance(value, float):
+            return "doubleValue"
+        if isinstance(value, str):
+            return "stringValue"
+        return "mixed"
+
+    def _set_kind(self, kind, from_json=False):
+        self.kind = kind
+        if from_json:
+            if kind == "stringValue":
+                self.convert = value_decoder.json_converter(self.type_name)
+        else:
+            self.convert = value_decoder.converter(kind, self.type_name)
+
+        typecode = self.TYPECODES.get(kind)
+        if typecode is not None:
+            # Every value so far was null, so only placeholders need converting
+            self.values = array.array(typecode, [0] * len(self.values))
+        return kind
+
+    def _demote(self):
+        if self.typed:
+            values = self.values.tolist()
+            if self.kind == "booleanValue":
+                values = [bool(v) for v in values]
+            for index in self.null_indices():
+                values[index] = None
+            self.values = values
+        self.kind = "mixed"
+
+
+class ColumnarResult:
+    """A Data API result decoded column by column.
+
+    Streamed pages are appended with ``extend``. The grid, formatter and
+    exporters read cells through ``value`` and whole columns through
+    ``columns`` instead of walking the raw record dictionaries.
+    """
+
+    def __init__(self, column_metadata):
+        self.column_metadata = column_metadata
+        self.columns = [
+            Column(col.get("name") or f"Column {i+1}", col.get("typeName"))
+            for i, col in enumerate(column_metadata)
+        ]
+        self.row_count = 0
+
+    @classmethod
+    def from_response(cls, response):
+        """Decode an ``execute_statement`` response in either record format"""
+        metadata = response.get("columnMetadata")
+        if metadata is None and "formattedRecords" in response:
+            rows = value_decoder.json_records(response)
+            metadata = [{"name": name} for name in (rows[0] if rows else {})]
+        elif metadata is None:
+            records = response.get("records") or []
+            num_columns = len(records[0]) if records else 0
+            metadata = [{"name": f"Column {i+1}"} for i in range(num_columns)]
+
+        result = cls(metadata)
+        result.extend(response)
+        return result
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    def extend(self, response):
+        """Append the records of another page of the same statement"""
+        if "formattedRecords" in response:
+            rows = value_decoder.json_records(response)
+            for column in self.columns:
+                column.extend_values([row.get(column.name) for row in rows])
+            self.row_count += len(rows)
+            return
+
+        records = response.get("records") or []
+        if not records:
+            return
+
+        for i, column in enumerate(self.columns):
+            column.extend([record[i] for record in records])
+        self.row_count += len(records)
+
+    def value(self, row, column):
+        return self.columns[column].value(row)
+
+    def row(self, index):
+        return [column.value(index) for column in self.columns]
+
+    def rows(self, start=0, stop=None):
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        return [self.row(i) for i in range(start, stop)]
+
+    def sort_indices(self, column, descending=False):
+        return self.columns[column].sort_indices(descending)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns)
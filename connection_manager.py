@@ -0,0 +1,130 @@
+import threading
+
+from aurora_db_manager import AuroraDBManager
+
+
+class ClusterProfile:
+    """Connection settings of one named cluster"""
+
+    def __init__(
+        self,
+        name,
+        database_name,
+        resource_arn,
+        secret_arn,
+        region=None,
+        aws_profile=None,
+        max_pool_connections=10,
+        connect_timeout=5.0,
+        read_timeout=60.0,
+        retry_mode="adaptive",
+        max_attempts=5,
+        tcp_keepalive=True,
+        parallel_queries=4,
+    ):
+        self.name = name
+        self.database_name = database_name
+        self.resource_arn = resource_arn
+        self.secret_arn = secret_arn
+        self.region = region
+        self.aws_profile = aws_profile
+        self.max_pool_connections = max_pool_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry_mode = retry_mode
+        self.max_attempts = max_attempts
+        self.tcp_keepalive = tcp_keepalive
+        # Statements run at once against this cluster by Run Parallel
+        self.parallel_queries = parallel_queries
+
+    @property
+    def client_key(self):
+        """Settings that decide which rds-data client a cluster can share"""
+        return (
+            self.aws_profile,
+            self.region,
+            self.max_pool_connections,
+            self.connect_timeout,
+            self.read_timeout,
+            self.retry_mode,
+            self.max_attempts,
+            self.tcp_keepalive,
+        )
+
+
+class ConnectionManager:
+    """Named cluster profiles and the rds-data clients they use.
+
+    Clients are created on first use with a botocore ``Config`` built from
+    the profile: connection pool size, retry mode and attempts, connect and
+    read timeouts and TCP keep-alive. boto3 clients are thread safe, so one
+    client serves every thread, and clusters whose profiles use the same
+    credentials, region and settings share it along with its pool of open
+    connections. Each cluster keeps a single AuroraDBManager, so switching
+    back to a cluster reuses its warm client and result cache.
+    """
+
+    def __init__(self, profiles, result_cache_factory=None, **manager_options):
+        self.profiles = {profile.name: profile for profile in profiles}
+        self.result_cache_factory = result_cache_factory
+        self.manager_options = manager_options  # batch_size, record_format
+        self._sessions = {}  # AWS profile name -> boto3 Session
+        self._clients = {}  # ClusterProfile.client_key -> rds-data client
+        self._managers = {}  # Cluster name -> AuroraDBManager
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        return list(self.profiles)
+
+    def client(self, name):
+        """The shared rds-data client of a cluster, created on first use"""
+        profile = self.profiles[name]
+        # boto3 sessions are not thread safe, so clients are built one at a time
+        with self._lock:
+            client = self._clients.get(profile.client_key)
+            if client is None:
+                client = self._clients[profile.client_key] = self._create_client(
+                    profile
+                )
+            return client
+
+    def _create_client(self, profile):
+        import boto3
+        from botocore.config import Config
+
+        session = self._sessions.get(profile.aws_profile)
+        if session is None:
+            session = self._sessions[profile.aws_profile] = boto3.session.Session(
+                profile_name=profile.aws_profile
+            )
+        config = Config(
+            max_pool_connections=profile.max_pool_connections,
+            connect_timeout=profile.connect_timeout,
+            read_timeout=profile.read_timeout,
+            retries={
+                "mode": profile.retry_mode,
+                "total_max_attempts": profile.max_attempts,
+            },
+            tcp_keepalive=profile.tcp_keepalive,
+        )
+        return session.client("rds-data", region_name=profile.region, config=config)
+
+    def manager(self, name):
+        """The AuroraDBManager of a cluster; its client is created lazily"""
+        with self._lock:
+            db = self._managers.get(name)
+            if db is None:
+                profile = self.profiles[name]
+                result_cache = None
+                if self.result_cache_factory is not None:
+                    result_cache = self.result_cache_factory()
+                db = self._managers[name] = AuroraDBManager(
+                    profile.database_name,
+                    profile.resource_arn,
+                    profile.secret_arn,
+                    result_cache=result_cache,
+                    client_factory=lambda: self.client(name),
+                    **self.manager_options,
+                )
+            return db
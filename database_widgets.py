@@ -1,24 +1,114 @@
-import tkinter as tk
-from tkinter import ttk
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import time
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog, ttk
+from bulk_import import BulkImporter
 from query_history import QueryHistory
-from idlelib.colorizer import ColorDelegator
+from columnar_result import ColumnarResult
+from plan_view import PlanView
+from query_executor import ParallelExecutor, QueryExecutor, QueryJob
+from query_plan import QueryPlan, compare_plans
+from result_export import ResultExporter, available_formats
+from result_store import ResultStore
+from results_grid import ResultsGrid
+from schema_cache import SchemaCache
+from script_runner import ScriptRunner
+from statement_index import StatementIndex, StatementIndexDelegator, text_offset
+from table_browser import TableBrowser
+from workspace_store import WorkspaceStore
+import sql_text
+import startup_timing
+import value_decoder
 from idlelib.percolator import Percolator
-import re
+
+
+class EditorBuffer:
+    """A workspace tab; its Text is only created when the tab is first shown"""
+
+    def __init__(self, name, frame):
+        self.name = name
+        self.frame = frame
+        self.text = None
+        self.index = None
+        self.save_id = None  # Pending debounced autosave
 
 
 class DatabaseWidgets:
-    def __init__(self, parent, db, query_mapper):
+    # Quiet period after the last keystroke before a workspace is saved
+    AUTOSAVE_DELAY = 1000
+
+    def __init__(
+        self,
+        parent,
+        db,
+        query_mapper,
+        query_timeout=None,
+        import_concurrency=4,
+        parallel_queries=4,
+        spill_bytes=0,
+        connections=None,
+    ):
         self.parent = parent
         self.db = db
+        self.connections = connections  # ConnectionManager of every cluster
         self.query_mapper = query_mapper
+        self.query_timeout = query_timeout
+        self.import_concurrency = import_concurrency
+        self.importer = None
+        self.script_runner = None
+        self.exporter = None
+        self.last_query = None  # Statement whose results the grid shows
         self.query_text = None
-        self.results_text = None
-        self.query_history = QueryHistory()
-        self.workspace_file = "workspace.sql"  # Define workspace file path
+        self.results_grid = None
+        self.current_result = None
+        self.spill_bytes = spill_bytes  # Result size moved to a ResultStore
+        self.spilling = None  # Result being copied to a ResultStore
+        self.spill_pages = []  # Pages that arrived during the copy
+        self.result_filter = tk.StringVar()
+        # Indexing an existing history waits until the window is shown
+        self.query_history = QueryHistory(migrate=False)
+        self.schema_caches = {}  # Cluster name -> SchemaCache
+        self.cluster_name = None  # Name of the cluster self.db belongs to
+        self.cluster = tk.StringVar()  # Cluster picked in the switcher
+        if connections is None:
+            self.schema_cache = SchemaCache(db)
+        else:
+            self.cluster_name = next(
+                name for name in connections.names if connections.manager(name) is db
+            )
+            self.cluster.set(self.cluster_name)
+            self.schema_cache = self.cluster_schema_cache(self.cluster_name)
+        self.table_keys = []  # (schema, name) of every table_list entry
+        # Short tasks: history writes, schema refresh, pages, statistics
+        self.background = ThreadPoolExecutor(max_workers=2)
+        # Imports, scripts, exports and plans, which can run for minutes
+        self.long_jobs = ThreadPoolExecutor(max_workers=4)
+        self.executor = QueryExecutor(
+            parent, db, on_state_change=self.update_execution_status
+        )
+        self.parallel = ParallelExecutor(
+            parent,
+            db,
+            max_workers=parallel_queries,
+            on_state_change=self.update_parallel_status,
+        )
+        self.parallel_grids = {}  # QueryJob id -> ResultsGrid of its tab
+        self._status_tick_id = None
+        self._history_search_id = None
+        self.history_newest_id = None  # Row ids bounding the loaded history
+        self.history_oldest_id = None
+        self.history_exhausted = False
+        self.workspaces = WorkspaceStore()
+        self.editor_buffers = {}  # Tab widget name -> EditorBuffer
+        self.statement_index = None
         self.create_widgets()
         self.create_context_menu()
 
+        # Cached state is loaded once the window has been drawn
+        self.parent.after_idle(self.load_cached_state)
+
     def create_widgets(self):
         """Create main layout and initialize all widgets"""
         # Left panel - Table List
@@ -40,6 +130,27 @@ class DatabaseWidgets:
         left_frame.pack(side=tk.LEFT, fill=tk.Y)
         left_frame.pack_propagate(False)  # Maintain fixed width
 
+        if self.connections is not None and len(self.connections.names) > 1:
+            cluster_box = ttk.Combobox(
+                left_frame,
+                textvariable=self.cluster,
+                values=self.connections.names,
+                state="readonly",
+            )
+            cluster_box.pack(fill=tk.X)
+            cluster_box.bind("<<ComboboxSelected>>", self.switch_cluster)
+
+        header_frame = ttk.Frame(left_frame)
+        header_frame.pack(fill=tk.X)
+        self.schema_status = ttk.Label(header_frame, text="Tables")
+        self.schema_status.pack(side=tk.LEFT)
+        ttk.Button(header_frame, text="Refresh", command=self.refresh_schema).pack(
+            side=tk.RIGHT
+        )
+        ttk.Button(header_frame, text="Import...", command=self.import_file).pack(
+            side=tk.RIGHT
+        )
+
         # Create frame for table list and scrollbar
         table_frame = ttk.Frame(left_frame)
         table_frame.pack(fill=tk.BOTH, expand=True)
@@ -56,12 +167,7 @@ class DatabaseWidgets:
         scrollbar.config(command=table_list.yview)
 
         # Add double-click binding
-        table_list.bind("<Double-1>", self.show_table_preview)
-
-        # Populate table list
-        tables = self.db.list_tables()
-        for table in tables:
-            table_list.insert(tk.END, table)
+        table_list.bind("<Double-1>", self.browse_table)
 
         # Store reference to table_list
         self.table_list = table_list
@@ -69,13 +175,20 @@ class DatabaseWidgets:
         return left_frame
 
     def create_tabbed_interface(self, parent):
-        """Create notebook with Query Editor and History tabs"""
+        """Create notebook with Query Editor, History and Statistics tabs"""
         notebook = ttk.Notebook(parent)
         notebook.pack(fill=tk.BOTH, expand=True)
 
-        # Create the two tabs
         self.create_query_editor_tab(notebook)
         self.create_history_tab(notebook)
+        self.create_stats_tab(notebook)
+
+        # Statistics are only computed while their tab is shown
+        def on_tab_changed(event):
+            if notebook.select() == str(self.stats_tab):
+                self.refresh_stats()
+
+        notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
 
     def create_query_editor_tab(self, notebook):
         """Create the Query Editor tab"""
@@ -85,19 +198,107 @@ class DatabaseWidgets:
         query_frame = ttk.Frame(query_tab)
         query_frame.pack(fill=tk.BOTH, expand=True)
 
-        query_label = ttk.Label(query_frame, text="Query Editor")
-        query_label.pack(anchor=tk.W)
+        header_frame = ttk.Frame(query_frame)
+        header_frame.pack(fill=tk.X)
+        query_label = ttk.Label(header_frame, text="Query Editor")
+        query_label.pack(side=tk.LEFT)
+        for text, command in (
+            ("Delete", self.delete_workspace),
+            ("Rename", self.rename_workspace),
+            ("New", self.new_workspace),
+        ):
+            ttk.Button(header_frame, text=text, command=command).pack(side=tk.RIGHT)
+
+        # One tab per named workspace, filled in when first selected
+        self.editor_tabs = ttk.Notebook(query_frame)
+        self.editor_tabs.pack(fill=tk.BOTH, expand=True)
+        for name in self.workspaces.names():
+            self.add_editor_tab(name)
+        self.editor_tabs.bind("<<NotebookTabChanged>>", self.on_editor_tab_changed)
+        self.on_editor_tab_changed()
+
+        button_frame = ttk.Frame(query_frame)
+        button_frame.pack(fill=tk.X, pady=5)
+
+        execute_button = ttk.Button(
+            button_frame, text="Execute Query", command=self.execute_query
+        )
+        execute_button.pack(side=tk.LEFT)
 
-        self.query_text = tk.Text(query_frame, height=10)
-        self.query_text.pack(fill=tk.BOTH, expand=True)
+        self.cancel_button = ttk.Button(
+            button_frame,
+            text="Cancel",
+            command=self.cancel_execution,
+            state=tk.DISABLED,
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
 
-        # Load saved content
-        self.load_workspace()
+        # Whole editor contents as one transaction
+        ttk.Button(button_frame, text="Run Script", command=self.run_script).pack(
+            side=tk.LEFT
+        )
+        ttk.Button(button_frame, text="Run Parallel", command=self.run_parallel).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(button_frame, text="Run with Plan", command=self.run_with_plan).pack(
+            side=tk.LEFT
+        )
+        self.continue_on_error = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame, text="Continue on error", variable=self.continue_on_error
+        ).pack(side=tk.LEFT, padx=5)
+
+        # Shows the running state of the background executor
+        self.status_label = ttk.Label(button_frame, text="Ready")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+    def add_editor_tab(self, name):
+        """Add a tab for a workspace without reading its file yet"""
+        frame = ttk.Frame(self.editor_tabs)
+        self.editor_tabs.add(frame, text=name)
+        buffer = EditorBuffer(name, frame)
+        self.editor_buffers[str(frame)] = buffer
+        return buffer
+
+    def current_buffer(self):
+        return self.editor_buffers[self.editor_tabs.select()]
+
+    def on_editor_tab_changed(self, event=None):
+        """Point the editor at the selected workspace, loading it on first use"""
+        buffer = self.current_buffer()
+        if buffer.text is None:
+            self.create_editor(buffer)
+        self.query_text = buffer.text
+        self.statement_index = buffer.index
+
+    def create_editor(self, buffer):
+        """Create the Text of a workspace tab and load its saved content"""
+        text = tk.Text(buffer.frame, height=10)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert("1.0", self.workspaces.load(buffer.name))
+        text.edit_modified(False)
+
+        # Save the workspace once typing pauses
+        text.bind("<<Modified>>", lambda e: self.schedule_autosave(buffer))
+
+        percolator = Percolator(text)
+
+        # Statement boundaries, kept up to date with every edit
+        buffer.index = StatementIndex(text.get("1.0", "end-1c"))
+        percolator.insertfilter(StatementIndexDelegator(buffer.index))
 
-        # Bind text changes to save workspace
-        self.query_text.bind("<<Modified>>", self.save_workspace)
+        # Add Command+Return binding for Mac and Ctrl+Return for Windows/Linux
+        text.bind("<Command-Return>", lambda e: self.execute_query() or "break")
+        text.bind("<Control-Return>", lambda e: self.execute_query() or "break")
+        buffer.text = text
+
+        # Highlighting needs idlelib's config machinery, which is slow to load
+        self.parent.after_idle(lambda: self.install_highlighter(percolator))
+
+    def install_highlighter(self, percolator):
+        """Add SQL syntax highlighting to an editor"""
+        from idlelib.colorizer import ColorDelegator
 
-        # Add syntax highlighting
         color_delegator = ColorDelegator()
         # Remove background colors from syntax highlighting
         color_delegator.tagdefs["KEYWORD"] = {
@@ -108,31 +309,108 @@ class DatabaseWidgets:
             "foreground": "#B366B3",
             "background": None,
         }  # Lighter purple
-        color_delegator.prog = re.compile(
-            r"""(?P<KEYWORD>SELECT|FROM|WHERE|INSERT|UPDATE|DELETE|JOIN|GROUP|BY|HAVING|ORDER|LIMIT|AND|OR|IN|LIKE|IS|NULL|CREATE|TABLE|DROP|ALTER|INDEX|UNIQUE|PRIMARY|KEY|FOREIGN|REFERENCES|CASCADE|SET|VALUES)\b|
-            (?P<STRING>(?:'[^']*')|(?:"[^"]*"))""",
-            re.IGNORECASE | re.VERBOSE,
-        )
-        Percolator(self.query_text).insertfilter(color_delegator)
+        color_delegator.tagdefs["COMMENT"] = {
+            "foreground": "#808080",
+            "background": None,
+        }
+        # Same comment and string rules as the statement index
+        color_delegator.prog = sql_text.HIGHLIGHT_PATTERN
+        percolator.insertfilter(color_delegator)
 
-        # Add Command+Return binding for Mac and Ctrl+Return for Windows/Linux
-        self.query_text.bind(
-            "<Command-Return>", lambda e: self.execute_query() or "break"
-        )
-        self.query_text.bind(
-            "<Control-Return>", lambda e: self.execute_query() or "break"
+    def schedule_autosave(self, buffer):
+        """Debounce saving a workspace after it was modified"""
+        if not buffer.text.edit_modified():
+            return
+        buffer.text.edit_modified(False)  # Re-arm <<Modified>>
+        if buffer.save_id is not None:
+            self.parent.after_cancel(buffer.save_id)
+        buffer.save_id = self.parent.after(
+            self.AUTOSAVE_DELAY, lambda: self.save_buffer(buffer)
         )
 
-        execute_button = ttk.Button(
-            query_frame, text="Execute Query", command=self.execute_query
-        )
-        execute_button.pack(pady=5)
+    def save_buffer(self, buffer):
+        """Hand a workspace's current text to the background writer"""
+        if buffer.save_id is not None:
+            self.parent.after_cancel(buffer.save_id)
+            buffer.save_id = None
+        # Copying the text out of Tk is cheap; only the write is slow
+        self.workspaces.save_async(buffer.name, buffer.text.get("1.0", "end-1c"))
+
+    def ask_workspace_name(self, title, initial=""):
+        """Prompt for a new workspace name; None when cancelled or invalid"""
+        name = simpledialog.askstring(title, "Workspace name:", initialvalue=initial)
+        if not name:
+            return None
+        name = name.strip()
+        taken = {buffer.name for buffer in self.editor_buffers.values()}
+        if not self.workspaces.valid_name(name) or name in taken:
+            messagebox.showerror(title, f"Cannot use {name!r} as a workspace name")
+            return None
+        return name
+
+    def new_workspace(self):
+        name = self.ask_workspace_name("New Workspace")
+        if name is None:
+            return
+        self.workspaces.save(name, "")
+        buffer = self.add_editor_tab(name)
+        self.editor_tabs.select(buffer.frame)
+
+    def rename_workspace(self):
+        buffer = self.current_buffer()
+        name = self.ask_workspace_name("Rename Workspace", buffer.name)
+        if name is None:
+            return
+        pending = buffer.save_id is not None
+        if pending:
+            self.parent.after_cancel(buffer.save_id)
+            buffer.save_id = None
+        self.workspaces.rename(buffer.name, name)
+        buffer.name = name
+        self.editor_tabs.tab(buffer.frame, text=name)
+        if pending:
+            self.save_buffer(buffer)
+
+    def delete_workspace(self):
+        buffer = self.current_buffer()
+        if len(self.editor_buffers) == 1:
+            return  # The last workspace stays
+        if not messagebox.askyesno(
+            "Delete Workspace", f"Delete the workspace {buffer.name!r}?"
+        ):
+            return
+        if buffer.save_id is not None:
+            self.parent.after_cancel(buffer.save_id)
+        self.workspaces.delete(buffer.name)
+        del self.editor_buffers[str(buffer.frame)]
+        self.editor_tabs.forget(buffer.frame)
+        buffer.frame.destroy()
+        self.on_editor_tab_changed()
+
+    def close(self):
+        """Write pending workspace saves and history before the window closes"""
+        for buffer in self.editor_buffers.values():
+            if buffer.save_id is not None:
+                self.save_buffer(buffer)
+        self.workspaces.flush()
+        self.query_history.close()
+        self.set_current_result(None)
 
     def create_history_tab(self, notebook):
         """Create the Query History tab"""
         history_tab = ttk.Frame(notebook)
         notebook.add(history_tab, text="Query History")
 
+        # Full-text search over every past query
+        search_frame = ttk.Frame(history_tab)
+        search_frame.pack(fill=tk.X)
+        ttk.Label(search_frame, text="Search").pack(side=tk.LEFT)
+        self.history_search = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.history_search)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.bind("<KeyRelease>", self.schedule_history_search)
+        search_entry.bind("<Escape>", self.clear_history_search)
+
         history_frame = ttk.Frame(history_tab)
         history_frame.pack(fill=tk.BOTH, expand=True)
 
@@ -148,8 +426,105 @@ class DatabaseWidgets:
         # Bind double-click event
         self.history_tree.bind("<Double-1>", self.load_query_from_history)
 
-        # Load initial history
-        self.refresh_history()
+    # Periods the latency statistics can cover, in days
+    STATS_PERIODS = {
+        "All time": None,
+        "Last 24 hours": 1,
+        "Last 7 days": 7,
+        "Last 30 days": 30,
+    }
+
+    def create_stats_tab(self, notebook):
+        """Create the Statistics tab with latency per normalized query"""
+        self.stats_tab = ttk.Frame(notebook)
+        notebook.add(self.stats_tab, text="Statistics")
+
+        controls = ttk.Frame(self.stats_tab)
+        controls.pack(fill=tk.X)
+        self.stats_period = tk.StringVar(value="Last 7 days")
+        period = ttk.Combobox(
+            controls,
+            textvariable=self.stats_period,
+            values=list(self.STATS_PERIODS),
+            state="readonly",
+            width=14,
+        )
+        period.pack(side=tk.LEFT)
+        period.bind("<<ComboboxSelected>>", self.refresh_stats)
+        ttk.Button(controls, text="Refresh", command=self.refresh_stats).pack(
+            side=tk.LEFT, padx=5
+        )
+        self.stats_status = ttk.Label(controls, text="")
+        self.stats_status.pack(side=tk.LEFT)
+
+        stats_frame = ttk.Frame(self.stats_tab)
+        stats_frame.pack(fill=tk.BOTH, expand=True)
+        columns = (
+            "Query",
+            "Count",
+            "p50",
+            "p95",
+            "Max",
+            "Request",
+            "Decode",
+            "Format",
+            "Render",
+            "Rows",
+        )
+        self.stats_tree = ttk.Treeview(stats_frame, columns=columns, show="headings")
+        for column in columns:
+            self.stats_tree.heading(column, text=column)
+            self.stats_tree.column(
+                column, width=300 if column == "Query" else 70, anchor=tk.W
+            )
+        scrollbar = ttk.Scrollbar(
+            stats_frame, orient=tk.VERTICAL, command=self.stats_tree.yview
+        )
+        self.stats_tree.configure(yscrollcommand=scrollbar.set)
+        self.stats_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def refresh_stats(self, event=None):
+        """Recompute the latency statistics in the background"""
+        days = self.STATS_PERIODS[self.stats_period.get()]
+        since = None
+        if days is not None:
+            since = (datetime.now() - timedelta(days=days)).isoformat()
+
+        def compute():
+            self.query_history.flush()
+            return self.query_history.latency_stats(since)
+
+        self.stats_status.config(text="Loading...")
+        self.run_in_background(compute, self.show_stats)
+
+    def show_stats(self, future):
+        try:
+            stats = future.result()
+        except Exception as e:
+            self.stats_status.config(text=f"Error: {e}")
+            return
+
+        def seconds(value):
+            return "" if value is None else f"{value:.3f}"
+
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for s in stats:
+            query = " ".join(s.query.split())
+            self.stats_tree.insert(
+                "",
+                tk.END,
+                values=(
+                    query[:80] + "..." if len(query) > 80 else query,
+                    s.count,
+                    seconds(s.p50),
+                    seconds(s.p95),
+                    seconds(s.max),
+                    *(seconds(s.phases[phase]) for phase in s.PHASES),
+                    "" if s.rows is None else f"{s.rows:.0f}",
+                ),
+            )
+        self.stats_status.config(text=f"{len(stats)} queries, by total time")
 
     def configure_history_tree_columns(self):
         """Configure the columns of the history treeview"""
@@ -170,7 +545,14 @@ class DatabaseWidgets:
         scrollbar = ttk.Scrollbar(
             parent, orient=tk.VERTICAL, command=self.history_tree.yview
         )
-        self.history_tree.configure(yscrollcommand=scrollbar.set)
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            # Fetch older history as the end of the loaded rows comes into view
+            if float(last) >= 0.95:
+                self.load_more_history()
+
+        self.history_tree.configure(yscrollcommand=on_scroll)
 
         self.history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -180,39 +562,34 @@ class DatabaseWidgets:
         results_frame = ttk.Frame(parent)
         results_frame.pack(fill=tk.BOTH, expand=True)
 
-        results_label = ttk.Label(results_frame, text="Query Results")
-        results_label.pack(anchor=tk.W)
-
-        # Create a frame to hold the text widget and scrollbars
-        text_frame = ttk.Frame(results_frame)
-        text_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Create scrollbars
-        y_scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL)
-        x_scrollbar = ttk.Scrollbar(text_frame, orient=tk.HORIZONTAL)
-
-        # Create text widget with scrollbar configuration
-        self.results_text = tk.Text(
-            text_frame,
-            height=10,
-            wrap=tk.NONE,  # Disable line wrapping
-            yscrollcommand=y_scrollbar.set,
-            xscrollcommand=x_scrollbar.set,
+        label_frame = ttk.Frame(results_frame)
+        label_frame.pack(fill=tk.X)
+        self.results_label = ttk.Label(label_frame, text="Query Results")
+        self.results_label.pack(side=tk.LEFT)
+        ttk.Button(label_frame, text="Export...", command=self.export_results).pack(
+            side=tk.RIGHT
         )
-
-        # Configure scrollbars
-        y_scrollbar.config(command=self.results_text.yview)
-        x_scrollbar.config(command=self.results_text.xview)
-
-        # Pack everything
-        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-        self.results_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Filters the rows already fetched, without querying the cluster
+        filter_entry = ttk.Entry(label_frame, textvariable=self.result_filter, width=40)
+        filter_entry.pack(side=tk.RIGHT, padx=5)
+        filter_entry.bind("<Return>", self.apply_result_filter)
+        filter_entry.bind("<Escape>", self.clear_result_filter)
+        ttk.Label(label_frame, text="Filter:").pack(side=tk.RIGHT)
+
+        # One tab for the editor's results, one per statement run in parallel
+        self.results_tabs = ttk.Notebook(results_frame)
+        self.results_tabs.pack(fill=tk.BOTH, expand=True)
+        self.results_tabs.bind("<Button-2>", self.close_result_tab)
+
+        # Virtualized grid that only draws the rows in view
+        self.results_grid = ResultsGrid(self.results_tabs)
+        self.results_tabs.add(self.results_grid, text="Results")
 
     def create_context_menu(self):
         """Create right-click context menu for history tree"""
         self.context_menu = tk.Menu(self.parent, tearoff=0)
         self.context_menu.add_command(label="Copy Query", command=self.copy_query)
+        self.context_menu.add_command(label="Show Plan", command=self.show_history_plan)
 
         # Bind right-click to show context menu
         self.history_tree.bind("<Button-3>", self.show_context_menu)
@@ -234,14 +611,9 @@ class DatabaseWidgets:
         if not selected_items:
             return
 
-        selected_item = selected_items[0]
-        query = self.history_tree.item(selected_item)["values"][0]
-
-        # If the query was truncated, get the full query
-        if query.endswith("..."):
-            full_query = self.query_history.get_full_query(query[:-3])
-            if full_query:
-                query = full_query
+        query = self.history_query(selected_items[0])
+        if query is None:
+            return
 
         # Copy to clipboard
         self.parent.clipboard_clear()
@@ -249,90 +621,809 @@ class DatabaseWidgets:
         self.parent.update()  # Required to finalize clipboard update
 
     def execute_query(self):
-        """Execute the query that contains the cursor, bounded by semicolons"""
-        # Get full text and cursor position
-        text = self.query_text.get("1.0", tk.END)
+        """Execute the selected statements, or else the one under the cursor"""
+        selection = self.editor_selection()
+        if selection is not None:
+            for statement in self.statement_index.statements_between(*selection):
+                self.execute_single_query(statement)
+            return
 
-        # Convert text to character index
-        cursor_index = len(self.query_text.get("1.0", "insert"))
+        cursor = self.editor_offset("insert")
+        selected_query = self.statement_index.statement_at(cursor)
+        if selected_query:
+            self.execute_single_query(selected_query)
 
-        # Find the semicolon positions
-        semicolon_positions = [i for i, char in enumerate(text) if char == ";"]
+    def editor_offset(self, mark):
+        """Offset into the statement index of an editor index"""
+        return text_offset(self.query_text, self.statement_index, mark)
 
-        # Find the query boundaries around the cursor
-        query_start = 0
-        query_end = len(text)
+    def editor_selection(self):
+        """(start, end) offsets of the editor selection, or None"""
+        if not self.query_text.tag_ranges(tk.SEL):
+            return None
+        return self.editor_offset(tk.SEL_FIRST), self.editor_offset(tk.SEL_LAST)
 
-        # Find the last semicolon before the cursor
-        for pos in semicolon_positions:
-            if pos < cursor_index:
-                query_start = pos + 1
+    def execute_single_query(self, query):
+        """Queue a query on the background executor, streaming its results"""
+        # Export runs the statement again, so only reads can be exported
+        self.last_query = query if sql_text.is_read_only(query) else None
+        return self.executor.submit(
+            query,
+            self.on_query_complete,
+            timeout=self.query_timeout,
+            on_batch=self.on_query_batch,
+        )
+
+    def on_query_batch(self, job, batch):
+        """Render one page of a streamed result as soon as it arrives"""
+        if job.batches == 1:
+            self.results_tabs.select(self.results_grid)
+            if not value_decoder.has_records(batch):
+                self.set_current_result(None)
+                self.results_grid.show_message(str(batch))
+                return
+            # Decode pages into one columnar result shared with the grid
+            with job.timing.measure("decode"):
+                self.set_current_result(self.query_mapper.decode(batch))
+            with job.timing.measure("format"):
+                self.results_grid.set_result(
+                    self.current_result,
+                    self.query_mapper.format_headers(self.current_result),
+                )
+        elif value_decoder.record_count(batch):
+            if self.spilling is not None:
+                # The copy to disk would miss these rows; they follow it
+                self.spill_pages.append(batch)
             else:
-                query_end = pos
-                break
+                start = len(self.current_result)
+                with job.timing.measure("decode"):
+                    if isinstance(self.current_result, ResultStore):
+                        self.current_result.append(self.query_mapper.decode(batch))
+                    else:
+                        self.current_result.extend(batch)
+                        # Large results go to disk so memory stays bounded
+                        if (
+                            self.spill_bytes
+                            and job.timing.response_bytes > self.spill_bytes
+                        ):
+                            self.spill_result()
+                with job.timing.measure("format"):
+                    self.results_grid.rows_appended(start)
+
+        self.results_label.config(text=f"Query Results: {job.rows} rows so far")
+
+    def set_current_result(self, result):
+        """Replace the result the grid shows, deleting a spilled one"""
+        if isinstance(self.current_result, ResultStore):
+            self.current_result.close()
+        self.current_result = result
+        self.spilling = None
+        self.spill_pages = []
+        self.result_filter.set("")
+
+    def spill_result(self):
+        """Copy the current result to a ResultStore on a worker thread.
+
+        The in-memory result is left as it is until the copy is done, and
+        pages that arrive meanwhile are held back and appended to the store,
+        which then replaces the result in the grid.
+        """
+        if self.spilling is not None:
+            return
+        result = self.spilling = self.current_result
+        self.spill_pages = []
+        self.run_long_job(
+            ResultStore.from_result,
+            lambda future: self.on_result_spilled(future, result),
+            result,
+        )
 
-        # Extract and clean the query
-        selected_query = text[query_start:query_end].strip()
+    def on_result_spilled(self, future, result):
+        """Show a result from the ResultStore it was copied to"""
+        if self.spilling is not result:
+            # The result was replaced while it was copied
+            if future.exception() is None:
+                future.result().close()
+            return
+        self.spilling = None
+        pages, self.spill_pages = self.spill_pages, []
+        try:
+            store = future.result()
+        except Exception as e:
+            # Keep the rows in memory instead
+            start = len(result)
+            for batch in pages:
+                result.extend(batch)
+            self.results_grid.rows_appended(start)
+            self.results_label.config(
+                text=f"Query Results: could not move the result to disk: {e}"
+            )
+            return
 
-        if selected_query:
-            self.execute_single_query(selected_query)
+        start = len(store)
+        for batch in pages:
+            store.append(self.query_mapper.decode(batch))
+        self.current_result = store
+        if self.results_grid.result is result:
+            self.results_grid.replace_result(store)
+            if pages:
+                self.results_grid.rows_appended(start)
+        if self.result_filter.get().strip():
+            self.apply_result_filter()
+
+    def apply_result_filter(self, event=None):
+        """Show the rows of the current result matching a SQLite expression"""
+        result = self.current_result
+        if result is None or self.results_grid.result is not result:
+            return
+        where = self.result_filter.get().strip()
+        if where and not isinstance(self.current_result, ResultStore):
+            # Filters run in SQLite; the filter is applied once the copy is done
+            self.spill_result()
+            self.results_label.config(
+                text="Query Results: moving the result to disk to filter it..."
+            )
+            return
+        start = time.perf_counter()
+        try:
+            self.results_grid.set_filter(where)
+        except ValueError as e:
+            self.results_label.config(text=f"Query Results: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        total = len(self.current_result)
+        if where:
+            text = f"{self.results_grid.row_count} of {total} rows match"
+        else:
+            text = f"{total} rows"
+        self.results_label.config(
+            text=f"Query Results: {text} ({elapsed * 1000:.0f} ms)"
+        )
 
-    def execute_single_query(self, query):
-        start_time = time.time()
-        success = True
+    def clear_result_filter(self, event=None):
+        self.result_filter.set("")
+        self.apply_result_filter()
+
+    def on_query_complete(self, job):
+        """Display the outcome of a finished job (runs on the Tk thread)"""
+        summary = f"{job.rows} rows in {job.duration:.2f}s"
+        if job.cache_age is not None:
+            summary += f" (from cache, {job.cache_age:.0f}s old)"
+        if job.status == QueryJob.DONE:
+            if job.rows == 0 and self.results_grid.message is None:
+                self.results_grid.show_message("No records found")
+        elif job.status == QueryJob.CANCELLED:
+            summary += " (cancelled)"
+            if job.batches == 0:
+                self.results_grid.show_message("Query cancelled")
+        else:
+            summary += f" (error: {job.error})"
+            # Keep any rows that were already streamed in
+            if job.batches == 0:
+                self.results_grid.show_message(f"Error: {str(job.error)}")
+        if job.batches:
+            # Draw the last page now so its cost is part of the timing
+            self.results_grid.update_idletasks()
+            job.timing.render = self.results_grid.draw_time
+            summary += f" ({job.timing.summary()})"
+        self.results_label.config(text=f"Query Results: {summary}")
+
+        # The history is written off the Tk thread, then the tab is reloaded
+        self.query_history.add_query(
+            job.sql, job.duration, job.succeeded, job.rows, job.timing
+        )
+        self.run_in_background(
+            self.query_history.flush, lambda future: self.append_new_history()
+        )
 
+        # Keep the schema index in step with DDL run from the editor
+        if job.succeeded and sql_text.first_keyword(job.sql) in (
+            "create",
+            "alter",
+            "drop",
+        ):
+            self.refresh_schema(sql_text.referenced_tables(job.sql))
+
+    def run_script(self):
+        """Run every statement in the editor inside a single transaction"""
+        if self.script_runner is not None:
+            return
+        script = self.statement_index.text
+        statements = self.statement_index.statements()
+        if not statements:
+            return
+
+        runner = ScriptRunner(self.db, continue_on_error=self.continue_on_error.get())
+        self.script_runner = runner
+        done = []  # Appended to by the worker after each statement
+
+        def on_done(future):
+            self.script_runner = None
+            self.cancel_button.config(state=tk.DISABLED)
+            try:
+                run = future.result()
+            except Exception as e:
+                self.results_label.config(text=f"Script failed: {e}")
+                return
+
+            self.results_tabs.select(self.results_grid)
+            self.set_current_result(self.query_mapper.decode(run.as_response()))
+            self.results_grid.set_result(
+                self.current_result, self.current_result.column_names
+            )
+            self.results_label.config(text=f"Script: {run.summary()}")
+
+            self.query_history.add_query(script.strip(), run.duration, run.succeeded)
+            self.run_in_background(
+                self.query_history.flush, lambda future: self.append_new_history()
+            )
+            if run.outcome != run.ROLLED_BACK and any(
+                sql_text.first_keyword(r.sql) in ("create", "alter", "drop")
+                for r in run.results
+                if r.status == r.OK
+            ):
+                self.refresh_schema()
+
+        def show_progress():
+            if self.script_runner is not runner:
+                return
+            self.status_label.config(
+                text=f"Script: {len(done)}/{len(statements)} statements"
+            )
+            self.parent.after(200, show_progress)
+
+        self.cancel_button.config(state=tk.NORMAL)
+        self.run_long_job(runner.run, on_done, statements, done.append)
+        show_progress()
+
+    def cancel_execution(self):
+        """Cancel the running script or parallel run, or else the running query"""
+        if self.exporter is not None:
+            self.exporter.cancel()
+        if self.importer is not None:
+            self.importer.cancel()
+        if self.script_runner is not None:
+            self.script_runner.cancel()
+        elif self.parallel.busy:
+            self.parallel.cancel()
+        else:
+            self.executor.cancel()
+
+    def export_results(self):
+        """Re-run the last query, streaming its full result to a file"""
+        if self.exporter is not None:
+            return
+        if self.last_query is None or not sql_text.is_read_only(self.last_query):
+            self.results_label.config(
+                text="Only the results of a read-only statement can be exported"
+            )
+            return
+        filetypes = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl")]
+        if "parquet" in available_formats():
+            filetypes.append(("Parquet", "*.parquet"))
+        path = filedialog.asksaveasfilename(
+            title="Export results", defaultextension=".csv", filetypes=filetypes
+        )
+        if not path:
+            return
+
+        exporter = ResultExporter(self.db)
+        self.exporter = exporter
+
+        def on_done(future):
+            self.exporter = None
+            try:
+                progress = future.result()
+            except Exception as e:
+                self.results_label.config(text=f"Export failed: {e}")
+                return
+            self.results_label.config(text=f"Exported {progress.summary()}")
+
+        def show_progress():
+            if self.exporter is not exporter:
+                return
+            self.results_label.config(text=f"Exporting: {exporter.progress.summary()}")
+            self.parent.after(500, show_progress)
+
+        self.run_long_job(exporter.export, on_done, self.last_query, path)
+        show_progress()
+
+    def run_parallel(self):
+        """Run the selected statements (or all of them) side by side.
+
+        Only read-only statements are run; each gets its own result tab that
+        fills in as soon as the statement completes.
+        """
+        selection = self.editor_selection()
+        if selection is not None:
+            statements = self.statement_index.statements_between(*selection)
+        else:
+            statements = self.statement_index.statements()
+        reads = [sql for sql in statements if sql_text.is_read_only(sql)]
+        skipped = len(statements) - len(reads)
+        if not reads:
+            if skipped:
+                self.results_label.config(
+                    text="Run Parallel only runs read-only statements"
+                )
+            return
+
+        # Tabs of the previous parallel run are replaced; browsers and plans stay
+        for tab in self.results_tabs.tabs()[1:]:
+            widget = self.parent.nametowidget(tab)
+            if isinstance(widget, ResultsGrid):
+                self.results_tabs.forget(tab)
+                widget.destroy()
+        self.parallel_grids.clear()
+
+        jobs = self.parallel.submit(
+            reads, self.on_parallel_complete, timeout=self.query_timeout
+        )
+        for job in jobs:
+            grid = ResultsGrid(self.results_tabs)
+            grid.show_message(f"Running...\n\n{job.sql}")
+            self.results_tabs.add(grid, text=self._result_tab_title(job))
+            self.parallel_grids[job.id] = grid
+        self.results_tabs.select(self.parallel_grids[jobs[0].id])
+
+        summary = f"Query Results: running {len(reads)} statements in parallel"
+        if skipped:
+            summary += f", {skipped} statements that write were skipped"
+        self.results_label.config(text=summary)
+
+    def run_with_plan(self):
+        """Run the statement under the cursor with EXPLAIN ANALYZE.
+
+        The plan is shown in its own results tab, compared with the last
+        plan captured for the same normalized query and stored with the
+        history entry.
+        """
+        selection = self.editor_selection()
+        if selection is not None:
+            statements = self.statement_index.statements_between(*selection)
+            sql = statements[0] if statements else None
+        else:
+            sql = self.statement_index.statement_at(self.editor_offset("insert"))
+        if not sql:
+            return
+
+        def capture():
+            previous = self.query_history.plan_history(sql, limit=1)
+            start = time.perf_counter()
+            plan = QueryPlan(self.db.explain(sql))
+            return plan, time.perf_counter() - start, previous
+
+        def on_done(future):
+            try:
+                plan, duration, previous = future.result()
+            except Exception as e:
+                self.results_label.config(text=f"Plan failed: {e}")
+                return
+            self.show_plan(sql, plan, previous)
+            self.results_label.config(
+                text=f"Query Results: plan captured in {duration:.2f}s"
+            )
+            self.query_history.add_query(
+                sql, duration, True, plan.root.total_rows, plan=plan
+            )
+            self.run_in_background(
+                self.query_history.flush, lambda future: self.append_new_history()
+            )
+
+        self.results_label.config(text="Query Results: running with plan...")
+        self.run_long_job(capture, on_done)
+
+    def show_plan(self, sql, plan, previous):
+        """Open a PlanView tab; ``previous`` are rows from ``plan_history``"""
+        changes, previous_time = None, None
+        if previous:
+            _, previous_time, _, _, previous_plan = previous[0]
+            changes = compare_plans(QueryPlan.from_json(previous_plan), plan)
+        view = PlanView(self.results_tabs, plan, changes, previous_time)
+        title = " ".join(sql.split())
+        if len(title) > 24:
+            title = title[:23] + "…"
+        self.results_tabs.add(view, text=f"Plan: {title}")
+        self.results_tabs.select(view)
+
+    def show_history_plan(self):
+        """Show the plan stored with the selected history entry"""
+        selected_items = self.history_tree.selection()
+        if not selected_items:
+            return
+        query_id = int(selected_items[0])
+        plan = self.query_history.get_plan(query_id)
+        query = self.query_history.get_query(query_id)
+        if plan is None or query is None:
+            self.results_label.config(text="No plan was captured for this query")
+            return
+        previous = self.query_history.plan_history(query, limit=1, before_id=query_id)
+        self.show_plan(query, QueryPlan.from_json(plan), previous)
+
+    def _result_tab_title(self, job):
+        title = " ".join(job.sql.split())
+        if len(title) > 24:
+            title = title[:23] + "…"
+        marks = {QueryJob.DONE: "✓", QueryJob.PENDING: "", QueryJob.RUNNING: ""}
+        mark = marks.get(job.status, "✗")
+        return f"{job.id}: {title} {mark}".rstrip()
+
+    def on_parallel_complete(self, job):
+        """Show a parallel statement's outcome in its tab (runs on the Tk thread)"""
+        grid = self.parallel_grids.pop(job.id, None)
+        if grid is None or not grid.winfo_exists():
+            return
+        self.results_tabs.tab(grid, text=self._result_tab_title(job))
+
+        result = job.result
+        if job.status == QueryJob.DONE:
+            if isinstance(result, ColumnarResult) and len(result):
+                with job.timing.measure("format"):
+                    grid.set_result(result, self.query_mapper.format_headers(result))
+                grid.update_idletasks()
+                job.timing.render = grid.draw_time
+            elif isinstance(result, ColumnarResult) or result is None:
+                grid.show_message("No records found")
+            else:
+                grid.show_message(str(result))
+        elif job.status == QueryJob.CANCELLED:
+            grid.show_message("Query cancelled")
+        else:
+            grid.show_message(f"Error: {str(job.error)}")
+
+        self.query_history.add_query(
+            job.sql, job.duration, job.succeeded, job.rows, job.timing
+        )
+        self.run_in_background(
+            self.query_history.flush, lambda future: self.append_new_history()
+        )
+
+    def close_result_tab(self, event):
+        """Close the parallel result, table browser or plan tab under the mouse"""
         try:
-            results = self.db.execute_query(query)
-            # Clear previous results
-            self.results_text.delete("1.0", tk.END)
+            index = self.results_tabs.index(f"@{event.x},{event.y}")
+        except tk.TclError:
+            return
+        if index == 0:
+            return  # The editor's own results tab stays
+        tab = self.results_tabs.tabs()[index]
+        self.results_tabs.forget(tab)
+        self.parent.nametowidget(tab).destroy()
+
+    def update_parallel_status(self, executor=None):
+        """Reflect the progress of a parallel run in the status label"""
+        if self.parallel.busy:
+            jobs = self.parallel.jobs
+            self.status_label.config(
+                text=f"Parallel: {self.parallel.finished}/{len(jobs)} done, "
+                f"{self.parallel.limit.active} running"
+            )
+            self.cancel_button.config(state=tk.NORMAL)
+        elif self.executor.current is None:
+            self.status_label.config(text="Ready")
+            if self.script_runner is None and self.importer is None:
+                self.cancel_button.config(state=tk.DISABLED)
+
+    def load_cached_state(self):
+        """Fill the window from local caches, then connect in the background"""
+        startup_timing.mark("window shown")
+
+        # Start from the on-disk schema cache; the database is read later
+        if self.schema_cache.load():
+            self.update_table_list(list(self.schema_cache.tables), [])
+            self.schema_status.config(text=f"Tables ({len(self.table_keys)})")
+        self.refresh_history()
+        startup_timing.mark("cached state loaded")
 
-            # Format and display results using QueryMapper
-            formatted_results = self.query_mapper.format_query_results(results)
-            self.results_text.insert("1.0", formatted_results)
+        # Indexing a large history for search takes a while
+        self.run_in_background(self.query_history.migrate, self.on_history_migrated)
 
+        # Importing boto3 and building the client happen off the Tk thread
+        self.run_in_background(self.db.connect, self.on_connected)
+
+    def on_history_migrated(self, future):
+        """Re-run a history search typed before search was indexed"""
+        try:
+            future.result()
         except Exception as e:
-            self.results_text.delete("1.0", tk.END)
-            self.results_text.insert("1.0", f"Error: {str(e)}")
-            success = False
+            self.results_label.config(text=f"Query history search unavailable: {e}")
+            return
+        if self.history_search.get().strip():
+            self.refresh_history()
 
-        duration = time.time() - start_time
-        self.query_history.add_query(query, duration, success)
-        self.refresh_history()
+    def on_connected(self, future):
+        """Read the schema once the client of the current cluster is ready"""
+        try:
+            future.result()
+        except Exception as e:
+            self.schema_status.config(text=f"Tables (connection failed: {e})")
+            return
+        finally:
+            startup_timing.mark("client ready")
+            startup_timing.report()
+        self.refresh_schema()
+
+    def cluster_schema_cache(self, name):
+        """The SchemaCache of a cluster, each kept in its own file"""
+        cache = self.schema_caches.get(name)
+        if cache is None:
+            path = (
+                "schema_cache.json"
+                if name == "default"
+                else f"schema_cache.{name}.json"
+            )
+            cache = SchemaCache(self.connections.manager(name), path)
+            self.schema_caches[name] = cache
+        return cache
+
+    def switch_cluster(self, event=None):
+        """Point the editor, executors and table list at the selected cluster"""
+        name = self.cluster.get()
+        db = self.connections.manager(name)
+        if db is self.db:
+            return
+        busy = self.executor.busy or self.parallel.busy
+        if busy or self.script_runner or self.importer or self.exporter:
+            self.cluster.set(self.cluster_name)
+            messagebox.showinfo(
+                "Switch Cluster", "Wait for running statements to finish first."
+            )
+            return
+
+        self.db = db
+        self.cluster_name = name
+        self.executor.db = db
+        self.parallel.set_db(db, self.connections.profiles[name].parallel_queries)
+        self.last_query = None
+
+        # Show the cached tables of the cluster straight away
+        self.schema_cache = self.cluster_schema_cache(name)
+        if not self.schema_cache.tables:
+            self.schema_cache.load()
+        self.update_table_list(list(self.schema_cache.tables), list(self.table_keys))
+        self.schema_status.config(text=f"Tables ({len(self.table_keys)})")
+
+        # A client that is already warm is returned right away
+        self.run_in_background(db.connect, self.on_connected)
+
+    def run_in_background(self, func, on_done, *args):
+        """Run func on a worker thread and call on_done(future) on the Tk thread"""
+        return self._poll(self.background.submit(func, *args), on_done)
+
+    def run_long_job(self, func, on_done, *args):
+        """Like run_in_background for jobs that would hold up the short tasks"""
+        return self._poll(self.long_jobs.submit(func, *args), on_done)
+
+    def _poll(self, future, on_done):
+        """Call on_done(future) on the Tk thread once the future is done"""
+
+        def poll():
+            if future.done():
+                on_done(future)
+            else:
+                self.parent.after(100, poll)
+
+        self.parent.after(100, poll)
+        return future
+
+    def refresh_schema(self, table_names=None):
+        """Refresh schema metadata in the background and persist it"""
+        cache = self.schema_cache
+
+        def refresh():
+            if table_names:
+                changes = cache.refresh_tables(table_names)
+            else:
+                changes = cache.refresh()
+            cache.save()
+            return changes
+
+        def on_done(future):
+            if cache is not self.schema_cache:
+                return  # The cluster was switched while refreshing
+            try:
+                added, removed, _ = future.result()
+            except Exception as e:
+                self.schema_status.config(text=f"Tables (refresh failed: {e})")
+                return
+            self.update_table_list(added, removed)
+            self.schema_status.config(text=f"Tables ({len(self.table_keys)})")
+
+        self.schema_status.config(text="Tables (refreshing...)")
+        self.run_in_background(refresh, on_done)
+
+    def update_table_list(self, added, removed):
+        """Apply table additions and removals without rebuilding the list"""
+        for key in removed:
+            index = bisect.bisect_left(self.table_keys, key)
+            if index < len(self.table_keys) and self.table_keys[index] == key:
+                del self.table_keys[index]
+                self.table_list.delete(index)
+
+        for key in added:
+            index = bisect.bisect_left(self.table_keys, key)
+            if index < len(self.table_keys) and self.table_keys[index] == key:
+                continue
+            self.table_keys.insert(index, key)
+            schema, name = key
+            self.table_list.insert(
+                index, name if schema == "public" else f"{schema}.{name}"
+            )
+
+    def import_file(self):
+        """Bulk load a CSV or JSONL file into the selected table"""
+        selection = self.table_list.curselection()
+        if not selection or self.importer is not None:
+            return
+        table = self.schema_cache.table(*self.table_keys[selection[0]])
+        if table is None:
+            return
+
+        path = filedialog.askopenfilename(
+            title=f"Import into {table.display_name}",
+            filetypes=[
+                ("CSV or JSON Lines", "*.csv *.jsonl *.ndjson"),
+                ("All files", "*.*"),
+            ],
+        )
+        if not path:
+            return
+
+        self.importer = BulkImporter(
+            self.db, table, concurrency=self.import_concurrency
+        )
+
+        def on_done(future):
+            self.importer = None
+            self.update_execution_status()
+            try:
+                progress = future.result()
+            except Exception as e:
+                self.results_label.config(text=f"Import failed: {e}")
+                return
+            text = f"Imported into {table.display_name}: {progress.summary()}"
+            if progress.errors:
+                text += f" (last error: {progress.errors[-1]})"
+            self.results_label.config(text=text)
+
+        def show_progress():
+            if self.importer is None:
+                return
+            progress = self.importer.progress
+            self.results_label.config(
+                text=f"Importing into {table.display_name}: {progress.summary()}"
+            )
+            self.parent.after(500, show_progress)
+
+        self.cancel_button.config(state=tk.NORMAL)
+        self.run_long_job(self.importer.run, on_done, path)
+        show_progress()
+
+    def update_execution_status(self, executor=None):
+        """Reflect the executor state in the status label and Cancel button"""
+        job = self.executor.current
+        if job is None:
+            self.status_label.config(text="Ready")
+            idle = self.script_runner is None and self.importer is None
+            if idle and not self.parallel.busy:
+                self.cancel_button.config(state=tk.DISABLED)
+            if self._status_tick_id is not None:
+                self.parent.after_cancel(self._status_tick_id)
+                self._status_tick_id = None
+            return
+
+        text = f"Running... {job.duration:.1f}s"
+        if job.rows:
+            text += f", {job.rows} rows"
+        if self.executor.queued:
+            text += f" ({self.executor.queued} queued)"
+        self.status_label.config(text=text)
+        self.cancel_button.config(state=tk.NORMAL)
+
+        # Keep the elapsed time ticking while a statement is running
+        if self._status_tick_id is None:
+            self._status_tick_id = self.parent.after(200, self._tick_status)
+
+    def _tick_status(self):
+        self._status_tick_id = None
+        self.update_execution_status()
+
+    # History rows fetched per page while scrolling
+    HISTORY_PAGE_SIZE = 100
 
     def refresh_history(self):
-        """Refresh the history tree with latest queries"""
-        # Clear existing items
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-
-        # Load history from database
-        history = self.query_history.get_query_history()
-        for query, time, duration, success in history:
-            status = "Success" if success else "Failed"
-            self.history_tree.insert(
-                "",
-                0,
-                values=(
-                    query[:50] + "..." if len(query) > 50 else query,
-                    time,
-                    f"{duration:.2f}",
-                    status,
-                ),
+        """Reload the history tree from its first page, newest first"""
+        self.history_tree.delete(*self.history_tree.get_children())
+        self.history_newest_id = None
+        self.history_oldest_id = None
+        self.history_exhausted = False
+        self.load_more_history()
+
+    def load_more_history(self):
+        """Append the next page of older history to the bottom of the tree"""
+        if self.history_exhausted:
+            return
+        rows = self.query_history.search(
+            self.history_search.get(),
+            self.HISTORY_PAGE_SIZE,
+            before_id=self.history_oldest_id,
+        )
+        if len(rows) < self.HISTORY_PAGE_SIZE:
+            self.history_exhausted = True
+        if not rows:
+            return
+
+        for row in rows:
+            self.insert_history_row(tk.END, row)
+        if self.history_newest_id is None:
+            self.history_newest_id = rows[0][0]
+        self.history_oldest_id = rows[-1][0]
+
+    def append_new_history(self):
+        """Insert rows written since the tree was last updated at the top"""
+        if self.history_newest_id is None:
+            # Nothing was loaded yet, so there is no position to continue from
+            self.refresh_history()
+            return
+        # New rows come oldest first; page until a short page is returned
+        while True:
+            rows = self.query_history.search(
+                self.history_search.get(),
+                self.HISTORY_PAGE_SIZE,
+                after_id=self.history_newest_id,
             )
+            for row in rows:
+                self.insert_history_row(0, row)
+            if rows:
+                self.history_newest_id = rows[-1][0]
+            if len(rows) < self.HISTORY_PAGE_SIZE:
+                return
+
+    def insert_history_row(self, index, row):
+        """Add one history row to the tree, keyed by its row id"""
+        query_id, query, time, duration, success = row
+        status = "Success" if success else "Failed"
+        self.history_tree.insert(
+            "",
+            index,
+            iid=str(query_id),
+            values=(
+                query[:50] + "..." if len(query) > 50 else query,
+                time,
+                f"{duration:.2f}",
+                status,
+            ),
+        )
+
+    def schedule_history_search(self, event=None):
+        """Re-run the history search once typing pauses"""
+        if self._history_search_id is not None:
+            self.parent.after_cancel(self._history_search_id)
+        self._history_search_id = self.parent.after(150, self._run_history_search)
+
+    def _run_history_search(self):
+        self._history_search_id = None
+        self.history_newest_id = None  # Row ids bounding the loaded history
+        self.history_oldest_id = None
+        self.history_exhausted = False
+        self.refresh_history()
+
+    def clear_history_search(self, event=None):
+        self.history_search.set("")
+        self.refresh_history()
+
+    def history_query(self, item):
+        """Full text of the query shown in a history tree row"""
+        return self.query_history.get_query(int(item))
 
     def load_query_from_history(self, event):
         """Load and execute selected query from history"""
-        selected_item = self.history_tree.selection()[0]
-        query = self.history_tree.item(selected_item)["values"][0]
-
-        # If the query was truncated, get the full query from the database
-        if query.endswith("..."):
-            # Get the full query from the history database
-            history = self.query_history.get_query_history()
-            for full_query, _, _, _ in history:
-                if full_query.startswith(query[:-3]):
-                    query = full_query
-                    break
+        selected_items = self.history_tree.selection()
+        if not selected_items:
+            return
+        query = self.history_query(selected_items[0])
+        if query is None:
+            return
 
         # Load query into editor
         self.query_text.delete("1.0", tk.END)
@@ -341,43 +1432,21 @@ class DatabaseWidgets:
         # Execute the query
         self.execute_query()
 
-    def show_table_preview(self, event):
-        """Show first 50 entries of the selected table"""
+    def browse_table(self, event=None):
+        """Browse the selected table in its own results tab"""
         selection = self.table_list.curselection()
         if not selection:
             return
+        table = self.schema_cache.table(*self.table_keys[selection[0]])
+        if table is None:
+            return
 
-        table_name = self.table_list.get(selection[0])
-        query = f'SELECT * FROM public."{table_name}" LIMIT 50;'
-
-        # Append the query on a new line and place cursor at the end
-        current_text = self.query_text.get("1.0", tk.END).rstrip()
-        if current_text:
-            query = f"\n{query}"  # Add newline only if there's existing text
-        self.query_text.insert(tk.END, query)
-        self.query_text.see(tk.END)  # Scroll to the end
-        # Place cursor right before the semicolon
-        self.query_text.mark_set(
-            tk.INSERT, f"{tk.END}-2c"
-        )  # -2c means 2 characters from end
-
-        # Execute the query
-        self.execute_single_query(query.rstrip(";"))  # Remove semicolon for execution
-
-    def load_workspace(self):
-        """Load query content from workspace file"""
-        try:
-            with open(self.workspace_file, "r") as f:
-                content = f.read()
-                self.query_text.delete("1.0", tk.END)
-                self.query_text.insert("1.0", content)
-        except FileNotFoundError:
-            pass  # Ignore if file doesn't exist yet
-
-    def save_workspace(self, event=None):
-        """Save query content to workspace file"""
-        if self.query_text.edit_modified():  # Check if text was modified
-            content = self.query_text.get("1.0", tk.END).strip()
-            with open(self.workspace_file, "w") as f:
-                f.write(content)
-            self.query_text.edit_modified(False)  # Reset modified flag
+        browser = TableBrowser(
+            self.results_tabs,
+            self.db,
+            table,
+            self.run_in_background,
+            query_mapper=self.query_mapper,
+        )
+        self.results_tabs.add(browser, text=f"Browse: {table.display_name}")
+        self.results_tabs.select(browser)
@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 import os
 
+from connection_manager import ClusterProfile
+
 
 class DBConfiguration:
     _instance = None
@@ -20,8 +22,80 @@ class DBConfiguration:
         self.resource_arn = os.getenv("RESOURCE_ARN")
         self.secret_arn = os.getenv("SECRET_ARN")
 
+        # Optional per-query timeout in seconds (0 or unset disables it)
+        self.query_timeout = float(os.getenv("QUERY_TIMEOUT") or 0) or None
+
+        # Rows per page when streaming SELECT results
+        self.fetch_batch_size = int(os.getenv("FETCH_BATCH_SIZE") or 1000)
+
+        # Wire format for streamed results: NONE (typed fields) or JSON
+        self.record_format = (os.getenv("RECORD_FORMAT") or "NONE").upper()
+
+        # Result cache for read-only statements, disabled unless a TTL is set
+        self.result_cache_ttl = float(os.getenv("RESULT_CACHE_TTL") or 0)
+        self.result_cache_max_entries = int(
+            os.getenv("RESULT_CACHE_MAX_ENTRIES") or 100
+        )
+        self.result_cache_max_bytes = int(
+            os.getenv("RESULT_CACHE_MAX_BYTES") or 64 * 1024 * 1024
+        )
+
+        # Chunks sent at once by the bulk importer
+        self.import_concurrency = int(os.getenv("IMPORT_CONCURRENCY") or 4)
+
+        # Statements run at once by Run Parallel; a prefixed PARALLEL_QUERIES
+        # sets it for one cluster
+        self.parallel_queries = int(os.getenv("PARALLEL_QUERIES") or 4)
+
+        # Response bytes after which a result is moved to a temporary SQLite
+        # file and sorted and filtered there (0 keeps every result in memory)
+        self.result_spill_bytes = int(
+            os.getenv("RESULT_SPILL_BYTES") or 64 * 1024 * 1024
+        )
+
+        # Named clusters: the unprefixed variables above form the "default"
+        # cluster, and every name in CLUSTERS reads the same variables with
+        # its upper-cased name as a prefix, e.g. STAGING_RESOURCE_ARN
+        self.clusters = []
+        names = ["default"] + (os.getenv("CLUSTERS") or "").split(",")
+        for name in dict.fromkeys(name.strip() for name in names):
+            prefix = "" if name == "default" else f"{name.upper()}_"
+            if name and os.getenv(f"{prefix}RESOURCE_ARN"):
+                self.clusters.append(self._cluster_profile(name, prefix))
+        self.default_cluster = os.getenv("DEFAULT_CLUSTER") or (
+            self.clusters[0].name if self.clusters else None
+        )
+
         # Check if all required environment variables are set
-        if not all([self.db_name, self.resource_arn, self.secret_arn]):
+        if not self.clusters or not all(
+            [c.database_name and c.secret_arn for c in self.clusters]
+        ):
             raise ValueError(
                 "Missing required environment variables. Please check your .env file."
             )
+
+    def _cluster_profile(self, name, prefix):
+        """A ClusterProfile from prefixed variables, falling back to global ones"""
+
+        def get(key, default=None):
+            return os.getenv(f"{prefix}{key}") or os.getenv(key) or default
+
+        parallel_queries = int(get("PARALLEL_QUERIES", self.parallel_queries))
+        # The pool must hold the parallel queries and import chunks in flight
+        pool_size = max(10, parallel_queries + self.import_concurrency + 2)
+        return ClusterProfile(
+            name,
+            os.getenv(f"{prefix}DB_NAME"),
+            os.getenv(f"{prefix}RESOURCE_ARN"),
+            os.getenv(f"{prefix}SECRET_ARN"),
+            region=get("AWS_REGION"),
+            aws_profile=get("AWS_PROFILE"),
+            max_pool_connections=int(get("RDS_MAX_POOL_CONNECTIONS", pool_size)),
+            connect_timeout=float(get("RDS_CONNECT_TIMEOUT", 5)),
+            read_timeout=float(get("RDS_READ_TIMEOUT", 60)),
+            retry_mode=get("RDS_RETRY_MODE", "adaptive"),
+            max_attempts=int(get("RDS_MAX_ATTEMPTS", 5)),
+            tcp_keepalive=get("RDS_TCP_KEEPALIVE", "true").lower()
+            in ("1", "true", "yes"),
+            parallel_queries=parallel_queries,
+        )
@@ -1,24 +1,60 @@
-from aurora_db_manager import AuroraDBManager
+import startup_timing
+import functools
+from connection_manager import ConnectionManager
 from db_config import DBConfiguration
+from result_cache import ResultCache
 import tkinter as tk
 from query_mapper import QueryMapper
 from database_widgets import DatabaseWidgets
 
+startup_timing.mark("imports")
+
 
 class DatabaseGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Aurora Database Manager")
 
-        # Initialize database connection
+        # Initialize database connections, one result cache per cluster
         config = DBConfiguration()
-        self.db = AuroraDBManager(
-            config.db_name, config.resource_arn, config.secret_arn
+        result_cache_factory = None
+        if config.result_cache_ttl:
+            result_cache_factory = functools.partial(
+                ResultCache,
+                ttl=config.result_cache_ttl,
+                max_entries=config.result_cache_max_entries,
+                max_bytes=config.result_cache_max_bytes,
+            )
+
+        self.connections = ConnectionManager(
+            config.clusters,
+            result_cache_factory=result_cache_factory,
+            batch_size=config.fetch_batch_size,
+            record_format=config.record_format,
         )
+        self.db = self.connections.manager(config.default_cluster)
         self.query_mapper = QueryMapper()
+        startup_timing.mark("configuration")
 
         # Create widgets using the new class
-        self.widgets = DatabaseWidgets(self.root, self.db, self.query_mapper)
+        self.widgets = DatabaseWidgets(
+            self.root,
+            self.db,
+            self.query_mapper,
+            query_timeout=config.query_timeout,
+            import_concurrency=config.import_concurrency,
+            parallel_queries=self.connections.profiles[
+                config.default_cluster
+            ].parallel_queries,
+            spill_bytes=config.result_spill_bytes,
+            connections=self.connections,
+        )
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        startup_timing.mark("widgets built")
+
+    def close(self):
+        self.widgets.close()
+        self.root.destroy()
 
 
 if __name__ == "__main__":
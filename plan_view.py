@@ -0,0 +1,122 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Nodes whose actual rows are off from the estimate by this factor are marked
+MISESTIMATE_FACTOR = 10
+
+
+def _number(value, digits=0):
+    return "" if value is None else f"{value:,.{digits}f}"
+
+
+class PlanView(ttk.Frame):
+    """Results tab showing a QueryPlan as a tree with per-node measurements.
+
+    Every node shows estimated and actual rows, both per loop as EXPLAIN
+    reports them, loops, self and total time, cost and shared buffer hits
+    and reads. The node with the most time of
+    its own is highlighted, and nodes whose row estimate is off by
+    MISESTIMATE_FACTOR or more are marked. ``changes`` from
+    ``compare_plans`` against the previous plan of the query are listed
+    above the tree.
+    """
+
+    COLUMNS = (
+        ("rows", "Rows per loop est / actual", 170),
+        ("loops", "Loops", 60),
+        ("time", "Time ms self / total", 150),
+        ("cost", "Cost", 90),
+        ("buffers", "Buffers hit / read", 130),
+    )
+
+    def __init__(self, parent, plan, changes=None, previous_time=None):
+        super().__init__(parent)
+        self.plan = plan
+
+        summary = f"Total cost {_number(plan.total_cost, 2)}"
+        if plan.planning_time is not None:
+            summary += f", planning {plan.planning_time:.2f} ms"
+        if plan.execution_time is not None:
+            summary += f", execution {plan.execution_time:.2f} ms"
+        ttk.Label(self, text=summary).pack(fill=tk.X)
+
+        if changes is None:
+            comparison = "First plan recorded for this query"
+        elif changes:
+            comparison = f"Plan changed since the run at {previous_time}:\n"
+            comparison += "\n".join(f"  {change}" for change in changes)
+        else:
+            comparison = f"Same plan as the run at {previous_time}"
+        ttk.Label(
+            self,
+            text=comparison,
+            foreground="#B00020" if changes else "",
+            justify=tk.LEFT,
+        ).pack(fill=tk.X)
+
+        tree_frame = ttk.Frame(self)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(
+            tree_frame, columns=[name for name, _, _ in self.COLUMNS]
+        )
+        self.tree.heading("#0", text="Node")
+        self.tree.column("#0", width=360)
+        for name, heading, width in self.COLUMNS:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor=tk.E, stretch=False)
+        self.tree.tag_configure("slowest", background="#FFE0B2")
+        self.tree.tag_configure("misestimate", foreground="#B00020")
+        scrollbar = ttk.Scrollbar(
+            tree_frame, orient=tk.VERTICAL, command=self.tree.yview
+        )
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        nodes = plan.nodes()
+        timed = [node for node in nodes if node.self_time is not None]
+        slowest = max(timed, key=lambda node: node.self_time) if timed else None
+        self._insert(plan.root, "", slowest)
+
+    def _insert(self, node, parent, slowest):
+        tags = []
+        if node is slowest:
+            tags.append("slowest")
+        if self._misestimated(node):
+            tags.append("misestimate")
+
+        rows = _number(node.estimated_rows)
+        if node.actual_rows is not None:
+            rows += f" / {_number(node.actual_rows)}"
+        time = ""
+        if node.total_time is not None:
+            time = f"{_number(node.self_time, 2)} / {_number(node.total_time, 2)}"
+        buffers = ""
+        if node.shared_hit is not None or node.shared_read is not None:
+            buffers = f"{_number(node.shared_hit)} / {_number(node.shared_read)}"
+
+        item = self.tree.insert(
+            parent,
+            tk.END,
+            text=node.label,
+            values=(
+                rows,
+                _number(node.loops),
+                time,
+                _number(node.total_cost, 2),
+                buffers,
+            ),
+            tags=tags,
+            open=True,
+        )
+        for child in node.children:
+            self._insert(child, item, slowest)
+
+    @staticmethod
+    def _misestimated(node):
+        if node.actual_rows is None or node.estimated_rows is None:
+            return False
+        # Estimates are per loop, like actual rows
+        estimated = max(node.estimated_rows, 1)
+        actual = max(node.actual_rows, 1)
+        return max(estimated, actual) / min(estimated, actual) >= MISESTIMATE_FACTOR
@@ -0,0 +1,484 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import itertools
+import queue
+import random
+import threading
+import time
+
+from columnar_result import ColumnarResult
+from result_cache import estimate_size
+import value_decoder
+
+# Data API error codes that mean the request was throttled and may be retried
+THROTTLING_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "ServiceUnavailableError",
+}
+
+
+def is_throttling_error(error):
+    """Whether an exception from boto3 reports throttling"""
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    if code in THROTTLING_CODES:
+        return True
+    return "rate exceeded" in str(error).lower()
+
+
+class QueryTiming:
+    """Seconds spent in each phase of a query and the size of its responses.
+
+    ``request`` covers the Data API calls including the network, ``decode``
+    building the ColumnarResult, ``format`` turning values into text and
+    sizing columns, and ``render`` drawing the result.
+    """
+
+    PHASES = ("request", "decode", "format", "render")
+
+    def __init__(self):
+        self.request = 0.0
+        self.decode = 0.0
+        self.format = 0.0
+        self.render = 0.0
+        self.response_bytes = 0
+
+    @contextlib.contextmanager
+    def measure(self, phase):
+        """Add the time spent in a ``with`` block to a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, phase, getattr(self, phase) + time.perf_counter() - start)
+
+    def pages(self, pages):
+        """Iterate over response pages, timing each request and sizing it"""
+        pages = iter(pages)
+        while True:
+            start = time.perf_counter()
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            finally:
+                self.request += time.perf_counter() - start
+            self.response_bytes += estimate_size(page)
+            yield page
+
+    def summary(self):
+        phases = ", ".join(
+            f"{phase} {getattr(self, phase):.2f}s" for phase in self.PHASES
+        )
+        return f"{phases}, {self.response_bytes / 1e6:.1f} MB"
+
+
+class QueryJob:
+    """A single statement queued on the QueryExecutor"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMED_OUT = "timed out"
+
+    def __init__(self, job_id, sql, on_complete, timeout=None, on_batch=None):
+        self.id = job_id
+        self.sql = sql
+        self.on_complete = on_complete
+        self.on_batch = on_batch
+        self.timeout = timeout
+        self.batches = 0
+        self.rows = 0
+        self.cache_age = None  # Seconds, when served from the result cache
+        self.timing = QueryTiming()
+        self.status = self.PENDING
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def succeeded(self):
+        return self.status == self.DONE
+
+    @property
+    def duration(self):
+        """Seconds between the worker picking the job up and its completion"""
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+
+class QueryExecutor:
+    """Run statements on worker threads and hand results back to the Tk thread.
+
+    Jobs run one at a time in submission order. Each job gets its own daemon
+    thread, and results are pushed onto a queue that is drained from the Tk
+    event loop with ``after()`` polling, so callbacks always run on the UI
+    thread. Jobs submitted with ``on_batch`` are fetched through
+    ``stream_query`` and receive each page as soon as it arrives.
+
+    The Data API has no way to abort an in-flight ``execute_statement`` call,
+    so cancelling or timing out a job abandons its worker: the job is finished
+    immediately and whatever the worker eventually returns is discarded.
+    """
+
+    def __init__(self, root, db, poll_interval=50, on_state_change=None):
+        self.root = root
+        self.db = db
+        self.poll_interval = poll_interval
+        self.on_state_change = on_state_change
+        self._ids = itertools.count(1)
+        self._pending = collections.deque()
+        self._results = queue.Queue()
+        self._current = None
+        self._poll_id = None
+
+    @property
+    def busy(self):
+        return self._current is not None
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def queued(self):
+        return len(self._pending)
+
+    def submit(self, sql, on_complete, timeout=None, on_batch=None):
+        """Queue a statement; callbacks run on the Tk thread.
+
+        ``on_batch(job, response)`` is called for every page of a streamed
+        result, ``on_complete(job)`` once the job has finished either way.
+        """
+        job = QueryJob(next(self._ids), sql, on_complete, timeout, on_batch)
+        self._pending.append(job)
+        self._start_next()
+        self._notify()
+        return job
+
+    def submit_many(self, statements, on_complete, timeout=None, on_batch=None):
+        """Queue several statements to run back to back"""
+        return [self.submit(sql, on_complete, timeout, on_batch) for sql in statements]
+
+    def cancel(self):
+        """Cancel the running statement; queued statements still run"""
+        if self._current is not None:
+            self._finish(self._current, QueryJob.CANCELLED)
+
+    def cancel_all(self):
+        """Cancel the running statement and drop everything queued behind it"""
+        while self._pending:
+            job = self._pending.popleft()
+            job.status = QueryJob.CANCELLED
+            job.finished_at = time.time()
+            job.on_complete(job)
+        self.cancel()
+        self._notify()
+
+    def _start_next(self):
+        if self._current is not None or not self._pending:
+            return
+
+        job = self._pending.popleft()
+        job.status = QueryJob.RUNNING
+        job.started_at = time.time()
+        self._current = job
+
+        worker = threading.Thread(target=self._run, args=(job,), daemon=True)
+        worker.start()
+        self._schedule_poll()
+
+    def _run(self, job):
+        """Worker thread body; never touches Tk"""
+        try:
+            if job.on_batch is None:
+                with job.timing.measure("request"):
+                    result = self.db.execute_query(job.sql)
+            else:
+                result = None
+                for batch in job.timing.pages(self.db.stream_query(job.sql)):
+                    # Stop paging once the job has been cancelled or timed out
+                    if job.status != QueryJob.RUNNING:
+                        return
+                    self._results.put((job, "batch", batch))
+        except Exception as e:
+            self._results.put((job, "error", e))
+        else:
+            self._results.put((job, "done", result))
+
+    def _schedule_poll(self):
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+
+        while True:
+            try:
+                job, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            # Results of cancelled or timed out jobs are dropped
+            if job is not self._current:
+                continue
+            if kind == "batch":
+                self._deliver_batch(job, payload)
+            elif kind == "error":
+                self._finish(job, QueryJob.FAILED, error=payload)
+            else:
+                self._finish(job, QueryJob.DONE, payload)
+
+        job = self._current
+        if job is not None and job.timeout and job.duration > job.timeout:
+            self._finish(
+                job,
+                QueryJob.TIMED_OUT,
+                error=TimeoutError(f"Query timed out after {job.timeout:g}s"),
+            )
+
+        if self._current is not None or self._pending:
+            self._schedule_poll()
+
+    def _deliver_batch(self, job, batch):
+        job.batches += 1
+        job.rows += value_decoder.record_count(batch)
+        if job.batches == 1:
+            job.cache_age = batch.get("cacheAge")
+        try:
+            job.on_batch(job, batch)
+        except Exception as e:
+            self._finish(job, QueryJob.FAILED, error=e)
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        self._current = None
+
+        try:
+            job.on_complete(job)
+        finally:
+            self._start_next()
+            self._notify()
+
+    def _notify(self):
+        if self.on_state_change is not None:
+            self.on_state_change(self)
+
+
+class AdaptiveLimit:
+    """Concurrency limit for one cluster that adapts to throttling.
+
+    Each throttled call halves the limit and doubles the delay before the
+    next retry, each successful one raises the limit by one (up to
+    ``maximum``) and halves the delay again.
+    """
+
+    BASE_DELAY = 0.2
+    MAX_DELAY = 10.0
+
+    def __init__(self, maximum):
+        self.maximum = max(1, maximum)
+        self.limit = self.maximum
+        self.active = 0
+        self.delay = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+
+    def release(self, throttled=None):
+        """Give a slot back; ``throttled`` is None when no call was made"""
+        with self._condition:
+            self.active -= 1
+            if throttled is None:
+                pass
+            elif throttled:
+                self.limit = max(1, self.limit // 2)
+                self.delay = min(self.MAX_DELAY, self.delay * 2 or self.BASE_DELAY)
+            else:
+                self.limit = min(self.maximum, self.limit + 1)
+                self.delay = self.delay / 2 if self.delay > self.BASE_DELAY else 0.0
+            self._condition.notify_all()
+
+    def backoff(self):
+        """Seconds to wait before retrying a throttled call, with jitter"""
+        return self.delay * random.uniform(0.5, 1.0)
+
+
+_cluster_limits = {}
+_cluster_limits_lock = threading.Lock()
+
+
+def cluster_limit(resource_arn, maximum):
+    """The AdaptiveLimit shared by every parallel run against a cluster"""
+    with _cluster_limits_lock:
+        limit = _cluster_limits.get(resource_arn)
+        if limit is None or limit.maximum != max(1, maximum):
+            limit = _cluster_limits[resource_arn] = AdaptiveLimit(maximum)
+        return limit
+
+
+class ParallelExecutor:
+    """Run independent read-only statements concurrently.
+
+    Statements are fetched to completion on a bounded thread pool and
+    decoded into a ColumnarResult on the worker, then handed to the Tk thread
+    one by one as they finish, through the same queue and ``after()``
+    polling as QueryExecutor. How many run at once is bounded by the
+    cluster's AdaptiveLimit, and throttled statements are retried after its
+    backoff. Cancelling abandons running statements like QueryExecutor does.
+    """
+
+    def __init__(self, root, db, max_workers=4, poll_interval=50, on_state_change=None):
+        self.root = root
+        self.db = db
+        self.max_workers = max_workers
+        self.limit = cluster_limit(db.resource_arn, max_workers)
+        self.poll_interval = poll_interval
+        self.on_state_change = on_state_change
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._ids = itertools.count(1)
+        self._jobs = []
+        self._results = queue.Queue()
+        self._poll_id = None
+
+    @property
+    def jobs(self):
+        return list(self._jobs)
+
+    @property
+    def busy(self):
+        return any(job.finished_at is None for job in self._jobs)
+
+    @property
+    def finished(self):
+        return sum(1 for job in self._jobs if job.finished_at is not None)
+
+    def submit(self, statements, on_complete, timeout=None):
+        """Start every statement; ``on_complete(job)`` runs on the Tk thread.
+
+        A finished job's ``result`` is a ColumnarResult, or the raw response
+        for statements that return no result set.
+        """
+        jobs = [
+            QueryJob(next(self._ids), sql, on_complete, timeout) for sql in statements
+        ]
+        self._jobs = [job for job in self._jobs if job.finished_at is None] + jobs
+        for job in jobs:
+            self._pool.submit(self._run, job)
+        self._schedule_poll()
+        self._notify()
+        return jobs
+
+    def set_db(self, db, max_workers=None):
+        """Run statements submitted from now on against another cluster.
+
+        ``max_workers`` is that cluster's own limit, if it has one.
+        """
+        self.db = db
+        if max_workers is not None and max_workers != self.max_workers:
+            self.max_workers = max_workers
+            # Statements still running keep the old pool until they finish
+            self._pool.shutdown(wait=False)
+            self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self.limit = cluster_limit(db.resource_arn, self.max_workers)
+
+    def cancel(self):
+        """Cancel every statement that has not finished yet"""
+        for job in self._jobs:
+            if job.finished_at is None:
+                self._finish(job, QueryJob.CANCELLED)
+        self._notify()
+
+    def _run(self, job):
+        """Worker thread body; never touches Tk"""
+        while True:
+            self.limit.acquire()
+            if job.status not in (QueryJob.PENDING, QueryJob.RUNNING):
+                self.limit.release()
+                return
+            if job.started_at is None:
+                job.started_at = time.time()
+                job.status = QueryJob.RUNNING
+            try:
+                result = None
+                for page in job.timing.pages(self.db.stream_query(job.sql)):
+                    if job.status != QueryJob.RUNNING:
+                        break
+                    with job.timing.measure("decode"):
+                        if not value_decoder.has_records(page):
+                            result = page
+                        elif result is None:
+                            result = ColumnarResult.from_response(page)
+                        else:
+                            result.extend(page)
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self.limit.release(throttled)
+                if throttled:
+                    time.sleep(self.limit.backoff())
+                    continue
+                self._results.put((job, "error", e))
+                return
+            self.limit.release(throttled=False)
+            self._results.put((job, "done", result))
+            return
+
+    def _schedule_poll(self):
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+
+        while True:
+            try:
+                job, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            # Results of cancelled or timed out jobs are dropped
+            if job.finished_at is not None:
+                continue
+            if kind == "error":
+                self._finish(job, QueryJob.FAILED, error=payload)
+            else:
+                if isinstance(payload, ColumnarResult):
+                    job.rows = len(payload)
+                self._finish(job, QueryJob.DONE, payload)
+
+        for job in self._jobs:
+            if job.finished_at is None and job.timeout and job.duration > job.timeout:
+                self._finish(
+                    job,
+                    QueryJob.TIMED_OUT,
+                    error=TimeoutError(f"Query timed out after {job.timeout:g}s"),
+                )
+
+        self._notify()
+        if self.busy:
+            self._schedule_poll()
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if job.started_at is None:
+            job.started_at = job.finished_at
+        job.on_complete(job)
+
+    def _notify(self):
+        if self.on_state_change is not None:
+            self.on_state_change(self)
@@ -1,15 +1,104 @@
+import itertools
+import logging
+import math
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
-import os
+
+import sql_text
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values sorted in ascending order"""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class QueryStats:
+    """Latency of one normalized query over its successful runs"""
+
+    PHASES = ("request", "decode", "format", "render")
+
+    def __init__(self, query, rows):
+        # rows are (duration, row_count, request, decode, format, render)
+        durations = [row[0] for row in rows]
+        self.query = query
+        self.count = len(durations)
+        self.p50 = percentile(durations, 0.5)
+        self.p95 = percentile(durations, 0.95)
+        self.max = durations[-1]
+        self.total = sum(durations)
+        self.rows = self._mean(row[1] for row in rows)
+        # Mean seconds per phase, None for queries recorded without timings
+        self.phases = {
+            phase: self._mean(row[2 + i] for row in rows)
+            for i, phase in enumerate(self.PHASES)
+        }
+
+    @staticmethod
+    def _mean(values):
+        values = [value for value in values if value is not None]
+        return sum(values) / len(values) if values else None
 
 
 class QueryHistory:
-    def __init__(self):
-        self.db_path = "query_history.db"
+    """Executed statements, stored in a local SQLite database.
+
+    A single connection in WAL mode is kept open for the lifetime of the
+    store and shared by the UI and a writer thread under a lock. ``add_query``
+    only queues the row; the writer inserts whatever has accumulated in one
+    transaction. A batch that fails with a transient error, such as a locked
+    database, is retried a few times and then dropped and logged, so the
+    writer keeps running. Reads see queued rows once ``flush`` has returned
+    True. Query
+    text is indexed with FTS5 when the SQLite build has it, otherwise
+    ``search`` falls back to a substring scan.
+
+    Opening only creates what inserts need. Indexes, the normalization of
+    rows from earlier versions and the search index are set up by
+    ``migrate``, which can take a while on a large history; pass
+    ``migrate=False`` to run it later on another thread. Until then
+    ``search`` uses the substring scan.
+    """
+
+    # Rows inserted per transaction by the writer thread
+    WRITE_BATCH_SIZE = 100
+    # Tries of a batch that fails with sqlite3.OperationalError
+    WRITE_ATTEMPTS = 3
+    # Seconds flush waits for the writer by default
+    FLUSH_TIMEOUT = 5.0
+
+    # Columns added after the table was first released, with their types
+    ADDED_COLUMNS = {
+        "normalized_query": "TEXT",
+        "row_count": "INTEGER",
+        "response_bytes": "INTEGER",
+        "request_time": "REAL",
+        "decode_time": "REAL",
+        "format_time": "REAL",
+        "render_time": "REAL",
+        "query_plan": "TEXT",
+        "plan_cost": "REAL",
+    }
+
+    def __init__(self, db_path="query_history.db", migrate=True):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.has_fts = False
         self._initialize_db()
+        if migrate:
+            self.migrate()
+
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
 
     def _initialize_db(self):
-        """Create the database and tables if they don't exist"""
+        """Create the table with every column if it doesn't exist"""
         create_table_sql = """
         CREATE TABLE IF NOT EXISTS query_history (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -20,50 +109,327 @@ class QueryHistory:
         )
         """
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock, self._conn as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL stays consistent with NORMAL; only the last commits can be lost
+            conn.execute("PRAGMA synchronous=NORMAL")
             conn.execute(create_table_sql)
-            conn.commit()
+            self._add_columns(conn)
 
-    def add_query(self, query_text, duration, success):
-        """Add a query to the history"""
+    def migrate(self):
+        """Create the indexes and search table and normalize old rows"""
+        with self._lock, self._conn as conn:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS query_history_time "
+                "ON query_history (execution_time)"
+            )
+            # Latency statistics read durations in this order
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS query_history_normalized "
+                "ON query_history (normalized_query, execution_duration)"
+            )
+            self._normalize_old_rows(conn)
+            self.has_fts = self._initialize_fts(conn)
+
+    def _add_columns(self, conn):
+        """Add the timing and plan columns to history files of earlier versions"""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(query_history)")}
+        for name, column_type in self.ADDED_COLUMNS.items():
+            if name not in existing:
+                conn.execute(
+                    f"ALTER TABLE query_history ADD COLUMN {name} {column_type}"
+                )
+
+    def _normalize_old_rows(self, conn):
+        """Fill in normalized_query for rows written before it existed"""
+        rows = conn.execute(
+            "SELECT id, query_text FROM query_history WHERE normalized_query IS NULL"
+        ).fetchall()
+        conn.executemany(
+            "UPDATE query_history SET normalized_query = ? WHERE id = ?",
+            [(sql_text.normalize_sql(text), row_id) for row_id, text in rows],
+        )
+
+    def _initialize_fts(self, conn):
+        """Create the FTS5 index over query_text; False when FTS5 is missing"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'query_history_fts'"
+        ).fetchone()
+        if exists:
+            return True
+
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE query_history_fts USING fts5(
+                    query_text, content='query_history', content_rowid='id'
+                )
+                """)
+        except sqlite3.OperationalError:
+            return False
+
+        conn.execute("""
+            CREATE TRIGGER query_history_ai AFTER INSERT ON query_history BEGIN
+                INSERT INTO query_history_fts (rowid, query_text)
+                VALUES (new.id, new.query_text);
+            END
+            """)
+        conn.execute("""
+            CREATE TRIGGER query_history_ad AFTER DELETE ON query_history BEGIN
+                INSERT INTO query_history_fts (query_history_fts, rowid, query_text)
+                VALUES ('delete', old.id, old.query_text);
+            END
+            """)
+        # Index the rows of a history created before search existed
+        conn.execute(
+            "INSERT INTO query_history_fts (query_history_fts) VALUES ('rebuild')"
+        )
+        return True
+
+    def _write_loop(self):
+        """Writer thread body: insert queued rows in batches"""
+        while True:
+            rows = [self._writes.get()]
+            while len(rows) < self.WRITE_BATCH_SIZE:
+                try:
+                    rows.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in rows
+            batch = [row for row in rows if row is not None]
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                for _ in rows:
+                    self._writes.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        """Insert a batch, retrying transient errors; failures are logged"""
+        for attempt in range(1, self.WRITE_ATTEMPTS + 1):
+            try:
+                self._insert(batch)
+                return
+            except sqlite3.OperationalError:
+                # A locked or full database may recover
+                if attempt < self.WRITE_ATTEMPTS:
+                    time.sleep(0.2 * attempt)
+                    continue
+                logger.exception("Dropped %d query history rows", len(batch))
+            except Exception:
+                logger.exception("Dropped %d query history rows", len(batch))
+            return
+
+    def _insert(self, rows):
         insert_sql = """
-        INSERT INTO query_history (query_text, execution_time, execution_duration, success)
-        VALUES (?, ?, ?, ?)
+        INSERT INTO query_history (
+            query_text, execution_time, execution_duration, success,
+            normalized_query, row_count, response_bytes,
+            request_time, decode_time, format_time, render_time,
+            query_plan, plan_cost
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                insert_sql, (query_text, datetime.now().isoformat(), duration, success)
+        # Normalizing is left to the writer thread, off the UI thread
+        rows = [(*row[:4], sql_text.normalize_sql(row[0]), *row[4:]) for row in rows]
+        with self._lock, self._conn as conn:
+            conn.executemany(insert_sql, rows)
+
+    def add_query(
+        self, query_text, duration, success, rows=None, timing=None, plan=None
+    ):
+        """Queue a query for the writer thread to add to the history.
+
+        ``rows`` is the number of rows returned, ``timing`` an optional
+        QueryTiming with the per-phase breakdown of ``duration`` and
+        ``plan`` an optional QueryPlan captured with the run.
+        """
+        measured = (None,) * 5
+        if timing is not None:
+            measured = (
+                timing.response_bytes,
+                timing.request,
+                timing.decode,
+                timing.format,
+                timing.render,
+            )
+        self._writes.put(
+            (
+                query_text,
+                datetime.now().isoformat(),
+                duration,
+                bool(success),
+                rows,
+                *measured,
+                plan.to_json() if plan is not None else None,
+                plan.total_cost if plan is not None else None,
             )
-            conn.commit()
+        )
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Block until every queued query has been written or dropped.
+
+        Returns False when the writer did not finish within ``timeout``
+        seconds, so a stuck writer cannot hold up the caller's thread.
+        """
+        done = self._writes.all_tasks_done
+        with done:
+            return done.wait_for(lambda: not self._writes.unfinished_tasks, timeout)
+
+    def close(self):
+        """Write what is still queued and close the connection"""
+        if self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
 
-    def get_query_history(self, limit=100):
-        """Retrieve the most recent queries"""
-        select_sql = """
-        SELECT query_text, execution_time, execution_duration, success
+    @staticmethod
+    def _id_range(column, before_id, after_id):
+        """WHERE terms and parameters selecting ids between two bounds"""
+        terms, params = [], []
+        if before_id is not None:
+            terms.append(f"{column} < ?")
+            params.append(before_id)
+        if after_id is not None:
+            terms.append(f"{column} > ?")
+            params.append(after_id)
+        return terms, params
+
+    @staticmethod
+    def _id_order(before_id, after_id):
+        """Rows after an id come oldest first, so paging forward can continue"""
+        return "ASC" if after_id is not None and before_id is None else "DESC"
+
+    def get_query_history(self, limit=100, before_id=None, after_id=None):
+        """Retrieve queries newest first as (id, text, time, duration, success).
+
+        ``before_id`` and ``after_id`` page through the history by row id, so
+        every page costs the same however far back it is. With only
+        ``after_id`` the rows come oldest first instead, so the newer rows
+        can be read page by page from the last id of each page.
+        """
+        terms, params = self._id_range("id", before_id, after_id)
+        where = f"WHERE {' AND '.join(terms)}" if terms else ""
+        select_sql = f"""
+        SELECT id, query_text, execution_time, execution_duration, success
         FROM query_history
-        ORDER BY execution_time DESC
+        {where}
+        ORDER BY id {self._id_order(before_id, after_id)}
         LIMIT ?
         """
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(select_sql, (limit,))
-            return cursor.fetchall()
+        return self._fetch(select_sql, (*params, limit))
 
-    def get_full_query(self, partial_query):
-        """Retrieve the full query text given a partial match"""
-        select_sql = """
-        SELECT query_text
+    def get_query(self, query_id):
+        """Full text of a history entry, or None when it no longer exists"""
+        rows = self._fetch(
+            "SELECT query_text FROM query_history WHERE id = ?", (query_id,)
+        )
+        return rows[0][0] if rows else None
+
+    def search(self, text, limit=100, before_id=None, after_id=None):
+        """Queries containing every word of ``text``, ordered like history.
+
+        Each word is matched as a token prefix through FTS5, so ``ord cust``
+        finds ``SELECT * FROM orders JOIN customers``. Rows and paging work
+        like ``get_query_history``.
+        """
+        words = text.split()
+        if not words:
+            return self.get_query_history(limit, before_id, after_id)
+
+        if not self.has_fts:
+            terms, params = self._id_range("id", before_id, after_id)
+            pattern = text.strip().replace("\\", "\\\\")
+            pattern = pattern.replace("%", "\\%").replace("_", "\\_")
+            terms.insert(0, "query_text LIKE ? ESCAPE '\\'")
+            params.insert(0, f"%{pattern}%")
+            select_sql = f"""
+            SELECT id, query_text, execution_time, execution_duration, success
+            FROM query_history
+            WHERE {' AND '.join(terms)}
+            ORDER BY id {self._id_order(before_id, after_id)}
+            LIMIT ?
+            """
+            return self._fetch(select_sql, (*params, limit))
+
+        # Quote every word so SQL punctuation is not read as FTS syntax
+        match = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+        terms, params = self._id_range("f.rowid", before_id, after_id)
+        terms.insert(0, "query_history_fts MATCH ?")
+        params.insert(0, match)
+        select_sql = f"""
+        SELECT h.id, h.query_text, h.execution_time, h.execution_duration, h.success
+        FROM query_history_fts AS f
+        JOIN query_history AS h ON h.id = f.rowid
+        WHERE {' AND '.join(terms)}
+        ORDER BY f.rowid {self._id_order(before_id, after_id)}
+        LIMIT ?
+        """
+        return self._fetch(select_sql, (*params, limit))
+
+    def get_plan(self, query_id):
+        """EXPLAIN JSON stored with a history entry, or None"""
+        rows = self._fetch(
+            "SELECT query_plan FROM query_history WHERE id = ?", (query_id,)
+        )
+        return rows[0][0] if rows else None
+
+    def plan_history(self, query_text, limit=20, before_id=None):
+        """Runs of the same normalized query that captured a plan.
+
+        Rows are (id, time, duration, plan cost, EXPLAIN JSON), newest
+        first, optionally only those older than ``before_id``.
+        """
+        terms, params = self._id_range("id", before_id, None)
+        terms[:0] = ["normalized_query = ?", "query_plan IS NOT NULL"]
+        params.insert(0, sql_text.normalize_sql(query_text))
+        select_sql = f"""
+        SELECT id, execution_time, execution_duration, plan_cost, query_plan
+        FROM query_history
+        WHERE {' AND '.join(terms)}
+        ORDER BY id DESC
+        LIMIT ?
+        """
+        return self._fetch(select_sql, (*params, limit))
+
+    def latency_stats(self, since=None, limit=100):
+        """QueryStats of successful queries grouped by normalized text.
+
+        Only runs at or after the ISO timestamp ``since`` are counted, and
+        runs with a captured plan are left out since EXPLAIN ANALYZE adds
+        its own overhead. The ``limit`` queries with the largest total time
+        come first.
+        """
+        terms = ["success", "normalized_query IS NOT NULL", "query_plan IS NULL"]
+        params = []
+        if since is not None:
+            terms.append("execution_time >= ?")
+            params.append(since)
+        select_sql = f"""
+        SELECT normalized_query, execution_duration, row_count,
+               request_time, decode_time, format_time, render_time
         FROM query_history
-        WHERE query_text LIKE ?
-        ORDER BY execution_time DESC
-        LIMIT 1
+        WHERE {' AND '.join(terms)}
+        ORDER BY normalized_query, execution_duration
         """
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(select_sql, (partial_query.replace("...", "") + "%",))
-            result = cursor.fetchone()
-            return result[0] if result else None
+        stats = [
+            QueryStats(query, [row[1:] for row in rows])
+            for query, rows in itertools.groupby(
+                self._fetch(select_sql, params), key=lambda row: row[0]
+            )
+        ]
+        stats.sort(key=lambda s: s.total, reverse=True)
+        return stats[:limit]
 
     def get_history(self):
         """Return the full query history"""
@@ -71,6 +437,6 @@ class QueryHistory:
 
     def clear_history(self):
         """Clear all query history"""
-        with sqlite3.connect(self.db_path) as conn:
+        self.flush()
+        with self._lock, self._conn as conn:
             conn.execute("DELETE FROM query_history")
-            conn.commit()
@@ -1,28 +1,19 @@
+from columnar_result import ColumnarResult
+import value_decoder
+
+
 class QueryMapper:
     def format_query_results(self, results):
-        if not isinstance(results, dict) or "records" not in results:
+        if not value_decoder.has_records(results):
             return str(results)
 
-        if not results["records"]:
+        if not value_decoder.record_count(results):
             return "No records found"
 
-        # Extract column names and types from metadata
-        headers = []
-        if "columnMetadata" in results:
-            headers = [
-                f"{col['name']} ({col['typeName']})"
-                for col in results["columnMetadata"]
-            ]
-        else:
-            num_columns = len(results["records"][0])
-            headers = [f"Column {i+1}" for i in range(num_columns)]
-
-        # Calculate column widths
-        col_widths = [len(h) for h in headers]
-        for row in results["records"]:
-            for i, col in enumerate(row):
-                value = str(list(col.values())[0])
-                col_widths[i] = max(col_widths[i], len(value))
+        result = self.decode(results)
+        headers = self.format_headers(result)
+        texts = [column.display_values() for column in result.columns]
+        col_widths = self.column_widths(headers, texts)
 
         # Create header
         header_row = " | ".join(h.ljust(w) for h, w in zip(headers, col_widths))
@@ -30,13 +21,36 @@ class QueryMapper:
 
         # Format table
         table_lines = [header_row, separator]
-
-        # Add data rows
-        for row in results["records"]:
-            values = []
-            for i, col in enumerate(row):
-                value = str(list(col.values())[0])
-                values.append(value.ljust(col_widths[i]))
-            table_lines.append(" | ".join(values))
+        table_lines.extend(self.format_rows(texts, col_widths))
 
         return "\n".join(table_lines)
+
+    def decode(self, results):
+        """Decode an execute_statement response into a ColumnarResult"""
+        return ColumnarResult.from_response(results)
+
+    def format_headers(self, result):
+        """Column names with their types, as shown above the results"""
+        return [
+            f"{column.name} ({column.type_name})" if column.type_name else column.name
+            for column in result.columns
+        ]
+
+    def column_widths(self, headers, texts):
+        """Calculate column widths from the headers and per-column cell text"""
+        return [
+            max(len(header), max(map(len, column), default=0))
+            for header, column in zip(headers, texts)
+        ]
+
+    def format_rows(self, texts, col_widths):
+        """Format per-column cell text into padded table rows.
+
+        Streamed results reuse the widths of their first page, so later values
+        that are wider than the column simply overflow it.
+        """
+        padded = [
+            [text.ljust(width) for text in column]
+            for column, width in zip(texts, col_widths)
+        ]
+        return [" | ".join(row) for row in zip(*padded)]
@@ -0,0 +1,140 @@
+import collections
+import json
+
+# Relative change in total cost that counts as a plan regression or win
+COST_CHANGE_THRESHOLD = 0.2
+
+
+class PlanNode:
+    """One node of a PostgreSQL EXPLAIN (FORMAT JSON) plan tree.
+
+    Times are in milliseconds as EXPLAIN reports them. ``actual_time`` is
+    per loop, so ``total_time`` multiplies it by the number of loops and
+    ``self_time`` leaves out the time spent in the node's children. Actual
+    values are None for plans captured without ANALYZE.
+    """
+
+    def __init__(self, data, depth=0):
+        self.data = data
+        self.depth = depth
+        self.node_type = data.get("Node Type", "?")
+        self.relation = data.get("Relation Name")
+        self.index = data.get("Index Name")
+        self.startup_cost = data.get("Startup Cost")
+        self.total_cost = data.get("Total Cost")
+        self.estimated_rows = data.get("Plan Rows")
+        self.actual_rows = data.get("Actual Rows")
+        self.loops = data.get("Actual Loops")
+        self.actual_time = data.get("Actual Total Time")
+        self.shared_hit = data.get("Shared Hit Blocks")
+        self.shared_read = data.get("Shared Read Blocks")
+        self.children = [PlanNode(child, depth + 1) for child in data.get("Plans", [])]
+
+    @property
+    def label(self):
+        text = self.node_type
+        if self.relation:
+            text += f" on {self.relation}"
+        if self.index:
+            text += f" using {self.index}"
+        return text
+
+    @property
+    def total_time(self):
+        if self.actual_time is None:
+            return None
+        return self.actual_time * (self.loops or 1)
+
+    @property
+    def self_time(self):
+        total = self.total_time
+        if total is None:
+            return None
+        children = sum(child.total_time or 0 for child in self.children)
+        return max(0.0, total - children)
+
+    @property
+    def total_rows(self):
+        """Rows produced over all loops"""
+        if self.actual_rows is None:
+            return None
+        return self.actual_rows * (self.loops or 1)
+
+    def walk(self):
+        """This node and its descendants, depth first"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class QueryPlan:
+    """A parsed EXPLAIN (FORMAT JSON) document"""
+
+    def __init__(self, document):
+        self.document = document
+        entry = document[0] if isinstance(document, list) else document
+        self.root = PlanNode(entry["Plan"])
+        self.planning_time = entry.get("Planning Time")
+        self.execution_time = entry.get("Execution Time")
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text))
+
+    def to_json(self):
+        return json.dumps(self.document)
+
+    @property
+    def analyzed(self):
+        return self.root.actual_time is not None
+
+    @property
+    def total_cost(self):
+        return self.root.total_cost
+
+    def nodes(self):
+        return list(self.root.walk())
+
+    @property
+    def node_types(self):
+        return collections.Counter(node.node_type for node in self.nodes())
+
+    @property
+    def scans(self):
+        """Relation name -> node types that read it"""
+        scans = collections.defaultdict(set)
+        for node in self.nodes():
+            if node.relation:
+                scans[node.relation].add(node.node_type)
+        return scans
+
+
+def compare_plans(old, new, threshold=COST_CHANGE_THRESHOLD):
+    """Differences between two plans of a query worth flagging, as text.
+
+    Reports a change in total cost larger than ``threshold``, node types
+    that appeared or disappeared, and relations read by a different kind of
+    scan. Returns an empty list when the plans look the same.
+    """
+    changes = []
+    if old.total_cost and new.total_cost is not None:
+        change = new.total_cost / old.total_cost - 1
+        if abs(change) > threshold:
+            changes.append(
+                f"Total cost {old.total_cost:,.0f} -> {new.total_cost:,.0f} "
+                f"({change:+.0%})"
+            )
+
+    old_types, new_types = set(old.node_types), set(new.node_types)
+    for node_type in sorted(new_types - old_types):
+        changes.append(f"New node type: {node_type}")
+    for node_type in sorted(old_types - new_types):
+        changes.append(f"Node type gone: {node_type}")
+
+    old_scans, new_scans = old.scans, new.scans
+    for relation in sorted(old_scans.keys() & new_scans.keys()):
+        if old_scans[relation] != new_scans[relation]:
+            before = ", ".join(sorted(old_scans[relation]))
+            after = ", ".join(sorted(new_scans[relation]))
+            changes.append(f"{relation}: {before} -> {after}")
+    return changes
@@ -0,0 +1,116 @@
+import collections
+import threading
+import time
+
+
+class CacheEntry:
+    """Cached response pages of one statement"""
+
+    def __init__(self, pages, tables, size):
+        self.pages = pages
+        self.tables = tables
+        self.size = size
+        self.created_at = time.time()
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+
+class ResultCache:
+    """Thread-safe LRU cache of query results with a time to live.
+
+    Entries are bounded both by count and by their estimated size in bytes.
+    Each entry remembers the tables its statement read so writes can drop
+    just the affected results. ``generation`` changes on every invalidation,
+    letting a reader that started before a write refuse to store its now
+    possibly stale result.
+    """
+
+    def __init__(self, ttl=300, max_entries=100, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return a fresh entry and mark it as recently used, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.age > self.ttl:
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, pages, tables, size, generation=None):
+        """Store the pages of a statement, evicting least recently used entries"""
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(pages, tables, size)
+            self.bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self.bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tables(self, tables):
+        """Drop entries that read any of the tables; None drops everything"""
+        with self._lock:
+            self.generation += 1
+            if tables is None:
+                self._entries.clear()
+                self.bytes = 0
+                return
+
+            tables = {table.lower() for table in tables}
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.tables is None
+                or any(table.lower() in tables for table in entry.tables)
+            ]
+            for key in stale:
+                self._remove(key)
+
+    def clear(self):
+        self.invalidate_tables(None)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+
+def estimate_size(response):
+    """Approximate size of a Data API response in bytes"""
+    headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    if "content-length" in headers:
+        return int(headers["content-length"])
+    if "formattedRecords" in response:
+        return len(response["formattedRecords"])
+
+    # Without a wire size, assume a fixed cost per field
+    records = response.get("records") or []
+    return 256 + sum(len(record) for record in records) * 32
@@ -0,0 +1,221 @@
+import base64
+import contextlib
+import csv
+import datetime
+import decimal
+import importlib.util
+import json
+import os
+import time
+import uuid
+
+from columnar_result import ColumnarResult
+import sql_text
+import value_decoder
+
+FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+}
+
+
+def format_for_path(path):
+    """Export format implied by a file name, defaulting to CSV"""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+
+
+def available_formats():
+    """Formats that can be written here; Parquet needs pyarrow"""
+    # pyarrow is optional and only imported once a Parquet file is written
+    has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+    return ["csv", "jsonl"] + (["parquet"] if has_pyarrow else [])
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class CsvWriter:
+    def __init__(self, f, names, type_names):
+        self.writer = csv.writer(f)
+        self.writer.writerow(names)
+
+    def write(self, result):
+        texts = [column.display_values(null_text="") for column in result.columns]
+        self.writer.writerows(zip(*texts))
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter:
+    def __init__(self, f, names, type_names):
+        self.f = f
+        self.names = names
+
+    def write(self, result):
+        dumps = json.dumps
+        for row in result.rows():
+            self.f.write(dumps(dict(zip(self.names, row)), default=_json_default))
+            self.f.write("\n")
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Writes each page as a row group, typed from ``columnMetadata``"""
+
+    TYPES = {
+        "int2": "int64",
+        "int4": "int64",
+        "int8": "int64",
+        "serial": "int64",
+        "bigserial": "int64",
+        "integer": "int64",
+        "bigint": "int64",
+        "smallint": "int64",
+        "float4": "float64",
+        "float8": "float64",
+        "real": "float64",
+        "double": "float64",
+        "bool": "bool_",
+        "boolean": "bool_",
+        "bit": "bool_",
+        "bytea": "binary",
+        "blob": "binary",
+    }
+
+    def __init__(self, f, names, type_names):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        types = [
+            getattr(pa, self.TYPES.get((name or "").lower(), "string"))()
+            for name in type_names
+        ]
+        self.schema = pa.schema(list(zip(names, types)))
+        self.writer = pq.ParquetWriter(f, self.schema)
+
+    def write(self, result):
+        pa = self.pa
+        arrays = []
+        for column, field in zip(result.columns, self.schema):
+            values = [column.value(i) for i in range(len(column))]
+            if pa.types.is_string(field.type):
+                values = [
+                    None if v is None else value_decoder.format_value(v) for v in values
+                ]
+            arrays.append(pa.array(values, type=field.type))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter, "parquet": ParquetWriter}
+
+
+class ExportProgress:
+    """Counters of a running export, read from the Tk thread"""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.started_at = time.time()
+        self.finished_at = None
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+    def summary(self):
+        elapsed = self.elapsed or 1e-9
+        return (
+            f"{self.rows} rows, {self.bytes / 1e6:.1f} MB in {self.elapsed:.1f}s "
+            f"({self.rows / elapsed:,.0f} rows/s, "
+            f"{self.bytes / 1e6 / elapsed:.2f} MB/s)"
+        )
+
+
+class ResultExporter:
+    """Stream the result of a query from AuroraDBManager straight to a file.
+
+    Every page is decoded, written and dropped before the next one is
+    fetched, so memory stays bounded by the page size however large the
+    result. Pages are read from one server-side cursor, so the file holds
+    every row exactly once even when the query has no ORDER BY. The file is written next to its destination and moved into
+    place only once complete; a failed or cancelled export leaves any
+    existing file untouched.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.progress = ExportProgress()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def export(self, sql_query, path, file_format=None):
+        """Write the result of a query to ``path``; returns the ExportProgress.
+
+        The query is run again, so statements that write are refused.
+        """
+        if not sql_text.is_read_only(sql_query):
+            raise ValueError("Only read-only statements can be exported")
+        file_format = file_format or format_for_path(path)
+        if file_format not in available_formats():
+            raise RuntimeError(f"{file_format} export is not available")
+        writer_class = WRITERS[file_format]
+        temp_path = f"{path}.tmp"
+        binary = file_format == "parquet"
+
+        try:
+            if binary:
+                f = open(temp_path, "wb")
+            else:
+                f = open(temp_path, "w", encoding="utf-8", newline="")
+            # Closing the pages ends the cursor's transaction at once
+            pages = self.db.stream_query(sql_query, use_cache=False, exact=True)
+            with f, contextlib.closing(pages):
+                writer = None
+                for page in pages:
+                    if self.cancelled:
+                        raise InterruptedError("Export cancelled")
+                    if not value_decoder.has_records(page):
+                        raise ValueError("The statement returned no result set")
+
+                    result = ColumnarResult.from_response(page)
+                    if writer is None:
+                        writer = writer_class(
+                            f,
+                            result.column_names,
+                            [column.type_name for column in result.columns],
+                        )
+                    writer.write(result)
+                    self.progress.rows += len(result)
+                    self.progress.bytes = f.tell()
+                if writer is not None:
+                    writer.close()
+                self.progress.bytes = f.tell()
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            self.progress.finished_at = time.time()
+        return self.progress
@@ -0,0 +1,335 @@
+import array
+import collections
+import datetime
+import decimal
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+
+from schema_cache import quote_identifier
+
+
+class StoredColumn:
+    """Name, type and storage codec of one column of a ResultStore"""
+
+    def __init__(self, name, type_name=None):
+        self.name = name
+        self.type_name = type_name
+        self.codec = None  # Chosen from the first non-null value
+        self.exact_name = None  # Hidden column of exact text, see Codec
+
+    def encode(self, column):
+        """Values SQLite can store for a decoded Column, in row order"""
+        values = list(column.values)
+        if column.typed:
+            # Typed arrays hold numbers already, with placeholders for nulls
+            for i in _null_positions(column.nulls):
+                values[i] = None
+        if self.codec is None:
+            first = next((v for v in values if v is not None), None)
+            if first is None:
+                return values
+            if column.kind == "booleanValue":
+                first = bool(first)
+            self.codec = codec_for(first)
+        if column.typed:
+            return values
+        if self.codec.encode is _same:
+            python_type = self.codec.python_type
+            if all(v is None or type(v) is python_type for v in values):
+                return values
+        return [self.to_sql(v) for v in values]
+
+    def to_sql(self, value):
+        """A value SQLite can store, keeping ordering where it can"""
+        if value is None:
+            return None
+        if type(value) is self.codec.python_type:
+            return self.codec.encode(value)
+        return str(value)  # A column of mixed types keeps the odd ones as text
+
+    def exact_values(self, column):
+        """Text of the values for the hidden exact column, in row order"""
+        return [None if v is None else str(v) for v in column.values]
+
+    def from_sql(self, value):
+        if value is None or self.codec is None:
+            return value
+        try:
+            return self.codec.decode(value)
+        except (ValueError, TypeError, ArithmeticError):
+            return value
+
+
+class Codec:
+    """How values of one Python type are stored in SQLite.
+
+    Values are stored so that SQLite comparisons match Python's, since
+    filters and sorts run against the stored column. An ``exact`` codec
+    stores a lossy REAL for comparing and keeps the exact text in a hidden
+    column that rows are decoded from.
+    """
+
+    def __init__(self, python_type, encode, decode, exact=False):
+        self.python_type = python_type
+        self.encode = encode
+        self.decode = decode
+        self.exact = exact
+
+
+def _same(value):
+    return value
+
+
+def _null_positions(nulls):
+    """Row indices whose bit is set in a null bitmask"""
+    return [
+        i * 8 + bit
+        for i, byte in enumerate(nulls)
+        if byte
+        for bit in range(8)
+        if byte >> bit & 1
+    ]
+
+
+def codec_for(value):
+    """The Codec of a column whose first non-null value is ``value``"""
+    codec = CODECS.get(type(value))
+    if codec is None:
+        # Anything else is kept as its text
+        codec = Codec(type(value), str, _same)
+    return codec
+
+
+# ISO strings of dates and times sort in time order, and with a space
+# between date and time they compare like the literals a filter is written with
+CODECS = {
+    int: Codec(int, _same, _same),
+    float: Codec(float, _same, _same),
+    str: Codec(str, _same, _same),
+    bytes: Codec(bytes, _same, _same),
+    bool: Codec(bool, int, bool),
+    decimal.Decimal: Codec(decimal.Decimal, float, decimal.Decimal, exact=True),
+    datetime.datetime: Codec(
+        datetime.datetime,
+        lambda v: v.isoformat(" "),
+        datetime.datetime.fromisoformat,
+    ),
+    datetime.date: Codec(
+        datetime.date, datetime.date.isoformat, datetime.date.fromisoformat
+    ),
+    datetime.time: Codec(
+        datetime.time, datetime.time.isoformat, datetime.time.fromisoformat
+    ),
+    uuid.UUID: Codec(uuid.UUID, str, uuid.UUID),
+    dict: Codec(dict, lambda v: json.dumps(v, default=str), json.loads),
+    list: Codec(list, lambda v: json.dumps(v, default=str), json.loads),
+}
+
+
+class ResultStore:
+    """A query result spilled to a temporary SQLite file.
+
+    Rows are appended from decoded ColumnarResult pages and read back by
+    index, so the grid can show a result of any size while only a bounded
+    cache of rows stays in memory. Sorting and filtering run locally:
+    ``select`` evaluates a SQLite WHERE expression over the result's own
+    column names, and the first sort by a column builds an index on it so
+    later sorts, with or without a filter, are index scans. Both return the
+    matching row indices in display order. The file is deleted by ``close``.
+    """
+
+    # Rows read per query when the grid asks for a row that is not cached
+    BLOCK_SIZE = 256
+    # Decoded rows kept in memory
+    CACHE_ROWS = 4096
+
+    def __init__(self, column_metadata, directory=None):
+        self.column_metadata = column_metadata
+        self.columns = []
+        self._names = seen = set()
+        for i, col in enumerate(column_metadata):
+            name = col.get("name") or f"Column {i+1}"
+            # Column names must be unique to be filtered on
+            unique, n = name, 1
+            while unique.lower() in seen:
+                n += 1
+                unique = f"{name}_{n}"
+            seen.add(unique.lower())
+            self.columns.append(StoredColumn(unique, col.get("typeName")))
+        self.row_count = 0
+        self._cache = collections.OrderedDict()  # Row index -> decoded row
+        self._indexed = set()
+        self._exact = []  # Indices of columns with a hidden exact column
+
+        fd, self.path = tempfile.mkstemp(prefix="result-", suffix=".db", dir=directory)
+        os.close(fd)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # The file is scratch space; nothing needs to survive a crash
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("PRAGMA cache_size=-16384")  # 16 MiB page cache
+        names = ", ".join(quote_identifier(column.name) for column in self.columns)
+        self._conn.execute(f"CREATE TABLE result ({names})")
+        self._prepare()
+
+    def _prepare(self):
+        """Build the statements that depend on the table's columns"""
+        names = [column.name for column in self.columns]
+        names += [self.columns[i].exact_name for i in self._exact]
+        placeholders = ", ".join("?" for _ in names)
+        self._insert_sql = f"INSERT INTO result VALUES ({placeholders})"
+        self._select_names = ", ".join(quote_identifier(name) for name in names)
+
+    def _add_exact_column(self, index):
+        """Add the hidden exact column of a column whose codec needs one"""
+        stored = self.columns[index]
+        name, n = f"{stored.name}_exact", 1
+        while name.lower() in self._names:
+            n += 1
+            name = f"{stored.name}_exact_{n}"
+        self._names.add(name.lower())
+        stored.exact_name = name
+        # Rows before the codec was chosen were null, as the new column is
+        self._conn.execute(f"ALTER TABLE result ADD COLUMN {quote_identifier(name)}")
+        self._exact.append(index)
+        self._prepare()
+
+    @classmethod
+    def from_result(cls, result, directory=None):
+        """A store holding the rows of a ColumnarResult"""
+        store = cls(result.column_metadata, directory)
+        store.append(result)
+        return store
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    @property
+    def nbytes(self):
+        """Size of the file on disk"""
+        return os.path.getsize(self.path)
+
+    def append(self, result):
+        """Append the rows of a decoded ColumnarResult page"""
+        if not len(result):
+            return
+        values = [
+            stored.encode(column)
+            for stored, column in zip(self.columns, result.columns)
+        ]
+        for i, stored in enumerate(self.columns):
+            if stored.codec is not None and stored.codec.exact:
+                if stored.exact_name is None:
+                    self._add_exact_column(i)
+        values += [self.columns[i].exact_values(result.columns[i]) for i in self._exact]
+        with self._conn:
+            self._conn.executemany(self._insert_sql, zip(*values))
+        self.row_count += len(result)
+
+    def _fetch(self, where, params):
+        cursor = self._conn.execute(
+            f"SELECT rowid - 1, {self._select_names} FROM result WHERE {where}",
+            params,
+        )
+        decoders = [column.from_sql for column in self.columns]
+        width = len(self.columns)
+        for index, *values in cursor:
+            # Exact text replaces the stored value it shadows
+            for i, exact in zip(self._exact, values[width:]):
+                if exact is not None:
+                    values[i] = exact
+            self._cache[index] = [
+                decode(value) for decode, value in zip(decoders, values)
+            ]
+        while len(self._cache) > self.CACHE_ROWS:
+            self._cache.popitem(last=False)
+
+    def prefetch(self, indices):
+        """Read the rows about to be shown in one query"""
+        missing = [i + 1 for i in indices if i not in self._cache]
+        # SQLite limits the number of bound parameters of a statement
+        for start in range(0, len(missing), 500):
+            chunk = missing[start : start + 500]
+            self._fetch(f"rowid IN ({', '.join('?' for _ in chunk)})", chunk)
+
+    def row(self, index):
+        row = self._cache.get(index)
+        if row is None:
+            self._fetch("rowid BETWEEN ? AND ?", (index + 1, index + self.BLOCK_SIZE))
+            row = self._cache[index]
+        else:
+            self._cache.move_to_end(index)
+        return row
+
+    def rows(self, start=0, stop=None):
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        return [self.row(i) for i in range(start, stop)]
+
+    def value(self, row, column):
+        return self.row(row)[column]
+
+    def select(self, where=None, column=None, descending=False):
+        """Indices of the rows matching ``where`` in display order.
+
+        ``where`` is a SQLite expression over the column names. Rows are
+        ordered by ``column`` when one is given, nulls last, otherwise kept
+        in result order. Raises ValueError for an invalid expression.
+        """
+        condition = f"({where})" if where and where.strip() else "1"
+        if column is None:
+            return self._indices(f"SELECT rowid - 1 FROM result WHERE {condition}")
+
+        stored = self.columns[column]
+        expression = quote_identifier(stored.name)
+        if column not in self._indexed:
+            with self._conn:
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS result_sort_{column} "
+                    f"ON result ({expression})"
+                )
+            self._indexed.add(column)
+
+        direction = "DESC" if descending else "ASC"
+        order = self._indices(
+            f"SELECT rowid - 1 FROM result WHERE {condition} "
+            f"ORDER BY {expression} {direction}"
+        )
+        if not descending:
+            # The index sorts nulls first; move them behind the values
+            nulls = self._conn.execute(
+                f"SELECT count(*) FROM result WHERE {condition} "
+                f"AND {quote_identifier(stored.name)} IS NULL"
+            ).fetchone()[0]
+            if nulls:
+                order = order[nulls:] + order[:nulls]
+        return order
+
+    def sort_indices(self, column, descending=False):
+        return self.select(None, column, descending)
+
+    def _indices(self, sql):
+        try:
+            cursor = self._conn.execute(sql)
+        except sqlite3.Error as e:
+            raise ValueError(f"Invalid filter: {e}") from e
+        indices = array.array("q")
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                return indices
+            indices.extend(row[0] for row in rows)
+
+    def close(self):
+        """Close and delete the file"""
+        self._conn.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
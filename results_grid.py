@@ -0,0 +1,416 @@
+import time
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+
+import value_decoder
+
+
+class ResultsGrid(ttk.Frame):
+    """Tabular result view that only draws the rows inside the viewport.
+
+    The grid reads cells straight from a ColumnarResult, or a ResultStore
+    once a result has been spilled to disk, and draws them onto a canvas on
+    demand, so appending to or scrolling through a large result costs about
+    the same as a small one. Column widths are estimated from a sample of
+    every appended batch. Clicking a header sorts by that column, dragging
+    its right edge resizes it. A filter, which needs a ResultStore, limits
+    the rows shown to those matching a SQLite expression. Every repaint
+    generates ``<<ViewChanged>>``.
+    """
+
+    SAMPLE_SIZE = 200
+    MIN_COLUMN_WIDTH = 40
+    MAX_COLUMN_WIDTH = 400
+    CELL_PADDING = 6
+    RESIZE_MARGIN = 4
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.font = tkfont.nametofont("TkFixedFont")
+        self.char_width = self.font.measure("0")
+        self.row_height = self.font.metrics("linespace") + 4
+
+        self.columns = []
+        self.column_widths = []
+        self.result = None
+        self.order = None  # Row indices in display order while sorted or filtered
+        self.filter = None  # WHERE expression of the rows shown
+        self.sort_column = None
+        self.sort_descending = False
+        self.top_row = 0
+        self.selected_row = None
+        self.message = None
+        self._resize = None
+        self._pressed_column = None
+        self._redraw_id = None
+        self.draw_time = 0.0  # Seconds spent drawing the current result
+
+        self.header = tk.Canvas(
+            self,
+            height=self.row_height,
+            highlightthickness=0,
+            background="#E8E8E8",
+        )
+        self.body = tk.Canvas(self, highlightthickness=0, background="white")
+        self.y_scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.x_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.xview)
+        self.body.configure(xscrollcommand=self.x_scrollbar.set)
+
+        self.header.grid(row=0, column=0, sticky="ew")
+        self.body.grid(row=1, column=0, sticky="nsew")
+        self.y_scrollbar.grid(row=0, column=1, rowspan=2, sticky="ns")
+        self.x_scrollbar.grid(row=2, column=0, sticky="ew")
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.body.bind("<Configure>", lambda e: self.redraw())
+        self.body.bind("<MouseWheel>", self._on_mousewheel)
+        self.body.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units"))
+        self.body.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units"))
+        self.body.bind("<Button-1>", self._on_body_click)
+        self.body.bind("<Control-c>", lambda e: self.copy_selected_row())
+        self.body.bind("<Command-c>", lambda e: self.copy_selected_row())
+        self.body.bind("<Up>", lambda e: self._move_selection(-1))
+        self.body.bind("<Down>", lambda e: self._move_selection(1))
+        self.body.bind("<Prior>", lambda e: self.yview("scroll", -1, "pages"))
+        self.body.bind("<Next>", lambda e: self.yview("scroll", 1, "pages"))
+
+        self.header.bind("<Motion>", self._on_header_motion)
+        self.header.bind("<ButtonPress-1>", self._on_header_press)
+        self.header.bind("<B1-Motion>", self._on_header_drag)
+        self.header.bind("<ButtonRelease-1>", self._on_header_release)
+
+    @property
+    def row_count(self):
+        if self.order is not None:
+            return len(self.order)
+        return len(self.result) if self.result is not None else 0
+
+    def clear(self):
+        """Remove all columns, rows and messages"""
+        self.columns = []
+        self.column_widths = []
+        self.result = None
+        self.order = None
+        self.filter = None
+        self.sort_column = None
+        self.sort_descending = False
+        self.top_row = 0
+        self.selected_row = None
+        self.message = None
+        self.draw_time = 0.0
+        self.redraw()
+
+    def show_message(self, text):
+        """Replace the grid contents with a plain text message"""
+        self.clear()
+        self.message = text
+        self.redraw()
+
+    def set_result(self, result, columns):
+        """Show a ColumnarResult under the given column headers"""
+        self.clear()
+        self.result = result
+        self.columns = list(columns)
+        # Leave room for the sort marker next to each header
+        self.column_widths = [
+            self._text_width(name) + 2 * self.char_width for name in self.columns
+        ]
+        self.rows_appended(0)
+
+    def rows_appended(self, start):
+        """Pick up rows added to the result from ``start`` onwards"""
+        stop = min(len(self.result), start + self.SAMPLE_SIZE)
+        self._fit_columns(range(start, stop))
+
+        if self.sort_column is not None or self.filter is not None:
+            self._apply_view()
+        self.redraw()
+
+    def replace_result(self, result):
+        """Read the same rows from another source, such as a ResultStore"""
+        self.result = result
+        if self.sort_column is not None or self.filter is not None:
+            self._apply_view()
+        self.redraw()
+
+    def set_filter(self, where):
+        """Show only the rows matching a SQLite expression, or all of them.
+
+        Raises ValueError for an invalid expression and keeps the old filter.
+        """
+        previous = self.filter
+        self.filter = where or None
+        try:
+            self._apply_view()
+        except ValueError:
+            self.filter = previous
+            raise
+        self.top_row = 0
+        self.selected_row = None
+        self.redraw()
+
+    def format_value(self, value):
+        """Text shown for a single cell"""
+        return value_decoder.format_value(value)
+
+    def sort_by(self, column, descending=False):
+        """Sort the displayed rows by a column without touching the data"""
+        self.sort_column = column
+        self.sort_descending = descending
+        self._apply_view()
+        self.redraw()
+
+    def visible_rows(self):
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def row_index(self, position):
+        """Index into the result of the row shown at a display position"""
+        return self.order[position] if self.order is not None else position
+
+    def yview(self, *args):
+        """Scrollbar protocol for the virtual vertical axis"""
+        visible = self.visible_rows()
+        last_top = max(0, self.row_count - visible)
+
+        if args and args[0] == "moveto":
+            top = int(float(args[1]) * self.row_count)
+        elif args and args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= visible
+            top = self.top_row + amount
+        else:
+            return self._y_fractions()
+
+        top = max(0, min(top, last_top))
+        if top != self.top_row:
+            self.top_row = top
+            self.redraw()
+
+    def xview(self, *args):
+        self.body.xview(*args)
+        self.header.xview_moveto(self.body.xview()[0])
+        self.redraw()
+
+    def copy_selected_row(self):
+        """Copy the selected row to the clipboard as tab separated values"""
+        if self.selected_row is None or self.selected_row >= self.row_count:
+            return "break"
+        row = self.result.row(self.row_index(self.selected_row))
+        self.clipboard_clear()
+        self.clipboard_append("\t".join(self.format_value(v) for v in row))
+        return "break"
+
+    def redraw(self):
+        """Schedule a repaint, coalescing repeated requests"""
+        if self._redraw_id is None:
+            self._redraw_id = self.after_idle(self._draw)
+
+    def _draw(self):
+        self._redraw_id = None
+        start = time.perf_counter()
+        try:
+            self._paint()
+        finally:
+            self.draw_time += time.perf_counter() - start
+        # Lets a view that loads rows on demand follow the scroll position
+        self.event_generate("<<ViewChanged>>", when="tail")
+
+    def _paint(self):
+        self.body.delete("all")
+        self.header.delete("all")
+
+        total_width = sum(self.column_widths)
+        self.body.configure(scrollregion=(0, 0, total_width, 1))
+        self.header.configure(scrollregion=(0, 0, total_width, 1))
+
+        if self.message is not None:
+            self.body.create_text(
+                self.CELL_PADDING,
+                self.CELL_PADDING,
+                text=self.message,
+                anchor=tk.NW,
+                font=self.font,
+            )
+            self.y_scrollbar.set(0, 1)
+            return
+
+        visible = self.visible_rows()
+        last = min(self.row_count, self.top_row + visible + 1)
+        left = self.body.canvasx(0)
+        right = left + self.body.winfo_width()
+        if hasattr(self.result, "prefetch"):
+            # Read the rows of a stored result in one query
+            self.result.prefetch(
+                [self.row_index(position) for position in range(self.top_row, last)]
+            )
+
+        if self.selected_row is not None and self.top_row <= self.selected_row < last:
+            y = (self.selected_row - self.top_row) * self.row_height
+            self.body.create_rectangle(
+                0, y, total_width, y + self.row_height, fill="#CCE4F7", width=0
+            )
+
+        x = 0
+        for column, (name, width) in enumerate(zip(self.columns, self.column_widths)):
+            # Only columns intersecting the viewport are drawn
+            if x + width >= left and x <= right:
+                self._draw_header_cell(column, name, x, width)
+                for position in range(self.top_row, last):
+                    value = self.result.value(self.row_index(position), column)
+                    y = (position - self.top_row) * self.row_height
+                    self.body.create_text(
+                        x + self.CELL_PADDING,
+                        y + self.row_height // 2,
+                        text=self._clip(self.format_value(value), width),
+                        anchor=tk.W,
+                        font=self.font,
+                    )
+                self.body.create_line(
+                    x + width - 1,
+                    0,
+                    x + width - 1,
+                    visible * self.row_height,
+                    fill="#E0E0E0",
+                )
+            x += width
+
+        self.y_scrollbar.set(*self._y_fractions())
+
+    def _draw_header_cell(self, column, name, x, width):
+        if column == self.sort_column:
+            name += " ▼" if self.sort_descending else " ▲"
+        self.header.create_text(
+            x + self.CELL_PADDING,
+            self.row_height // 2,
+            text=self._clip(name, width),
+            anchor=tk.W,
+            font=self.font,
+        )
+        self.header.create_line(
+            x + width - 1, 0, x + width - 1, self.row_height, fill="#A0A0A0"
+        )
+
+    def _y_fractions(self):
+        if not self.row_count:
+            return 0.0, 1.0
+        first = self.top_row / self.row_count
+        last = min(1.0, (self.top_row + self.visible_rows()) / self.row_count)
+        return first, last
+
+    def _text_width(self, text):
+        # TkFixedFont is monospaced, so widths follow from the character count
+        return len(text) * self.char_width + 2 * self.CELL_PADDING
+
+    def _clip(self, text, width):
+        text = text.split("\n", 1)[0]
+        max_chars = max(1, (width - 2 * self.CELL_PADDING) // self.char_width)
+        if len(text) > max_chars:
+            return text[: max_chars - 1] + "…"
+        return text
+
+    def _fit_columns(self, sample):
+        for column in range(len(self.column_widths)):
+            longest = max(
+                (len(self.format_value(self.result.value(i, column))) for i in sample),
+                default=0,
+            )
+            width = min(
+                longest * self.char_width + 2 * self.CELL_PADDING,
+                self.MAX_COLUMN_WIDTH,
+            )
+            if width > self.column_widths[column]:
+                self.column_widths[column] = width
+
+    def _apply_view(self):
+        if self.result is None:
+            return
+        if self.filter is not None:
+            self.order = self.result.select(
+                self.filter, self.sort_column, self.sort_descending
+            )
+        elif self.sort_column is not None:
+            self.order = self.result.sort_indices(
+                self.sort_column, self.sort_descending
+            )
+        else:
+            self.order = None
+
+    def _column_at(self, x):
+        """Return (column, distance to its right edge) for a canvas x"""
+        right = 0
+        for column, width in enumerate(self.column_widths):
+            right += width
+            if x < right:
+                return column, right - x
+        return None, None
+
+    def _border_at(self, x):
+        """Index of the column whose right edge is under x, if any"""
+        right = 0
+        for column, width in enumerate(self.column_widths):
+            right += width
+            if abs(x - right) <= self.RESIZE_MARGIN:
+                return column
+        return None
+
+    def _on_header_motion(self, event):
+        border = self._border_at(self.header.canvasx(event.x))
+        cursor = "sb_h_double_arrow" if border is not None else ""
+        self.header.configure(cursor=cursor)
+
+    def _on_header_press(self, event):
+        x = self.header.canvasx(event.x)
+        border = self._border_at(x)
+        if border is not None:
+            self._resize = (border, x, self.column_widths[border])
+        else:
+            self._pressed_column = self._column_at(x)[0]
+
+    def _on_header_drag(self, event):
+        if self._resize is None:
+            return
+        column, start_x, start_width = self._resize
+        width = start_width + int(self.header.canvasx(event.x) - start_x)
+        self.column_widths[column] = max(self.MIN_COLUMN_WIDTH, width)
+        self.redraw()
+
+    def _on_header_release(self, event):
+        if self._resize is not None:
+            self._resize = None
+            return
+
+        column = self._column_at(self.header.canvasx(event.x))[0]
+        if column is not None and column == self._pressed_column:
+            descending = column == self.sort_column and not self.sort_descending
+            self.sort_by(column, descending)
+        self._pressed_column = None
+
+    def _on_body_click(self, event):
+        self.body.focus_set()
+        position = self.top_row + event.y // self.row_height
+        if position < self.row_count:
+            self.selected_row = position
+            self.redraw()
+
+    def _move_selection(self, step):
+        if not self.row_count:
+            return "break"
+        position = 0 if self.selected_row is None else self.selected_row + step
+        self.selected_row = max(0, min(position, self.row_count - 1))
+
+        # Keep the selected row inside the viewport
+        visible = self.visible_rows()
+        if self.selected_row < self.top_row:
+            self.top_row = self.selected_row
+        elif self.selected_row >= self.top_row + visible:
+            self.top_row = self.selected_row - visible + 1
+        self.redraw()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS reports small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.yview("scroll", -delta * 3, "units")
@@ -0,0 +1,290 @@
+import json
+import os
+import threading
+import time
+
+# Schemas that belong to the database itself rather than to users
+SYSTEM_SCHEMAS = "('pg_catalog', 'information_schema')"
+
+TABLES_SQL = f"""
+SELECT table_schema, table_name, table_type
+FROM information_schema.tables
+WHERE table_schema NOT IN {SYSTEM_SCHEMAS}
+AND table_schema NOT LIKE 'pg_toast%'
+ORDER BY table_schema, table_name
+"""
+
+# One fingerprint per table so unchanged tables can be skipped on refresh
+SIGNATURES_SQL = f"""
+SELECT table_schema, table_name, md5(string_agg(
+    column_name || ':' || data_type || ':' || is_nullable, ','
+    ORDER BY ordinal_position
+))
+FROM information_schema.columns
+WHERE table_schema NOT IN {SYSTEM_SCHEMAS}
+GROUP BY table_schema, table_name
+"""
+
+COLUMNS_SQL = """
+SELECT table_schema, table_name, column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE {where}
+ORDER BY table_schema, table_name, ordinal_position
+"""
+
+PRIMARY_KEYS_SQL = """
+SELECT kcu.table_schema, kcu.table_name, kcu.column_name
+FROM information_schema.table_constraints tc
+JOIN information_schema.key_column_usage kcu
+ON kcu.constraint_schema = tc.constraint_schema
+AND kcu.constraint_name = tc.constraint_name
+AND kcu.table_name = tc.table_name
+WHERE tc.constraint_type = 'PRIMARY KEY' AND {where}
+ORDER BY kcu.table_schema, kcu.table_name, kcu.ordinal_position
+"""
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+class TableInfo:
+    """Columns and primary key of a single table or view"""
+
+    def __init__(self, schema, name, table_type="BASE TABLE"):
+        self.schema = schema
+        self.name = name
+        self.table_type = table_type
+        self.columns = []  # (name, data type, nullable) in ordinal order
+        self.primary_key = []
+        self.signature = None
+
+    @property
+    def qualified_name(self):
+        return f"{quote_identifier(self.schema)}.{quote_identifier(self.name)}"
+
+    @property
+    def display_name(self):
+        """Name shown in the table list; public tables go unqualified"""
+        if self.schema == "public":
+            return self.name
+        return f"{self.schema}.{self.name}"
+
+    @property
+    def column_names(self):
+        return [column[0] for column in self.columns]
+
+    def column_type(self, column_name):
+        for name, data_type, _ in self.columns:
+            if name == column_name:
+                return data_type
+        return None
+
+    def to_dict(self):
+        return {
+            "schema": self.schema,
+            "name": self.name,
+            "table_type": self.table_type,
+            "columns": self.columns,
+            "primary_key": self.primary_key,
+            "signature": self.signature,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        table = cls(data["schema"], data["name"], data.get("table_type"))
+        table.columns = [tuple(column) for column in data.get("columns", [])]
+        table.primary_key = list(data.get("primary_key", []))
+        table.signature = data.get("signature")
+        return table
+
+
+class SchemaCache:
+    """In-memory index of schemas, tables, columns and primary keys.
+
+    The index is persisted to a local JSON file so the next launch can show
+    the table list before the database has been contacted. ``refresh`` only
+    fetches column details for tables whose column fingerprint changed, and
+    is safe to call from a background thread while the UI reads the index.
+    """
+
+    def __init__(self, db, cache_path="schema_cache.json"):
+        self.db = db
+        self.cache_path = cache_path
+        self.tables = {}  # (schema, name) -> TableInfo
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def _owner(self):
+        """Identifies the cluster and database the cache file belongs to"""
+        return f"{self.db.resource_arn}/{self.db.database_name}"
+
+    def load(self):
+        """Load the on-disk cache; returns False when there is none to use"""
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+
+        if data.get("owner") != self._owner:
+            return False
+
+        tables = {}
+        for item in data.get("tables", []):
+            table = TableInfo.from_dict(item)
+            tables[(table.schema, table.name)] = table
+
+        with self._lock:
+            self.tables = tables
+            self.loaded_at = data.get("loaded_at")
+        return True
+
+    def save(self):
+        """Write the cache atomically next to the workspace"""
+        with self._lock:
+            data = {
+                "owner": self._owner,
+                "loaded_at": self.loaded_at,
+                "tables": [table.to_dict() for table in self.tables.values()],
+            }
+
+        temp_path = f"{self.cache_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.cache_path)
+
+    def schemas(self):
+        with self._lock:
+            return sorted({schema for schema, _ in self.tables})
+
+    def table_list(self):
+        """All tables sorted by schema and name"""
+        with self._lock:
+            return [self.tables[key] for key in sorted(self.tables)]
+
+    def table(self, schema, name):
+        with self._lock:
+            return self.tables.get((schema, name))
+
+    def find_table(self, name):
+        """Resolve ``table``, ``schema.table`` or a display name"""
+        schema, _, table = name.rpartition(".")
+        with self._lock:
+            if schema:
+                return self.tables.get((schema, table))
+            if ("public", table) in self.tables:
+                return self.tables[("public", table)]
+            for (_, candidate), info in self.tables.items():
+                if candidate == table:
+                    return info
+        return None
+
+    def columns(self, schema, name):
+        table = self.table(schema, name)
+        return table.columns if table is not None else []
+
+    def primary_key(self, schema, name):
+        table = self.table(schema, name)
+        return table.primary_key if table is not None else []
+
+    def refresh(self):
+        """Bring the index up to date with the database.
+
+        Returns ``(added, removed, changed)`` lists of (schema, name) keys.
+        """
+        listed = {}
+        for schema, name, table_type in self.db.fetch_rows(TABLES_SQL):
+            listed[(schema, name)] = table_type
+
+        signatures = {
+            (schema, name): signature
+            for schema, name, signature in self.db.fetch_rows(SIGNATURES_SQL)
+        }
+
+        with self._lock:
+            current = dict(self.tables)
+
+        added = [key for key in listed if key not in current]
+        removed = [key for key in current if key not in listed]
+        changed = [
+            key
+            for key in listed
+            if key in current and current[key].signature != signatures.get(key)
+        ]
+
+        stale = added + changed
+        details = self._fetch_details(stale) if stale else {}
+        for key in stale:
+            table = details.get(key) or TableInfo(*key)
+            table.table_type = listed[key]
+            table.signature = signatures.get(key)
+            current[key] = table
+        for key in removed:
+            del current[key]
+
+        with self._lock:
+            self.tables = current
+            self.loaded_at = time.time()
+        return added, removed, changed
+
+    def refresh_tables(self, names):
+        """Re-read specific tables by name, e.g. after DDL ran on them"""
+        keys = []
+        with self._lock:
+            for name in names:
+                keys.extend(key for key in self.tables if key[1] == name)
+        if not keys:
+            return self.refresh()
+
+        details = self._fetch_details(keys)
+        with self._lock:
+            for key in keys:
+                if key in details:
+                    # Unknown signature makes the next full refresh recheck it
+                    details[key].table_type = self.tables[key].table_type
+                    self.tables[key] = details[key]
+                else:
+                    self.tables.pop(key, None)
+        return [], [key for key in keys if key not in details], list(details)
+
+    # Beyond this many tables one scan of every schema beats a long IN list
+    MAX_LISTED_TABLES = 200
+
+    def _fetch_details(self, keys):
+        """Columns and primary keys of the given tables"""
+        wanted = set(keys)
+        if len(wanted) > self.MAX_LISTED_TABLES:
+            column_where = f"table_schema NOT IN {SYSTEM_SCHEMAS}"
+            key_where = f"kcu.table_schema NOT IN {SYSTEM_SCHEMAS}"
+        else:
+            pairs = ", ".join(
+                f"({quote_literal(schema)}, {quote_literal(name)})"
+                for schema, name in keys
+            )
+            column_where = f"(table_schema, table_name) IN ({pairs})"
+            key_where = f"(kcu.table_schema, kcu.table_name) IN ({pairs})"
+
+        tables = {}
+        for schema, name, column, data_type, nullable in self.db.fetch_rows(
+            COLUMNS_SQL.format(where=column_where)
+        ):
+            if (schema, name) not in wanted:
+                continue
+            table = tables.setdefault((schema, name), TableInfo(schema, name))
+            table.columns.append((column, data_type, nullable == "YES"))
+
+        for schema, name, column in self.db.fetch_rows(
+            PRIMARY_KEYS_SQL.format(where=key_where)
+        ):
+            if (schema, name) not in wanted:
+                continue
+            table = tables.setdefault((schema, name), TableInfo(schema, name))
+            table.primary_key.append(column)
+
+        return tables
@@ -0,0 +1,203 @@
+import time
+
+import value_decoder
+
+
+class StatementResult:
+    """Outcome of one statement of a script"""
+
+    OK = "ok"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(self, index, sql):
+        self.index = index
+        self.sql = sql
+        self.status = self.SKIPPED
+        self.duration = 0.0
+        self.rows = 0  # Rows returned or updated
+        self.error = None
+        self.timing = None  # QueryTiming, when the runner measures phases
+
+
+class ScriptRun:
+    """Per-statement results and totals of a script run"""
+
+    COMMITTED = "committed"
+    ROLLED_BACK = "rolled back"
+    AUTOCOMMIT = "autocommit"
+
+    def __init__(self, statements):
+        self.results = [StatementResult(i + 1, sql) for i, sql in enumerate(statements)]
+        self.outcome = None
+        self.error = None  # Error of the begin/commit/rollback call itself
+        self.started_at = time.time()
+        self.finished_at = None
+
+    @property
+    def duration(self):
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+    @property
+    def executed(self):
+        return sum(1 for r in self.results if r.status != StatementResult.SKIPPED)
+
+    @property
+    def failed(self):
+        return sum(1 for r in self.results if r.status == StatementResult.FAILED)
+
+    @property
+    def succeeded(self):
+        if self.failed or self.error is not None:
+            return False
+        return self.outcome != self.ROLLED_BACK
+
+    @property
+    def statements_per_second(self):
+        return self.executed / self.duration if self.duration else 0.0
+
+    def summary(self):
+        text = (
+            f"{self.executed}/{len(self.results)} statements in "
+            f"{self.duration:.2f}s ({self.statements_per_second:.1f}/s)"
+        )
+        if self.failed:
+            text += f", {self.failed} failed"
+        if self.outcome:
+            text += f", {self.outcome}"
+        if self.error is not None:
+            text += f" (error: {self.error})"
+        return text
+
+    def as_response(self):
+        """The per-statement report shaped like an execute_statement response"""
+        records = []
+        for r in self.results:
+            records.append(
+                [
+                    {"longValue": r.index},
+                    {"stringValue": r.status},
+                    {"doubleValue": round(r.duration, 3)},
+                    {"longValue": r.rows},
+                    {"stringValue": " ".join(r.sql.split())},
+                    (
+                        {"isNull": True}
+                        if r.error is None
+                        else {"stringValue": str(r.error)}
+                    ),
+                ]
+            )
+        return {
+            "columnMetadata": [
+                {"name": "#", "typeName": "int4"},
+                {"name": "status", "typeName": "text"},
+                {"name": "seconds", "typeName": "float8"},
+                {"name": "rows", "typeName": "int8"},
+                {"name": "statement", "typeName": "text"},
+                {"name": "error", "typeName": "text"},
+            ],
+            "records": records,
+        }
+
+
+class ScriptRunner:
+    """Run a list of statements inside a single Data API transaction.
+
+    Every statement is sent with the same ``transactionId`` and the whole
+    script is committed once at the end. By default the first error rolls
+    the transaction back. With ``continue_on_error`` each statement is
+    preceded by a savepoint, released once the statement is done, so a
+    failing statement is undone on its own and the rest of the script still
+    commits. ``cancel`` stops the script before
+    its next statement and rolls it back.
+    """
+
+    SAVEPOINT = "script_statement"
+
+    def __init__(self, db, continue_on_error=False, use_transaction=True):
+        self.db = db
+        self.continue_on_error = continue_on_error
+        self.use_transaction = use_transaction
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self, statements, on_statement=None):
+        """Execute the statements and return a ScriptRun.
+
+        ``on_statement(result)`` is called after every statement, on the
+        calling thread.
+        """
+        run = ScriptRun(statements)
+        transaction_id = None
+        try:
+            if self.use_transaction:
+                transaction_id = self.db.begin_transaction()
+
+            for result in run.results:
+                if self.cancelled:
+                    break
+                self._execute(result, transaction_id)
+                if on_statement is not None:
+                    on_statement(result)
+                failed = result.status == StatementResult.FAILED
+                if failed and not self.continue_on_error:
+                    break
+
+            if transaction_id is None:
+                run.outcome = ScriptRun.AUTOCOMMIT
+            elif self.cancelled or (run.failed and not self.continue_on_error):
+                self.db.rollback_transaction(transaction_id)
+                run.outcome = ScriptRun.ROLLED_BACK
+            else:
+                self.db.commit_transaction(transaction_id)
+                run.outcome = ScriptRun.COMMITTED
+        except Exception as e:
+            run.error = e
+            if transaction_id is not None and run.outcome is None:
+                try:
+                    self.db.rollback_transaction(transaction_id)
+                    run.outcome = ScriptRun.ROLLED_BACK
+                except Exception:
+                    pass  # The transaction times out on the server instead
+        finally:
+            run.finished_at = time.time()
+        return run
+
+    def _execute(self, result, transaction_id):
+        savepoint = transaction_id is not None and self.continue_on_error
+        if savepoint:
+            self.db.execute_in_transaction(
+                f"SAVEPOINT {self.SAVEPOINT}", transaction_id
+            )
+
+        start = time.perf_counter()
+        try:
+            response = self.db.execute_in_transaction(result.sql, transaction_id)
+        except Exception as e:
+            result.duration = time.perf_counter() - start
+            result.status = StatementResult.FAILED
+            result.error = e
+            if savepoint:
+                self.db.execute_in_transaction(
+                    f"ROLLBACK TO SAVEPOINT {self.SAVEPOINT}", transaction_id
+                )
+                self._release(transaction_id)
+            return
+
+        result.duration = time.perf_counter() - start
+        result.status = StatementResult.OK
+        if savepoint:
+            self._release(transaction_id)
+        if value_decoder.has_records(response):
+            result.rows = value_decoder.record_count(response)
+        else:
+            result.rows = response.get("numberOfRecordsUpdated", 0)
+
+    def _release(self, transaction_id):
+        # Savepoints left open nest, and PostgreSQL slows down past 64
+        self.db.execute_in_transaction(
+            f"RELEASE SAVEPOINT {self.SAVEPOINT}", transaction_id
+        )
@@ -0,0 +1,188 @@
+import re
+
+COMMENT = r"--[^\n]*|/\*.*?\*/"
+STRING = r"'(?:[^']|'')*'|\$\$.*?\$\$|\$(?P<tag>[A-Za-z_]\w*)\$.*?\$(?P=tag)\$"
+
+TOKEN_PATTERN = re.compile(
+    rf"""
+      (?P<comment>{COMMENT})
+    | (?P<string>{STRING})
+    | (?P<ident>"(?:[^"]|"")*")
+    | (?P<space>\s+)
+    | (?P<word>[A-Za-z_][\w$]*)
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Keywords coloured by the editor
+HIGHLIGHT_KEYWORDS = (
+    "SELECT|FROM|WHERE|INSERT|UPDATE|DELETE|JOIN|GROUP|BY|HAVING|ORDER|LIMIT|AND|"
+    "OR|IN|LIKE|IS|NULL|CREATE|TABLE|DROP|ALTER|INDEX|UNIQUE|PRIMARY|KEY|FOREIGN|"
+    "REFERENCES|CASCADE|SET|VALUES|WITH|AS|ON|BEGIN|COMMIT|ROLLBACK|EXPLAIN"
+)
+
+# Group names are the editor's tag names; comments and strings are matched
+# first so keywords inside them stay uncoloured, as the statement index sees it
+HIGHLIGHT_PATTERN = re.compile(
+    rf"""
+      (?P<COMMENT>{COMMENT})
+    | (?P<STRING>{STRING})
+    | \b(?P<KEYWORD>{HIGHLIGHT_KEYWORDS})\b
+    """,
+    re.VERBOSE | re.DOTALL | re.IGNORECASE,
+)
+
+# Leading keywords of statements that only read data
+READ_KEYWORDS = {"select", "with", "values", "show", "explain", "table"}
+
+# Keywords that make a statement write data or change the schema
+WRITE_KEYWORDS = {
+    "insert",
+    "update",
+    "delete",
+    "merge",
+    "upsert",
+    "create",
+    "alter",
+    "drop",
+    "truncate",
+    "rename",
+    "grant",
+    "revoke",
+    "into",
+    "copy",
+    "call",
+    "do",
+    "vacuum",
+    "analyze",
+    "refresh",
+}
+
+# Keywords directly followed by a table name
+TABLE_KEYWORDS = {"from", "join", "into", "update", "table", "truncate"}
+
+# Words that may sit between a table keyword and the table name
+TABLE_PREFIXES = {"if", "not", "exists", "only", "lateral"}
+
+
+def tokenize(sql):
+    """Yield (kind, text) for every significant token, skipping comments"""
+    for match in TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("comment", "space"):
+            continue
+        yield kind, match.group()
+
+
+def split_statements(sql):
+    """Split a script on semicolons outside strings, identifiers and comments.
+
+    Returns the stripped text of every statement, skipping empty ones and
+    ones that only hold comments.
+    """
+    statements = []
+    start = 0
+    for match in TOKEN_PATTERN.finditer(sql):
+        if match.lastgroup == "other" and match.group() == ";":
+            statements.append(sql[start : match.start()])
+            start = match.end()
+    statements.append(sql[start:])
+    return [
+        statement.strip()
+        for statement in statements
+        if any(True for _ in tokenize(statement))
+    ]
+
+
+def normalize_sql(sql):
+    """Canonical statement text used to compare statements.
+
+    Comments are dropped, whitespace is collapsed, keywords and unquoted
+    identifiers are lower-cased and a trailing semicolon is removed. String
+    literals and quoted identifiers are kept verbatim.
+    """
+    parts = []
+    separated = False
+    for match in TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("comment", "space"):
+            separated = True
+            continue
+        if separated and parts:
+            parts.append(" ")
+        separated = False
+
+        text = match.group()
+        parts.append(text.lower() if kind == "word" else text)
+    return "".join(parts).rstrip("; ")
+
+
+def first_keyword(sql):
+    for kind, text in tokenize(sql):
+        return text.lower() if kind == "word" else None
+    return None
+
+
+def is_read_only(sql):
+    """Whether a statement only reads data, judged conservatively"""
+    words = [text.lower() for kind, text in tokenize(sql) if kind == "word"]
+    if not words or words[0] not in READ_KEYWORDS:
+        return False
+    return not WRITE_KEYWORDS.intersection(words)
+
+
+def _identifier(text):
+    if text.startswith('"'):
+        return text[1:-1].replace('""', '"')
+    return text.lower()
+
+
+def referenced_tables(sql):
+    """Bare names of the tables a statement reads or writes.
+
+    Schema qualifiers are dropped, so invalidation by name errs on the side
+    of matching too much. Returns None when a write statement names no
+    table it could be attributed to.
+    """
+    tokens = list(tokenize(sql))
+    tables = set()
+
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        i += 1
+        if kind != "word" or text.lower() not in TABLE_KEYWORDS:
+            continue
+
+        while True:
+            while i < len(tokens) and tokens[i][1].lower() in TABLE_PREFIXES:
+                i += 1
+            if i >= len(tokens) or tokens[i][0] not in ("word", "ident"):
+                break
+
+            # Qualified names: take the last part of schema.table
+            name = tokens[i][1]
+            i += 1
+            while i + 1 < len(tokens) and tokens[i][1] == ".":
+                name = tokens[i + 1][1]
+                i += 2
+            tables.add(_identifier(name))
+
+            # Skip an optional alias, then continue a comma separated list
+            if i < len(tokens) and tokens[i][1].lower() == "as":
+                i += 1
+            if (
+                i < len(tokens)
+                and tokens[i][0] in ("word", "ident")
+                and tokens[i][1].lower() not in TABLE_KEYWORDS
+            ):
+                i += 1
+            if i < len(tokens) and tokens[i][1] == ",":
+                i += 1
+                continue
+            break
+
+    if not tables and not is_read_only(sql):
+        return None
+    return tables
@@ -0,0 +1,38 @@
+import os
+import sys
+import threading
+import time
+
+# Milestones are timed from the first import of this module, which main.py
+# does before anything else. Run ``python -X importtime main.py`` for a
+# per-module breakdown of import costs.
+_start = time.perf_counter()
+_marks = []
+_lock = threading.Lock()
+_reported = False
+
+
+def mark(name):
+    """Record that a startup milestone was reached"""
+    with _lock:
+        _marks.append((name, time.perf_counter() - _start))
+
+
+def report(file=None):
+    """Print every milestone once, if STARTUP_TIMING is set in the environment"""
+    global _reported
+    with _lock:
+        if _reported or not os.getenv("STARTUP_TIMING"):
+            return
+        _reported = True
+        marks = list(_marks)
+
+    file = file or sys.stderr
+    previous = 0.0
+    for name, elapsed in marks:
+        print(
+            f"startup: {name:<24} {elapsed * 1000:8.1f} ms "
+            f"(+{(elapsed - previous) * 1000:.1f} ms)",
+            file=file,
+        )
+        previous = elapsed
@@ -0,0 +1,201 @@
+import bisect
+import re
+
+from idlelib.delegator import Delegator
+
+import sql_text
+
+# Characters outside the Basic Multilingual Plane, which Tk counts as two
+WIDE_PATTERN = re.compile("[\U00010000-\U0010ffff]")
+
+
+class StatementIndex:
+    """Positions of the statement separators of an editor buffer.
+
+    Semicolons are found with the SQL tokenizer, so ones inside strings,
+    quoted identifiers, comments and dollar-quoted bodies do not split
+    statements. ``edit`` re-tokenizes from the start of the statement that
+    contains the change and stops as soon as it reaches a separator that
+    was already there before the change, so typing only re-reads the
+    statement being edited.
+
+    A quote or comment opener that is never closed is tokenized as a plain
+    character, but an edit anywhere after it may close it. Such openers are
+    remembered, and re-tokenizing starts at the first of them instead.
+
+    ``wide`` is set once the text holds a character outside the BMP, whose
+    Tk offsets differ from Python's; see ``text_offset``.
+    """
+
+    # Characters that start a string, identifier or comment when closed
+    OPENERS = {"'", '"', "$", "/"}
+
+    def __init__(self, text=""):
+        self.text = ""
+        self.ends = []  # Offsets of the separating semicolons, ascending
+        self.openers = []  # Offsets of unclosed quote and comment openers
+        self.wide = False
+        self.rebuild(text)
+
+    def rebuild(self, text):
+        self.text = text
+        self.wide = WIDE_PATTERN.search(text) is not None
+        self.ends, self.openers = [], []
+        for kind, position in self._scan(0):
+            (self.ends if kind == ";" else self.openers).append(position)
+
+    def edit(self, start, end, inserted=""):
+        """Replace ``text[start:end]`` with ``inserted`` and update the index"""
+        delta = len(inserted) - (end - start)
+        self.text = self.text[:start] + inserted + self.text[end:]
+        if not self.wide and WIDE_PATTERN.search(inserted):
+            self.wide = True
+
+        # A separator before the change marks a point where tokenizing can
+        # restart, and every separator after it may have moved or vanished
+        first = bisect.bisect_left(self.ends, start)
+        restart = self.ends[first - 1] + 1 if first else 0
+        if self.openers and self.openers[0] < restart:
+            restart = self.openers[0]
+
+        old_ends, old_openers = self.ends, self.openers
+        tail = bisect.bisect_left(old_ends, end)
+        changed_end = start + len(inserted)
+
+        ends = old_ends[: bisect.bisect_left(old_ends, restart)]
+        openers = old_openers[: bisect.bisect_left(old_openers, restart)]
+        for kind, position in self._scan(restart):
+            if kind != ";":
+                openers.append(position)
+                continue
+            if position >= changed_end:
+                # Past the change, a separator that existed before means the
+                # rest of the buffer tokenizes exactly as it did
+                old = position - delta
+                j = bisect.bisect_left(old_ends, old, tail)
+                if j < len(old_ends) and old_ends[j] == old:
+                    ends.extend(e + delta for e in old_ends[j:])
+                    k = bisect.bisect_right(old_openers, old)
+                    openers.extend(o + delta for o in old_openers[k:])
+                    break
+            ends.append(position)
+        self.ends = ends
+        self.openers = openers
+
+    def _scan(self, position):
+        """Yield (";" or "open", offset) for separators and unclosed openers"""
+        for match in sql_text.TOKEN_PATTERN.finditer(self.text, position):
+            if match.lastgroup != "other":
+                continue
+            char = match.group()
+            if char == ";":
+                yield ";", match.start()
+            elif char in self.OPENERS:
+                # Division and $1 placeholders cannot open anything
+                following = self.text[match.end() : match.end() + 1]
+                if char == "/" and following != "*":
+                    continue
+                if char == "$" and not (following in ("$", "_") or following.isalpha()):
+                    continue
+                yield "open", match.start()
+
+    def __len__(self):
+        return len(self.ends) + 1
+
+    def bounds(self, number):
+        """(start, end) offsets of a statement, excluding its semicolon"""
+        start = self.ends[number - 1] + 1 if number else 0
+        end = self.ends[number] if number < len(self.ends) else len(self.text)
+        return start, end
+
+    def number_at(self, offset):
+        """Number of the statement an offset falls into.
+
+        A cursor right after a semicolon belongs to the next statement, one
+        right before it to the statement it ends.
+        """
+        return bisect.bisect_left(self.ends, offset)
+
+    def statement(self, number):
+        """Stripped text of a statement, or None when it holds no SQL"""
+        start, end = self.bounds(number)
+        text = self.text[start:end]
+        if not any(True for _ in sql_text.tokenize(text)):
+            return None
+        return text.strip()
+
+    def statement_at(self, offset):
+        """The statement under the cursor.
+
+        When the cursor sits in trailing whitespace after the last semicolon
+        of a statement, that statement is returned instead of nothing.
+        """
+        number = self.number_at(offset)
+        text = self.statement(number)
+        if text is None and number:
+            start, _ = self.bounds(number)
+            if not self.text[start:offset].strip():
+                text = self.statement(number - 1)
+        return text
+
+    def statements_between(self, start, end):
+        """Every statement overlapping the range, e.g. a selection"""
+        first = self.number_at(start)
+        last = self.number_at(end)
+        # A selection ending right after a semicolon does not include the next
+        if last > first and not self.text[self.bounds(last)[0] : end].strip():
+            last -= 1
+        texts = (self.statement(number) for number in range(first, last + 1))
+        return [text for text in texts if text is not None]
+
+    def statements(self):
+        return self.statements_between(0, len(self.text))
+
+    def line_start(self, line):
+        """Offset of the first character of a 1-based line"""
+        position = 0
+        for _ in range(line - 1):
+            position = self.text.find("\n", position) + 1
+            if not position:
+                return len(self.text)
+        return position
+
+
+def text_offset(text, index, mark):
+    """Offset into ``index.text`` of a Text index, clamped to the end.
+
+    Tk 8.6 counts a character outside the BMP as two characters where
+    Python counts one, so once the buffer holds one the offset is the
+    Python start of the mark's line plus the length of what ``get``
+    returns for the line up to the mark.
+    """
+    if text.compare(mark, ">", "end-1c"):
+        mark = "end-1c"
+    if not index.wide:
+        count = text.count("1.0", mark, "chars")
+        return count[0] if count else 0
+    line = text.index(mark).split(".")[0]
+    return index.line_start(int(line)) + len(text.get(f"{line}.0", mark))
+
+
+class StatementIndexDelegator(Delegator):
+    """Percolator filter that mirrors every edit of a Text into an index"""
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def _offset(self, mark):
+        return text_offset(self.delegate, self.index, mark)
+
+    def insert(self, index, chars, tags=None):
+        offset = self._offset(index)
+        self.delegate.insert(index, chars, tags)
+        self.index.edit(offset, offset, chars)
+
+    def delete(self, index1, index2=None):
+        start = self._offset(index1)
+        end = self._offset(index2 if index2 is not None else f"{index1}+1c")
+        self.delegate.delete(index1, index2)
+        if end > start:
+            self.index.edit(start, end)
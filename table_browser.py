@@ -0,0 +1,241 @@
+import json
+import tkinter as tk
+from tkinter import ttk
+
+from columnar_result import ColumnarResult
+from query_mapper import QueryMapper
+from result_store import ResultStore
+from results_grid import ResultsGrid
+from schema_cache import quote_identifier, quote_literal
+import value_decoder
+
+# information_schema data types that cannot be written as a cast
+UNCASTABLE_TYPES = ("USER-DEFINED", "ARRAY")
+
+
+def key_literal(value, data_type=None):
+    """SQL literal of a decoded key value, cast to the column's type"""
+    if isinstance(value, bool):
+        text = "true" if value else "false"
+    elif isinstance(value, (bytes, bytearray)):
+        text = "\\x" + value.hex()
+    elif isinstance(value, (dict, list)):
+        text = json.dumps(value)
+    else:
+        text = str(value)
+    literal = quote_literal(text)
+    if data_type and data_type not in UNCASTABLE_TYPES:
+        literal += f"::{data_type}"
+    return literal
+
+
+class KeysetPager:
+    """Fetches a table one page at a time in primary key order.
+
+    Each page is a fresh ``... WHERE (key) > (last key seen) ORDER BY key
+    LIMIT n`` query, so every page costs the same index range scan however
+    deep the reader has scrolled. It is run as written, since the paging
+    wrapper of ``stream_query`` would not keep its order, and the page size
+    is halved when a page exceeds the Data API response limit. Only
+    ``columns`` and the key are selected. Tables without a primary key fall
+    back to the LIMIT/OFFSET paging of ``stream_query``. ``fetch_page``
+    blocks and is called on a worker thread.
+    """
+
+    def __init__(self, db, table, columns=None, page_size=200):
+        self.db = db
+        self.table = table
+        self.key = list(table.primary_key)
+        wanted = set(columns or table.column_names) | set(self.key)
+        self.columns = [name for name in table.column_names if name in wanted]
+        self.page_size = page_size
+        self.last_key = None  # Key values of the last row fetched
+        self.exhausted = False
+        self._pages = None  # stream_query generator when paging by OFFSET
+
+    @property
+    def keyset(self):
+        return bool(self.key)
+
+    def page_sql(self):
+        """The statement of the next page"""
+        columns = ", ".join(quote_identifier(name) for name in self.columns) or "*"
+        sql = f"SELECT {columns} FROM {self.table.qualified_name}"
+        if not self.keyset:
+            return sql
+        key = ", ".join(quote_identifier(name) for name in self.key)
+        if self.last_key is not None:
+            values = ", ".join(
+                key_literal(value, self.table.column_type(name))
+                for name, value in zip(self.key, self.last_key)
+            )
+            sql += f" WHERE ({key}) > ({values})"
+        return f"{sql} ORDER BY {key} LIMIT {self.page_size}"
+
+    def fetch_page(self):
+        """The next page as a ColumnarResult, or None past the last row"""
+        if self.exhausted:
+            return None
+        if self.keyset:
+            page = self._fetch_keyset_page()
+        else:
+            if self._pages is None:
+                self._pages = self.db.stream_query(
+                    self.page_sql(), batch_size=self.page_size, use_cache=False
+                )
+            page = next(self._pages, None)
+
+        # A page shrunk to fit the response limit can be short, so the end
+        # is only known from an empty page
+        if page is None or not value_decoder.record_count(page):
+            self.exhausted = True
+            return None
+        result = ColumnarResult.from_response(page)
+        if self.keyset:
+            last = len(result) - 1
+            names = result.column_names
+            self.last_key = [result.value(last, names.index(k)) for k in self.key]
+        return result
+
+    def _fetch_keyset_page(self):
+        while True:
+            try:
+                return self.db.execute_page(self.page_sql())
+            except Exception as e:
+                if self.page_size == 1 or not self.db.is_response_too_large(e):
+                    raise
+                self.page_size = max(1, self.page_size // 2)
+
+
+class TableBrowser(ttk.Frame):
+    """Results tab that loads more of a table as it is scrolled.
+
+    Pages are fetched by a KeysetPager on a worker thread and appended to a
+    ResultStore, so memory stays bounded however far the table is browsed.
+    The next page is requested while the rows already loaded still fill
+    more than a page below the viewport, so scrolling rarely waits. The
+    Columns menu picks the columns selected from the table; the primary key
+    is always included.
+    """
+
+    PAGE_SIZE = 200
+
+    def __init__(
+        self,
+        parent,
+        db,
+        table,
+        run_in_background,
+        query_mapper=None,
+        page_size=PAGE_SIZE,
+    ):
+        super().__init__(parent)
+        self.db = db
+        self.table = table
+        self.run_in_background = run_in_background
+        self.query_mapper = query_mapper or QueryMapper()
+        self.page_size = page_size
+        self.pager = None
+        self.store = None
+        self.loading = False
+        self.generation = 0  # Pages of an earlier restart are dropped
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X)
+        self.status_label = ttk.Label(bar, text=table.display_name)
+        self.status_label.pack(side=tk.LEFT)
+        self.column_vars = {}
+        if table.columns:
+            button = ttk.Menubutton(bar, text="Columns")
+            menu = tk.Menu(button, tearoff=0)
+            for name in table.column_names:
+                var = self.column_vars[name] = tk.BooleanVar(value=True)
+                menu.add_checkbutton(
+                    label=name,
+                    variable=var,
+                    command=self.restart,
+                    state=tk.DISABLED if name in table.primary_key else tk.NORMAL,
+                )
+            button["menu"] = menu
+            button.pack(side=tk.RIGHT)
+
+        self.results_grid = ResultsGrid(self)
+        self.results_grid.pack(fill=tk.BOTH, expand=True)
+        self.results_grid.bind("<<ViewChanged>>", lambda e: self.maybe_fetch())
+        self.restart()
+
+    @property
+    def selected_columns(self):
+        return [name for name, var in self.column_vars.items() if var.get()]
+
+    def restart(self):
+        """Browse from the first row again, e.g. after picking other columns"""
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        self.generation += 1
+        self.loading = False
+        self.pager = KeysetPager(
+            self.db, self.table, self.selected_columns, self.page_size
+        )
+        self.results_grid.show_message(f"Loading {self.table.display_name}...")
+        self.maybe_fetch()
+
+    def maybe_fetch(self):
+        """Request the next page unless enough rows are loaded below the view"""
+        if self.loading or self.pager.exhausted:
+            return
+        if self.store is not None:
+            grid = self.results_grid
+            below = len(self.store) - grid.top_row - grid.visible_rows()
+            if below > self.page_size:
+                return
+        self.loading = True
+        generation = self.generation
+        self.run_in_background(
+            self.pager.fetch_page, lambda future: self.on_page(future, generation)
+        )
+
+    def on_page(self, future, generation):
+        """Append a fetched page (runs on the Tk thread)"""
+        if generation != self.generation or not self.winfo_exists():
+            return
+        self.loading = False
+        try:
+            page = future.result()
+        except Exception as e:
+            self.status_label.config(text=f"{self.table.display_name}: error: {e}")
+            if self.store is None:
+                self.results_grid.show_message(f"Error: {e}")
+            return
+
+        if page is not None:
+            if self.store is None:
+                self.store = ResultStore.from_result(page)
+                self.results_grid.set_result(
+                    self.store, self.query_mapper.format_headers(page)
+                )
+            else:
+                start = len(self.store)
+                self.store.append(page)
+                self.results_grid.rows_appended(start)
+        elif self.store is None:
+            self.results_grid.show_message("No records found")
+        self.update_status()
+        self.maybe_fetch()
+
+    def update_status(self):
+        rows = len(self.store) if self.store is not None else 0
+        text = f"{self.table.display_name}: {rows} rows"
+        if not self.pager.exhausted:
+            text += " loaded, scroll for more"
+        if not self.pager.keyset:
+            text += " (no primary key, paging by OFFSET)"
+        self.status_label.config(text=text)
+
+    def destroy(self):
+        self.generation += 1
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        super().destroy()
@@ -0,0 +1,104 @@
+import random
+
+from statement_index import StatementIndex, text_offset
+
+FRAGMENTS = [
+    "select 1",
+    ";",
+    "; ",
+    "\n",
+    "'",
+    "'a;b'",
+    '"',
+    '"x;y"',
+    "--",
+    "-- c;\n",
+    "/*",
+    "*/",
+    "/* ; */",
+    "$$",
+    "$tag$",
+    "$1",
+    "a / b",
+    "x",
+    " ",
+    "\U0001f600",
+    "é",
+]
+
+
+def random_edit(rng, text):
+    start = rng.randint(0, len(text))
+    end = rng.randint(start, min(len(text), start + 6))
+    if rng.random() < 0.3:
+        return start, end, ""
+    inserted = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 3)))
+    return start, end, inserted
+
+
+def test_edits_match_rebuild():
+    rng = random.Random(14)
+    for _ in range(300):
+        index = StatementIndex("".join(rng.choice(FRAGMENTS) for _ in range(20)))
+        for _ in range(40):
+            start, end, inserted = random_edit(rng, index.text)
+            index.edit(start, end, inserted)
+            rebuilt = StatementIndex(index.text)
+            assert index.ends == rebuilt.ends, index.text
+            assert index.openers == rebuilt.openers, index.text
+            assert index.wide or not rebuilt.wide
+
+
+class FakeText:
+    """The parts of a Tk 8.6 Text used by text_offset.
+
+    Like Tk 8.6, indices and counts treat a character outside the BMP as
+    two characters, while ``get`` returns Python strings.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def _units(self, text):
+        return len(text.encode("utf-16-le")) // 2
+
+    def _offset(self, mark):
+        line, column = (int(part) for part in mark.split("."))
+        start = sum(len(row) + 1 for row in self.text.split("\n")[: line - 1])
+        row = self.text[start:].split("\n")[0]
+        units = 0
+        for i, char in enumerate(row):
+            if units >= column:
+                return start + i
+            units += self._units(char)
+        return start + len(row)
+
+    def compare(self, mark, op, other):
+        assert op == ">" and other == "end-1c"
+        return False
+
+    def index(self, mark):
+        return mark
+
+    def count(self, start, mark, unit):
+        return (self._units(self.text[: self._offset(mark)]),)
+
+    def get(self, start, mark):
+        return self.text[self._offset(start) : self._offset(mark)]
+
+
+def test_text_offset_with_wide_characters():
+    text = "select '\U0001f600';\nselect '\U0001f600\U0001f600', 2;"
+    index = StatementIndex(text)
+    widget = FakeText(text)
+    assert text_offset(widget, index, "1.11") == text.index(";")
+    assert text_offset(widget, index, "2.0") == text.index("\n") + 1
+    assert text_offset(widget, index, "2.13") == text.index(",")
+    assert text_offset(widget, index, "2.17") == len(text)
+
+
+def test_text_offset_without_wide_characters():
+    text = "select 1;\nselect 2;"
+    index = StatementIndex(text)
+    assert not index.wide
+    assert text_offset(FakeText(text), index, "2.3") == 13
@@ -0,0 +1,159 @@
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib parser is the fallback
+    orjson = None
+
+
+def _parse_json(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _parse_decimal(value):
+    # Going through str keeps JSON numbers from picking up float noise
+    return decimal.Decimal(str(value))
+
+
+def _parse_timestamp(text):
+    return datetime.datetime.fromisoformat(text)
+
+
+def _parse_date(text):
+    return datetime.date.fromisoformat(text)
+
+
+def _parse_time(text):
+    return datetime.time.fromisoformat(text)
+
+
+def _parse_blob(text):
+    # Blobs inside JSON formatted records arrive base64 encoded
+    return base64.b64decode(text)
+
+
+# String-carried types that have a richer Python representation, keyed by the
+# lower-cased typeName reported in columnMetadata (PostgreSQL and MySQL names)
+STRING_CONVERTERS = {
+    "numeric": _parse_decimal,
+    "decimal": _parse_decimal,
+    "money": _parse_decimal,
+    "timestamp": _parse_timestamp,
+    "timestamptz": _parse_timestamp,
+    "datetime": _parse_timestamp,
+    "date": _parse_date,
+    "time": _parse_time,
+    "timetz": _parse_time,
+    "json": _parse_json,
+    "jsonb": _parse_json,
+    "uuid": uuid.UUID,
+}
+
+# Converters for values that JSON formatted records carry as plain JSON types
+JSON_CONVERTERS = dict(STRING_CONVERTERS, bytea=_parse_blob, blob=_parse_blob)
+
+
+def _safe(converter):
+    """Wrap a converter so unparseable input is kept as it arrived"""
+
+    def convert(value):
+        try:
+            return converter(value)
+        except (ValueError, TypeError, ArithmeticError):
+            return value
+
+    return convert
+
+
+def _normalize_type_name(type_name):
+    return (type_name or "").lower().split("(", 1)[0].strip()
+
+
+def converter(kind, type_name):
+    """Return the per-column function for a field kind and typeName.
+
+    Returns ``None`` when the raw Data API value is already the right Python
+    value, so callers can skip the call entirely on the hot path.
+    """
+    name = _normalize_type_name(type_name)
+    if kind == "stringValue":
+        conv = STRING_CONVERTERS.get(name)
+        return _safe(conv) if conv is not None else None
+    if kind == "arrayValue":
+        element = name[1:] if name.startswith("_") else name.removesuffix("[]")
+        return lambda value: decode_array(value, element)
+    return None
+
+
+def json_converter(type_name):
+    """Like ``converter`` for values parsed from JSON formatted records"""
+    conv = JSON_CONVERTERS.get(_normalize_type_name(type_name))
+    return _safe(conv) if conv is not None else None
+
+
+def decode_array(value, element_type=None):
+    """Decode an ``arrayValue`` into a (possibly nested) Python list"""
+    if "arrayValues" in value:
+        return [decode_array(item, element_type) for item in value["arrayValues"]]
+
+    kind, items = next(iter(value.items()), (None, []))
+    if kind == "stringValues":
+        conv = STRING_CONVERTERS.get(element_type)
+        if conv is not None:
+            return [_safe(conv)(item) for item in items]
+    return list(items)
+
+
+def decode_field(field, type_name=None):
+    """Decode a single Data API field into a Python value"""
+    if not field or field.get("isNull"):
+        return None
+    kind, value = next(iter(field.items()))
+    conv = converter(kind, type_name)
+    return conv(value) if conv is not None else value
+
+
+def json_records(response):
+    """Parsed ``formattedRecords`` of a JSON formatted response.
+
+    The parsed rows are memoized on the response so the paging loop, the
+    executor and the decoder only pay for parsing once.
+    """
+    if "jsonRecords" not in response:
+        text = response.get("formattedRecords")
+        response["jsonRecords"] = _parse_json(text) if text else []
+    return response["jsonRecords"]
+
+
+def has_records(response):
+    """Whether a response carries a result set rather than an update count"""
+    return isinstance(response, dict) and (
+        "records" in response or "formattedRecords" in response
+    )
+
+
+def record_count(response):
+    if "formattedRecords" in response:
+        return len(json_records(response))
+    return len(response.get("records") or [])
+
+
+def format_value(value, null_text="NULL"):
+    """Text shown for a decoded value"""
+    if value is None:
+        return null_text
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (bytes, bytearray)):
+        return "\\x" + value.hex()
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    return str(value)
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+
+
+class WorkspaceStore:
+    """Named SQL buffers saved as ``<name>.sql`` files in one directory.
+
+    Listing the workspaces only reads the directory; a buffer's file is read
+    when it is first opened. Files are written atomically by writing a
+    temporary file and renaming it over the old one. ``save_async`` hands the
+    write to a single background thread, so saves of the same buffer land in
+    the order they were made.
+    """
+
+    DEFAULT_NAME = "workspace"
+    NAME_PATTERN = re.compile(r"^[\w\- .]+$")
+
+    def __init__(self, directory="workspaces", legacy_file="workspace.sql"):
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.sql")
+
+    def valid_name(self, name):
+        return bool(self.NAME_PATTERN.match(name)) and name.strip(". ") == name
+
+    def names(self):
+        """Workspace names, creating the default one on first use"""
+        os.makedirs(self.directory, exist_ok=True)
+        names = sorted(
+            entry[:-4] for entry in os.listdir(self.directory) if entry.endswith(".sql")
+        )
+        if names:
+            return names
+
+        # Carry over the single workspace file of earlier versions
+        content = ""
+        try:
+            with open(self.legacy_file, "r") as f:
+                content = f.read()
+        except FileNotFoundError:
+            pass
+        self.save(self.DEFAULT_NAME, content)
+        return [self.DEFAULT_NAME]
+
+    def load(self, name):
+        try:
+            with open(self.path(name), "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def save(self, name, content):
+        """Write a workspace atomically"""
+        path = self.path(name)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def save_async(self, name, content):
+        """Queue a save on the writer thread and return its future"""
+        return self._writer.submit(self.save, name, content)
+
+    def flush(self):
+        """Block until every queued save has been written"""
+        self._writer.submit(lambda: None).result()
+
+    def rename(self, name, new_name):
+        self.flush()
+        os.replace(self.path(name), self.path(new_name))
+
+    def delete(self, name):
+        self.flush()
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass